@@ -0,0 +1,121 @@
+"""Benchmark POST /events/search under 100+ concurrent in-flight requests.
+
+Compares the old blocking handler (sync search called inside ``async def``)
+with the executor-backed handler, against a local fake Custom Search server.
+While the load runs, ``/health`` is probed to show event-loop stalls.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_async_search --requests 200 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import time
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from benchmarks.fake_cse import FakeCustomSearchServer
+from functions.event_discovery import client, search
+from functions.event_discovery.quota import QuotaScheduler
+from functions.event_discovery.search import search_running_events
+
+HEADERS = {"Authorization": "Bearer bench-client-id"}
+
+
+def _blocking_app() -> FastAPI:
+    """Recreate the pre-executor handler for comparison."""
+    from main import verify_token
+
+    app = FastAPI()
+
+    @app.post("/events/search")
+    async def search(query: str, authorized: bool = Depends(verify_token)):
+        return search_running_events(query)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+async def _probe_health(http: httpx.AsyncClient, stop: asyncio.Event, samples: List[float]):
+    # Each sample includes any time the probe could not be scheduled, so a
+    # stalled event loop shows up as health latency
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        await http.get("/health")
+        samples.append((time.perf_counter() - started - 0.01) * 1000)
+
+
+async def _run(app: FastAPI, n_requests: int, label: str) -> str:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        stop = asyncio.Event()
+        health_ms: List[float] = []
+        probe = asyncio.create_task(_probe_health(http, stop, health_ms))
+
+        started = time.perf_counter()
+        # Unique queries so every request goes upstream
+        responses = await asyncio.gather(
+            *(
+                http.post(f"/events/search?query={label}-{i}", headers=HEADERS, timeout=None)
+                for i in range(n_requests)
+            )
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    ok = sum(1 for r in responses if r.status_code == 200)
+    health_ms = health_ms or [elapsed * 1000]
+    return (
+        f"{label:<10} {n_requests:>5} req  {elapsed:7.2f}s  {n_requests / elapsed:8.1f} req/s  "
+        f"ok={ok:<5} /health p50={statistics.median(health_ms):7.1f}ms "
+        f"max={max(health_ms):7.1f}ms"
+    )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--pool-size", type=int, default=client.POOL_SIZE)
+    args = parser.parse_args()
+
+    with FakeCustomSearchServer(latency=args.latency) as fake:
+        os.environ.update(
+            {
+                "RUNON_SEARCH_API_URL": fake.url,
+                "RUNON_API_KEY": "bench-key",
+                "RUNON_SEARCH_ENGINE_ID": "bench-cx",
+                "RUNON_CLIENT_ID": "bench-client-id",
+            }
+        )
+        client.init_client(pool_size=args.pool_size)
+        # Measure the serving path, not the Custom Search rate limit
+        search._quota = QuotaScheduler(rate=1e6, burst=10**6, daily_budget=10**9)
+        try:
+            from main import app
+
+            print(f"upstream latency={args.latency * 1000:.0f}ms pool={args.pool_size}")
+            for label, target in (("blocking", _blocking_app()), ("executor", app)):
+                # The search module logs every upstream call; keep the report readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    line = asyncio.run(_run(target, args.requests, label))
+                print(line)
+        finally:
+            client.close_client()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Columnar EventBatch operations against Python loops over Event lists.
+
+Checks that filtering, sorting, top-k and dedup on an EventBatch give the
+same events as the list-based equivalents, then reports the time of each.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_event_batch --events 200000
+"""
+
+import argparse
+import heapq
+import time
+from datetime import datetime
+from typing import Callable, List
+
+from benchmarks.bench_event_ids import event_fields
+from benchmarks.corpus import CITIES
+from models.event import Event
+from models.event_batch import EventBatch
+
+
+def _best_ms(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def _dedup(events: List[Event]) -> List[Event]:
+    seen = set()
+    unique = []
+    for event in events:
+        if event.id not in seen:
+            seen.add(event.id)
+            unique.append(event)
+    return unique
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--top", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = event_fields(args.events)
+    for n, row in enumerate(rows):
+        row["location"] = CITIES[n % len(CITIES)]
+    events = Event.construct_many(rows)
+    started = time.perf_counter()
+    batch = EventBatch.from_events(events)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    since = datetime(2025, 1, 1)
+    cities = set(CITIES[:4])
+    by_date = lambda e: e.date  # noqa: E731
+    by_distance = lambda e: e.distance  # noqa: E731
+    cases = [
+        (
+            "filter",
+            lambda: [
+                e
+                for e in events
+                if e.date >= since and 5 <= e.distance <= 21.1 and e.location in cities
+            ],
+            lambda: batch.filter(
+                date_from=since, min_distance=5, max_distance=21.1, locations=cities
+            ),
+        ),
+        ("sort date", lambda: sorted(events, key=by_date), lambda: batch.sort("date")),
+        (
+            "sort loc+date",
+            lambda: sorted(events, key=lambda e: (e.location, e.date)),
+            lambda: batch.sort("location", "date"),
+        ),
+        (
+            f"top {args.top}",
+            lambda: heapq.nlargest(args.top, events, key=by_distance),
+            lambda: batch.top_k(args.top, by="distance", largest=True),
+        ),
+        ("dedup id", lambda: _dedup(events), lambda: batch.dedup()),
+    ]
+
+    for label, loop, vectorized in cases:
+        if vectorized().to_events() != loop():
+            raise SystemExit(f"{label}: EventBatch returned different events")
+
+    print(f"{len(events)} events, output identical; from_events {build_ms:.0f} ms")
+    print(f"{'operation':<16} {'python ms':>10} {'batch ms':>9}")
+    for label, loop, vectorized in cases:
+        before = _best_ms(loop, args.repeat)
+        after = _best_ms(vectorized, args.repeat)
+        print(f"{label:<16} {before:10.1f} {after:9.1f}  {before / after:5.1f}x")
+    top = batch.top_k(args.top, by="distance", largest=True)
+    print(f"to_events of top {args.top}: {_best_ms(top.to_events, args.repeat):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
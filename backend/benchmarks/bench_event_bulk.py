@@ -0,0 +1,70 @@
+"""Bulk Event construction and serialization against the per-object path.
+
+Checks that the bulk helpers produce the same events and byte-identical
+JSON, then reports the per-event cost of each path.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_event_bulk --events 20000
+"""
+
+import argparse
+import json
+import time
+from typing import Callable
+
+from benchmarks.bench_event_ids import event_fields
+from models.event import Event
+
+
+def _per_event_us(fn: Callable[[], object], count: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best / count * 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = event_fields(args.events)
+    events = [Event(**row) for row in rows]
+    with_ids = [dict(row, id=event.id) for row, event in zip(rows, events)]
+
+    if Event.construct_many(rows) != events or Event.construct_many(with_ids) != events:
+        raise SystemExit("construct_many built different events")
+    dumps = lambda value: json.dumps(value, ensure_ascii=False)  # noqa: E731
+    if dumps(Event.to_dicts(events)) != dumps([e.to_dict() for e in events]):
+        raise SystemExit("to_dicts output differs")
+    if dumps(Event.to_calendar_events(events)) != dumps([e.to_calendar_event() for e in events]):
+        raise SystemExit("to_calendar_events output differs")
+
+    cases = [
+        ("construct", lambda: [Event(**row) for row in rows], lambda: Event.construct_many(rows)),
+        (
+            "construct (ids)",
+            lambda: [Event(**row) for row in with_ids],
+            lambda: Event.construct_many(with_ids),
+        ),
+        ("to_dict", lambda: [e.to_dict() for e in events], lambda: Event.to_dicts(events)),
+        (
+            "to_calendar",
+            lambda: [e.to_calendar_event() for e in events],
+            lambda: Event.to_calendar_events(events),
+        ),
+    ]
+    print(f"{len(rows)} events, output identical; microseconds per event")
+    for label, per_object, bulk in cases:
+        before = _per_event_us(per_object, len(rows), args.repeat)
+        after = _per_event_us(bulk, len(rows), args.repeat)
+        print(f"{label:<16} per-object {before:6.2f}  bulk {after:6.2f}  {before / after:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Throughput of event ID generation and bulk Event construction.
+
+Compares the former per-process ``hash()`` ID with the content-derived
+BLAKE2b ID, alone and as part of constructing Events from extracted
+search results.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_event_ids --events 100000
+"""
+
+import argparse
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from benchmarks.corpus import generate_items
+from functions.event_discovery.extraction import extract_item
+from models.event import Event, make_event_id
+
+
+def legacy_event_id(name: str, date: datetime, location: str) -> str:
+    """The former ID, randomized per process by PYTHONHASHSEED."""
+    return str(hash(f"{name}{date}{location}"))
+
+
+def _rate(fn: Callable[[], object], count: int) -> float:
+    started = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - started)
+
+
+def event_fields(count: int) -> List[Dict]:
+    """Build Event fields for ``count`` generated search results."""
+    fields = []
+    for item in generate_items(count):
+        extracted = extract_item(item)
+        fields.append(
+            {
+                "name": extracted["name"],
+                "date": extracted["date"] or datetime(2024, 1, 1),
+                "location": "Boston",
+                "description": extracted["description"],
+                "url": extracted["url"],
+                "distance": extracted["distance"] or 0.0,
+            }
+        )
+    return fields
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=100_000)
+    args = parser.parse_args()
+
+    fields = event_fields(args.events)
+    keys = [(f["name"], f["date"], f["location"]) for f in fields]
+    contents = {(name.casefold(), date, location.casefold()) for name, date, location in keys}
+    ids = {make_event_id(*key) for key in keys}
+    print(f"{len(keys)} events, {len(contents)} distinct contents, {len(ids)} distinct IDs")
+
+    for label, make_id in (("hash()", legacy_event_id), ("blake2b", make_event_id)):
+        rate = _rate(lambda: [make_id(*key) for key in keys], len(keys))
+        print(f"id {label:<8} {rate:12,.0f} ids/s")
+
+    rate = _rate(lambda: [Event(**f) for f in fields], len(fields))
+    print(f"Event(...)  {rate:12,.0f} events/s (with blake2b IDs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Microbenchmark of date and distance extraction on CSE-like snippets.
+
+Compares the original per-pattern extractors (regexes rebuilt per call,
+dateutil for every match) with the compiled single-pass engine, and checks
+that both return identical results on the whole corpus.
+
+Also times ``extract_events_batch`` over the same items, inline and across
+worker processes.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_extraction --snippets 50000 --workers 4
+"""
+
+import argparse
+import re
+import time
+from typing import Callable, List
+
+from dateutil import parser as date_parser
+
+from benchmarks.corpus import generate_items, generate_snippets
+from functions.event_discovery.extraction import (
+    extract_date_and_distance,
+    extract_events_batch,
+    extract_item,
+)
+
+
+def legacy_extract_date(text: str):
+    """The original extract_date_from_text."""
+    date_patterns = [
+        r"\b(?:January|February|March|April|May|June|July|August|September|"
+        r"October|November|December)\s+\d{1,2},?\s+\d{4}\b",
+        r"\b\d{1,2}\s+(?:January|February|March|April|May|June|July|August|"
+        r"September|October|November|December)\s+\d{4}\b",
+        r"\b\d{1,2}/\d{1,2}/\d{4}\b",
+        r"\b\d{4}-\d{2}-\d{2}\b",
+    ]
+    for pattern in date_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            try:
+                return date_parser.parse(match.group())
+            except (ValueError, TypeError):
+                continue
+    return None
+
+
+def legacy_extract_distance(text: str):
+    """The original extract_distance_from_text."""
+    distance_patterns = {
+        r"\b5k\b": 5.0,
+        r"\b10k\b": 10.0,
+        r"\bhalf\s*marathon\b": 21.1,
+        r"\bmarathon\b": 42.2,
+    }
+    text = text.lower()
+    for pattern, distance in distance_patterns.items():
+        if re.search(pattern, text, re.IGNORECASE):
+            return distance
+    return None
+
+
+def legacy_extract(text: str):
+    """Both original extractors, as the search loop called them."""
+    return legacy_extract_date(text), legacy_extract_distance(text)
+
+
+def _time(fn: Callable, snippets: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in snippets:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="default: CPU count")
+    args = parser.parse_args()
+
+    snippets = generate_snippets(args.snippets)
+    mismatches = sum(1 for t in snippets if legacy_extract(t) != extract_date_and_distance(t))
+    if mismatches:
+        raise SystemExit(f"{mismatches} snippets extracted differently")
+
+    legacy = _time(legacy_extract, snippets, args.repeat)
+    engine = _time(extract_date_and_distance, snippets, args.repeat)
+    for label, elapsed in (("legacy", legacy), ("compiled", engine)):
+        print(
+            f"{label:<9} {len(snippets)} snippets  {elapsed:6.2f}s  "
+            f"{elapsed / len(snippets) * 1e6:7.2f} us/snippet  "
+            f"{len(snippets) / elapsed:10.0f} snippets/s"
+        )
+    print(f"speedup {legacy / engine:.1f}x, results identical")
+
+    items = generate_items(args.snippets)
+    expected = [extract_item(item) for item in items]
+    for label, workers in (("batch x1", 1), ("batch", args.workers)):
+        started = time.perf_counter()
+        results = list(extract_events_batch(items, workers=workers))
+        elapsed = time.perf_counter() - started
+        if results != expected:
+            raise SystemExit(f"{label} results differ from per-item extraction")
+        rate = len(items) / elapsed
+        print(f"{label:<9} {len(items)} items     {elapsed:6.2f}s  {rate:10.0f} items/s")
+
+
+if __name__ == "__main__":
+    main()
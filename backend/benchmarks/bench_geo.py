@@ -0,0 +1,99 @@
+"""Location resolution and radius filtering with the offline gazetteer.
+
+Reports the cost of resolving a location cold and memoized, of a k-d tree
+radius query against a scan of every place, and of ordering a page of
+events by distance from a city. ``--places`` adds random places, to see
+how the radius query scales with a full postal code file.
+
+Usage (from ``backend/``)::
+
+    RUNON_GAZETTEER_PATH=tests/data/gazetteer.csv \
+        python -m benchmarks.bench_geo --events 100 --radius 100 --places 40000
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+
+from benchmarks.bench_event_ids import event_fields
+from benchmarks.corpus import CITIES
+from functions.event_discovery.geo import (
+    Gazetteer,
+    Place,
+    get_gazetteer,
+    haversine_km,
+    sort_by_proximity,
+)
+from models.event import Event
+
+
+def _best_us(fn: Callable[[], object], repeat: int, loops: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best * 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--radius", type=float, default=100)
+    parser.add_argument("--places", type=int, default=0, help="Random places to add")
+    parser.add_argument("--loops", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        parser.error("set RUNON_GAZETTEER_PATH to a gazetteer CSV file")
+    if args.places:
+        # Scattered over the contiguous US, like a postal code export
+        rng = np.random.default_rng(0)
+        extra = [
+            Place(f"Place {n}", "", "US", "", float(lat), float(lon), 0)
+            for n, (lat, lon) in enumerate(
+                zip(rng.uniform(25, 49, args.places), rng.uniform(-124, -67, args.places))
+            )
+        ]
+        gazetteer = Gazetteer(gazetteer.places + extra)
+    origin = gazetteer.resolve("Boston, MA")
+    rows = event_fields(args.events)
+    for n, row in enumerate(rows):
+        # Events are placed by the place their text names
+        row["description"] = f"Downtown, {CITIES[n % len(CITIES)]}"
+    events = Event.construct_many(rows)
+
+    def scan():
+        distances = haversine_km(
+            origin.latitude, origin.longitude, gazetteer.latitudes, gazetteer.longitudes
+        )
+        return np.flatnonzero(distances <= args.radius)
+
+    cases = [
+        # The uncached lookup behind resolve
+        ("resolve cold", lambda: gazetteer._resolve("Central Park, New York, NY")),
+        ("resolve memoized", lambda: gazetteer.resolve("Central Park, New York, NY")),
+        (
+            "radius k-d tree",
+            lambda: gazetteer.within(origin.latitude, origin.longitude, args.radius),
+        ),
+        ("radius scan", scan),
+        (
+            f"sort {len(events)} events",
+            lambda: sort_by_proximity(events, origin, args.radius, gazetteer),
+        ),
+    ]
+    print(f"{len(gazetteer)} places; radius {args.radius:g} km around {origin.name}")
+    print(f"{'operation':<20} {'us':>9}")
+    for label, fn in cases:
+        print(f"{label:<20} {_best_us(fn, args.repeat, args.loops):9.1f}")
+
+
+if __name__ == "__main__":
+    main()
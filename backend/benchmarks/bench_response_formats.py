@@ -0,0 +1,82 @@
+"""Payload size and encode time of each /events/search response format.
+
+Compares the previous FastAPI path (pydantic serialization plus json.dumps)
+with the orjson and msgpack encoders, each uncompressed and with every
+available content coding, then the orjson and msgpack encoders limited to
+the ``--fields`` a list view needs.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_response_formats --events 100 --fields name,date,distance
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from benchmarks.bench_event_ids import event_fields
+from functions.event_discovery import formats
+from models.event import Event
+
+_EVENTS = TypeAdapter(List[Event])
+
+
+def pydantic_json(events: List[Event]) -> bytes:
+    """Encode events as FastAPI did for a ``List[Event]`` response model."""
+    content = _EVENTS.dump_python(events, mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _best_us(fn: Callable[[], object], repeat: int, loops: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best * 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--loops", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--fields", default="name,date,distance")
+    args = parser.parse_args()
+    fields = formats.parse_fields(args.fields)
+
+    events = Event.construct_many(event_fields(args.events))
+    if json.loads(formats.encode_json(events)) != json.loads(pydantic_json(events)):
+        raise SystemExit("orjson output differs from pydantic")
+    if [e.id for e in formats.decode_msgpack(formats.encode_msgpack(events))] != [
+        e.id for e in events
+    ]:
+        raise SystemExit("msgpack round trip lost events")
+
+    encoders = [
+        ("pydantic json", pydantic_json),
+        ("orjson", formats.encode_json),
+        ("msgpack", formats.encode_msgpack),
+        ("orjson fields", lambda events: formats.encode_json(events, fields)),
+        ("msgpack fields", lambda events: formats.encode_msgpack(events, fields)),
+    ]
+    print(f"{len(events)} events; compression above {formats.COMPRESS_MIN_BYTES} bytes")
+    print(f"fields: {', '.join(fields)}")
+    print(f"{'format':<22} {'bytes':>8} {'encode us':>10}")
+    for label, encode in encoders:
+        for encoding in (None,) + formats.ENCODINGS:
+            name = label if encoding is None else f"{label} + {encoding}"
+            body, _ = formats.compress(encode(events), encoding)
+            elapsed = _best_us(
+                lambda: formats.compress(encode(events), encoding), args.repeat, args.loops
+            )
+            print(f"{name:<22} {len(body):8d} {elapsed:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Time to first event of streamed searches against whole-result searches.
+
+Runs unique queries against a local fake Custom Search server, once
+through ``search_running_events``, whose first event is only available
+when every page is merged, and once through ``stream_running_events``.
+Reports the median time to the first and the last event and the peak
+memory allocated while each search runs.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_stream --queries 20 --max-results 50 --latency 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Iterable, List, Tuple
+
+from benchmarks.fake_cse import FakeCustomSearchServer
+from functions.event_discovery import client, search
+from functions.event_discovery.quota import QuotaScheduler
+from functions.event_discovery.search import search_running_events, stream_running_events
+from models.event import Event
+
+
+def _measure(run: Callable[[], Iterable[Event]]) -> Tuple[float, float, int]:
+    """Time a search to its first and last event and get its peak allocation."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    first = None
+    for _ in run():
+        if first is None:
+            first = time.perf_counter() - started
+    last = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (first if first is not None else last) * 1000, last * 1000, peak
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--max-results", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with FakeCustomSearchServer(latency=args.latency) as fake:
+        os.environ.update(
+            {
+                "RUNON_SEARCH_API_URL": fake.url,
+                "RUNON_API_KEY": "bench-key",
+                "RUNON_SEARCH_ENGINE_ID": "bench-cx",
+            }
+        )
+        client.init_client()
+        # Measure the pipeline, not the Custom Search rate limit or the index
+        search._quota = QuotaScheduler(rate=1e6, burst=10**6, daily_budget=10**9)
+        search._index = None
+        try:
+            print(f"upstream latency={args.latency * 1000:.0f}ms max_results={args.max_results}")
+            print(f"{'mode':<8} {'first ms':>9} {'last ms':>9} {'peak KiB':>9}")
+            for label, fn in (("search", search_running_events), ("stream", stream_running_events)):
+                samples: List[Tuple[float, float, int]] = []
+                for n in range(args.queries):
+                    # Unique queries so every page goes upstream
+                    query = f"{label} {n} 5k"
+                    # The search module logs every upstream call; keep the report readable
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        samples.append(_measure(lambda: fn(query, max_results=args.max_results)))
+                first, last, peak = (statistics.median(column) for column in zip(*samples))
+                print(f"{label:<8} {first:9.1f} {last:9.1f} {peak / 1024:9.1f}")
+        finally:
+            client.close_client()
+
+
+if __name__ == "__main__":
+    main()
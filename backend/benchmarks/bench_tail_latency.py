@@ -0,0 +1,93 @@
+"""Tail latency of Custom Search requests with timeouts, retries and hedging.
+
+Sends the same load to a local fake server that injects slow responses and
+503 errors, once per strategy, and reports success rate, attempts per
+request and p50/p95/p99 latency.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_tail_latency --requests 400 --slow-rate 0.05
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import requests
+
+from benchmarks.fake_cse import FakeCustomSearchServer
+from functions.event_discovery.client import _create_session
+from functions.event_discovery.retry import RetryingCaller, RetryPolicy
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return statistics.quantiles(values, n=100)[int(q * 100) - 1]
+
+
+def _run(url: str, caller: RetryingCaller, count: int, concurrency: int) -> Tuple:
+    session = _create_session(concurrency * 2)
+
+    def one(index: int) -> Tuple[float, bool]:
+        params = {"q": f"bench {index % 50}", "num": 10}
+        started = time.perf_counter()
+        try:
+            response = caller.call(lambda timeout: session.get(url, params=params, timeout=timeout))
+            ok = response.status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(count)))
+    session.close()
+    caller.close()
+    return [latency for latency, _ in results], sum(ok for _, ok in results)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=0.5, help="read timeout per attempt")
+    args = parser.parse_args()
+
+    strategies = [
+        ("single", RetryPolicy(max_attempts=1, read_timeout=30)),
+        ("retry", RetryPolicy(max_attempts=3, read_timeout=args.timeout, backoff_base=0.05)),
+        (
+            "retry+hedge",
+            RetryPolicy(max_attempts=3, read_timeout=args.timeout, backoff_base=0.05, hedge=True),
+        ),
+    ]
+    print(
+        f"latency={args.latency * 1000:.0f}ms slow={args.slow_rate:.0%}@{args.slow_latency}s "
+        f"errors={args.error_rate:.0%} concurrency={args.concurrency}"
+    )
+    for label, policy in strategies:
+        fake = FakeCustomSearchServer(
+            latency=args.latency,
+            slow_rate=args.slow_rate,
+            slow_latency=args.slow_latency,
+            error_rate=args.error_rate,
+        )
+        caller = RetryingCaller(policy, hedge_workers=args.concurrency * 2)
+        with fake:
+            latencies, ok = _run(fake.url, caller, args.requests, args.concurrency)
+        ms = [latency * 1000 for latency in latencies]
+        attempts = fake.request_count / len(ms)
+        print(
+            f"{label:<12} ok={ok / len(ms):6.1%}  attempts/req={attempts:4.2f}  "
+            f"p50={_percentile(ms, 0.5):7.1f}ms  p95={_percentile(ms, 0.95):7.1f}ms  "
+            f"p99={_percentile(ms, 0.99):7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Per-request auth cost with the verified-token cache hit and missed.
+
+Runs the ``verify_token`` dependency and ``verify_google_id_token`` on a
+locally minted ID token, with signing keys from a local JWKS server
+already in memory, so a miss is the signature check plus claim
+validation and a hit is the token cache lookup alone.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_token_cache --loops 2000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable
+
+from benchmarks.fake_jwks import FakeJwksServer
+from functions.auth import auth
+from functions.auth.auth import get_token_cache, verify_google_id_token
+from functions.auth.verifier import GoogleCerts, GoogleIdTokenVerifier
+
+CLIENT_ID = "bench-client-id"
+
+
+def _best_us(fn: Callable[[], object], repeat: int, loops: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best * 1e6
+
+
+async def _best_us_async(fn: Callable[[], Awaitable[object]], repeat: int, loops: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            await fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best * 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--loops", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ["RUNON_CLIENT_ID"] = CLIENT_ID
+    # Measure verification, not the debug log of every success
+    logging.disable(logging.DEBUG)
+    from main import verify_token
+
+    cache = get_token_cache()
+    with FakeJwksServer(audience=CLIENT_ID) as server:
+        auth._verifier = GoogleIdTokenVerifier(GoogleCerts(server.url))
+        token = server.mint()
+        header = f"Bearer {token}"
+        verify_google_id_token(token)
+
+        def missed(fn):
+            # Forget the token first, so every call verifies it again
+            def run():
+                cache.clear()
+                return fn()
+
+            return run
+
+        sync_hit = _best_us(lambda: verify_google_id_token(token), args.repeat, args.loops)
+        sync_miss = _best_us(missed(lambda: verify_google_id_token(token)), args.repeat, args.loops)
+        dep_hit = asyncio.run(_best_us_async(lambda: verify_token(header), args.repeat, args.loops))
+        dep_miss = asyncio.run(
+            _best_us_async(missed(lambda: verify_token(header)), args.repeat, args.loops)
+        )
+        auth.close_verifier()
+
+    print(f"{'entry point':<24} {'hit us':>9} {'miss us':>9} {'speedup':>8}")
+    for label, hit, miss in (
+        ("verify_google_id_token", sync_hit, sync_miss),
+        ("verify_token", dep_hit, dep_miss),
+    ):
+        print(f"{label:<24} {hit:9.1f} {miss:9.1f} {miss / hit:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
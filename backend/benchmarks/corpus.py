@@ -0,0 +1,104 @@
+"""Synthetic Custom Search items that look like real race listings."""
+
+import random
+from typing import Dict, List
+
+CITIES = [
+    "Boston",
+    "Chicago",
+    "Denver",
+    "Austin",
+    "Seattle",
+    "Portland",
+    "Atlanta",
+    "Miami",
+    "San Diego",
+    "Minneapolis",
+    "Raleigh",
+    "Salt Lake City",
+    "Nashville",
+    "Columbus",
+]
+RACES = [
+    "5K",
+    "10K",
+    "Half Marathon",
+    "Marathon",
+    "Trail Run",
+    "Fun Run",
+    "Turkey Trot",
+    "Color Run",
+    "Relay",
+    "halfmarathon",
+    "5k Walk/Run",
+    "Ultra",
+]
+MONTHS = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+FILLERS = [
+    "Registration is open now, space is limited.",
+    "Packet pickup the day before at the expo.",
+    "Chip timed course with medals for all finishers.",
+    "Proceeds benefit the local food bank.",
+    "Course map, parking and results available online.",
+    "Early bird pricing ends soon!",
+    "Kids dash and post-race party included.",
+]
+
+
+def _date_text(rng: random.Random) -> str:
+    year = rng.choice([2024, 2025, 2026])
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 31 if rng.random() < 0.97 else 35)
+    style = rng.random()
+    if style < 0.45:
+        return f"{MONTHS[month - 1]} {day}, {year}"
+    if style < 0.6:
+        return f"{day} {MONTHS[month - 1]} {year}"
+    if style < 0.75:
+        return f"{month:02d}/{day:02d}/{year}"
+    if style < 0.85:
+        return f"{year}-{month:02d}-{day:02d}"
+    return rng.choice(["this spring", "Saturday morning", "next month", "TBD"])
+
+
+def make_item(rng: random.Random, index: int) -> Dict[str, str]:
+    """Build one realistic search result item."""
+    city = rng.choice(CITIES)
+    race = rng.choice(RACES)
+    title = f"{city} {race}" + (f" {rng.choice([2024, 2025])}" if rng.random() < 0.5 else "")
+    snippet = " ".join(
+        [
+            f"Join us {_date_text(rng)} for the annual {city} {race.lower()}.",
+            rng.choice(FILLERS),
+            rng.choice(FILLERS),
+        ]
+    )
+    return {
+        "title": title,
+        "snippet": snippet,
+        "link": f"https://races.example.com/{city.lower().replace(' ', '-')}/{index}",
+    }
+
+
+def generate_items(count: int, seed: int = 7) -> List[Dict[str, str]]:
+    """Generate ``count`` deterministic search result items."""
+    rng = random.Random(seed)
+    return [make_item(rng, i) for i in range(count)]
+
+
+def generate_snippets(count: int, seed: int = 7) -> List[str]:
+    """Generate title plus snippet texts as the search loop builds them."""
+    return [f"{item['title']} {item['snippet']}" for item in generate_items(count, seed)]
@@ -0,0 +1,143 @@
+"""Local stand-in for the Google Custom Search API used by benchmarks."""
+
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+CITIES = ["Boston", "Chicago", "Denver", "Austin", "Seattle", "Portland", "Atlanta", "Miami"]
+RACES = ["5K", "10K", "Half Marathon", "Marathon", "Trail Run", "Fun Run"]
+MONTHS = ["March", "April", "May", "June", "September", "October", "November"]
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that time out close their connection mid-response
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_item(query: str, index: int) -> Dict[str, str]:
+    """Build a deterministic, realistic-looking search result item."""
+    rng = random.Random(f"{query}:{index}")
+    city = rng.choice(CITIES)
+    race = rng.choice(RACES)
+    month = rng.choice(MONTHS)
+    day = rng.randint(1, 28)
+    year = 2030 + rng.randint(0, 2)
+    return {
+        "title": f"{city} {race} {year}",
+        "snippet": (
+            f"Join us on {month} {day}, {year} for the annual {city} {race}. "
+            "Registration is open now, space is limited."
+        ),
+        "link": f"https://races.example.com/{city.lower()}/{index}",
+    }
+
+
+def make_response(query: str, start: int = 1, num: int = 10, total: int = 100) -> Dict:
+    """Build a Custom Search response page for ``query``."""
+    last = min(start + num, total + 1)
+    items: List[Dict[str, str]] = [make_item(query, i) for i in range(start, last)]
+    return {"items": items} if items else {}
+
+
+class FakeCustomSearchServer:
+    """Threaded HTTP server that mimics Custom Search with injectable faults.
+
+    Args:
+        latency: Base response latency in seconds
+        slow_rate: Fraction of requests that get ``slow_latency`` instead
+        slow_latency: Latency in seconds for slow requests
+        error_rate: Fraction of requests answered with ``error_status``
+        error_status: HTTP status used for injected errors
+        total_results: Number of results available for every query
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        slow_rate: float = 0.0,
+        slow_latency: float = 1.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        total_results: int = 100,
+    ):
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.total_results = total_results
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._rng = random.Random(42)
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/customsearch/v1"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with fake._count_lock:
+                    fake.request_count += 1
+                    roll = fake._rng.random()
+                    slow = fake._rng.random() < fake.slow_rate
+                time.sleep(fake.slow_latency if slow else fake.latency)
+
+                if roll < fake.error_rate:
+                    status, body = fake.error_status, {"error": {"code": fake.error_status}}
+                else:
+                    params = parse_qs(urlparse(self.path).query)
+                    query = params.get("q", [""])[0]
+                    start = int(params.get("start", ["1"])[0])
+                    num = int(params.get("num", ["10"])[0])
+                    status = 200
+                    body = make_response(query, start, num, fake.total_results)
+
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self) -> "FakeCustomSearchServer":
+        """Start serving on an ephemeral localhost port."""
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> "FakeCustomSearchServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
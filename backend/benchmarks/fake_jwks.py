@@ -0,0 +1,138 @@
+"""Local stand-in for Google's token signing keys, with locally minted ID tokens."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+ISSUER = "https://accounts.google.com"
+
+
+class FakeJwksServer:
+    """Threaded HTTP server publishing a JWKS, and the private keys to sign with.
+
+    Args:
+        max_age: Cache-Control max-age of the JWKS response, or None to omit it
+        audience: Client ID that minted tokens are issued for
+    """
+
+    def __init__(self, max_age: Optional[int] = 3600, audience: str = "test-client-id"):
+        self.max_age = max_age
+        self.audience = audience
+        self.request_count = 0
+        self._keys: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.rotate()
+
+    @property
+    def url(self) -> str:
+        """URL of the JWKS of the running server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/oauth2/v3/certs"
+
+    @property
+    def kid(self) -> str:
+        """ID of the key new tokens are signed with."""
+        return self._keys[-1]["kid"]
+
+    def rotate(self) -> str:
+        """Add a new signing key, as Google does a few times a month.
+
+        Returns:
+            str: ID of the new key
+        """
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        with self._lock:
+            kid = f"key-{len(self._keys) + 1}"
+            self._keys.append({"kid": kid, "private_key": private_key})
+        return kid
+
+    def jwks(self) -> Dict[str, Any]:
+        """Public keys in JWKS form."""
+        with self._lock:
+            keys = list(self._keys)
+        return {
+            "keys": [
+                {
+                    **RSAAlgorithm.to_jwk(key["private_key"].public_key(), as_dict=True),
+                    "kid": key["kid"],
+                    "use": "sig",
+                    "alg": "RS256",
+                }
+                for key in keys
+            ]
+        }
+
+    def mint(self, kid: Optional[str] = None, lifetime: float = 3600, **claims: Any) -> str:
+        """Sign an ID token like one Google issues to the client.
+
+        Args:
+            kid: Key to sign with; default the newest
+            lifetime: Seconds until the token expires
+            **claims: Claims to add or override; None removes a claim
+
+        Returns:
+            str: Encoded token
+        """
+        kid = kid or self.kid
+        private_key = next(key["private_key"] for key in self._keys if key["kid"] == kid)
+        now = int(time.time())
+        payload = {
+            "iss": ISSUER,
+            "aud": self.audience,
+            "sub": "1234567890",
+            "email": "runner@example.com",
+            "iat": now,
+            "exp": now + int(lifetime),
+            **claims,
+        }
+        payload = {name: value for name, value in payload.items() if value is not None}
+        return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.request_count += 1
+                payload = json.dumps(fake.jwks()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if fake.max_age is not None:
+                    self.send_header("Cache-Control", f"public, max-age={fake.max_age}")
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self) -> "FakeJwksServer":
+        """Start serving on an ephemeral localhost port."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> "FakeJwksServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
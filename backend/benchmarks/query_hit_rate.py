@@ -0,0 +1,107 @@
+"""Replay a query log and report the cache hit rate gained by canonicalization.
+
+Each log line is a query, optionally followed by a tab and a location.
+Without ``--log`` a synthetic log of spelling variants is generated.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.query_hit_rate --log queries.tsv --max-entries 1024
+"""
+
+import argparse
+import random
+from datetime import timedelta
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from benchmarks.corpus import CITIES
+from functions.event_discovery.cache import SearchCache
+from functions.event_discovery.query import canonicalize_location, canonicalize_query
+
+Query = Tuple[str, Optional[str]]
+
+_RACES = ["5K", "5k", "5 km", "10K", "10km", "half", "Half Marathon", "marathon", "Marathons"]
+_TEMPLATES = [
+    "{city} {race}",
+    "{race} {city}",
+    "{race} in {city}",
+    "{city}  {race}",
+    "{race} near {city}",
+]
+
+
+def read_log(path: str) -> List[Query]:
+    """Read ``query[<TAB>location]`` lines, skipping blank ones."""
+    queries = []
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            query, _, location = line.rstrip("\n").partition("\t")
+            if query.strip():
+                queries.append((query, location or None))
+    return queries
+
+
+def synthetic_log(count: int, seed: int = 7) -> List[Query]:
+    """Generate a skewed log where popular searches recur in many spellings."""
+    rng = random.Random(seed)
+    cities = CITIES[:]
+    weights = [1 / rank for rank in range(1, len(cities) + 1)]
+    queries = []
+    for _ in range(count):
+        city = rng.choices(cities, weights)[0]
+        city = rng.choice([city, city.lower(), city.upper()])
+        template = rng.choice(_TEMPLATES)
+        queries.append((template.format(city=city, race=rng.choice(_RACES)), None))
+    return queries
+
+
+def replay(queries: Iterable[Query], key: Callable[[Query], str], max_entries: int) -> dict:
+    """Replay queries against a bounded cache that never expires entries."""
+    cache: SearchCache[bool] = SearchCache(
+        ttl=timedelta(days=365), max_entries=max_entries, sizeof=lambda value: 1
+    )
+    keys = set()
+    for query in queries:
+        cache_key = key(query)
+        keys.add(cache_key)
+        if cache.get(cache_key) is None:
+            cache.set(cache_key, True)
+    stats = cache.stats()
+    total = stats["hits"] + stats["misses"]
+    return {
+        "requests": total,
+        "unique_keys": len(keys),
+        "hits": stats["hits"],
+        "hit_rate": stats["hits"] / total if total else 0.0,
+    }
+
+
+def _raw_key(query: Query) -> str:
+    return f"{query[0]}:{query[1] or ''}"
+
+
+def _canonical_key(query: Query) -> str:
+    return f"{canonicalize_query(query[0])}:{canonicalize_location(query[1])}"
+
+
+def main() -> None:
+    """Run the report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--log", help="query log, one query[<TAB>location] per line")
+    parser.add_argument("--synthetic", type=int, default=10_000, help="queries to generate")
+    parser.add_argument("--max-entries", type=int, default=1024)
+    args = parser.parse_args()
+
+    queries = read_log(args.log) if args.log else synthetic_log(args.synthetic)
+    raw = replay(queries, _raw_key, args.max_entries)
+    canonical = replay(queries, _canonical_key, args.max_entries)
+    for label, report in (("raw", raw), ("canonical", canonical)):
+        print(
+            f"{label:<10} {report['requests']} requests  {report['unique_keys']:6d} keys  "
+            f"{report['hits']:6d} hits  hit rate {report['hit_rate']:6.1%}"
+        )
+    saved = canonical["hits"] - raw["hits"]
+    print(f"hit rate +{canonical['hit_rate'] - raw['hit_rate']:.1%}, {saved} upstream calls saved")
+
+
+if __name__ == "__main__":
+    main()
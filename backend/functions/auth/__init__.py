@@ -1,5 +1,5 @@
 """Auth package initialization."""
 
-from .auth import verify_google_id_token
+from .auth import verify_google_id_token, verify_google_id_token_async
 
-__all__ = ["verify_google_id_token"]
+__all__ = ["verify_google_id_token", "verify_google_id_token_async"]
@@ -1,15 +1,51 @@
 """Authentication functionality."""
 
 import logging
-
-from google.auth.transport import requests
-from google.oauth2 import id_token
+import threading
+from typing import Optional
 
 from config.environment import Environment
+from functions.auth.token_cache import VerifiedTokenCache
+from functions.auth.verifier import GoogleCerts, GoogleIdTokenVerifier
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+_lock = threading.Lock()
+_verifier: Optional[GoogleIdTokenVerifier] = None
+# Tokens already verified, so a session's repeated token skips the signature check
+_token_cache = VerifiedTokenCache()
+
+
+def get_verifier() -> GoogleIdTokenVerifier:
+    """Get the shared verifier, whose signing keys and session outlive a request."""
+    global _verifier
+    with _lock:
+        if _verifier is None:
+            _verifier = GoogleIdTokenVerifier(GoogleCerts())
+        return _verifier
+
+
+def close_verifier() -> None:
+    """Close the shared verifier's pooled connections."""
+    global _verifier
+    with _lock:
+        verifier, _verifier = _verifier, None
+    if verifier is not None:
+        verifier.certs.close()
+
+
+def get_token_cache() -> VerifiedTokenCache:
+    """Get the cache of verified tokens shared by every entry point."""
+    return _token_cache
+
+
+def _get_client_id() -> str:
+    try:
+        return Environment.get_required("RUNON_CLIENT_ID")
+    except Exception as e:
+        raise ValueError(f"Invalid token: {str(e)}")
+
 
 def verify_google_id_token(token: str) -> dict:
     """Verify Google ID token and return payload.
@@ -23,17 +59,45 @@ def verify_google_id_token(token: str) -> dict:
     Raises:
         ValueError: If token is invalid
     """
+    client_id = _get_client_id()
+    cached = _token_cache.get(token, client_id)
+    if cached is not None:
+        return cached
     try:
-        client_id = Environment.get_required("RUNON_CLIENT_ID")
-        logger.debug(f"Using client_id: {client_id[:10]}...")
-        logger.debug(f"Token received: {token[:10]}...")
-
-        request = requests.Request()
-        idinfo = id_token.verify_oauth2_token(token, request, client_id)
-        logger.debug(f"Token verification successful: {str(idinfo)[:100]}...")
-        return idinfo
-    except Exception as e:
+        idinfo = get_verifier().verify(token, client_id)
+    except ValueError as e:
+        logger.error(f"Token verification failed: {str(e)}")
+        raise ValueError(f"Invalid token: {str(e)}")
+    logger.debug(f"Token verification successful for subject {idinfo['sub']}")
+    _token_cache.put(token, client_id, idinfo)
+    return idinfo
+
+
+async def verify_google_id_token_async(token: str) -> dict:
+    """Verify Google ID token without blocking the event loop.
+
+    For FastAPI dependencies: tokens verified before are answered from the
+    token cache, the signature is checked inline against keys in memory,
+    and only fetching the keys runs on a worker thread.
+
+    Args:
+        token: The Google ID token to verify
+
+    Returns:
+        dict: The decoded token payload
+
+    Raises:
+        ValueError: If token is invalid
+    """
+    client_id = _get_client_id()
+    cached = _token_cache.get(token, client_id)
+    if cached is not None:
+        return cached
+    try:
+        idinfo = await get_verifier().verify_async(token, client_id)
+    except ValueError as e:
         logger.error(f"Token verification failed: {str(e)}")
-        logger.error(f"Token: {token[:10]}...")
-        logger.error(f"Client ID: {client_id[:10]}...")
         raise ValueError(f"Invalid token: {str(e)}")
+    logger.debug(f"Token verification successful for subject {idinfo['sub']}")
+    _token_cache.put(token, client_id, idinfo)
+    return idinfo
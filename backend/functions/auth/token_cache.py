@@ -0,0 +1,114 @@
+"""Bounded cache of verified ID tokens, so repeated tokens skip signature checks."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from config.environment import Environment
+
+# Distinct tokens remembered; a mobile session reuses one token until it expires
+TOKEN_CACHE_SIZE = int(Environment.get("RUNON_TOKEN_CACHE_SIZE") or 4096)
+# Seconds before a token's exp at which it must be verified again
+TOKEN_CACHE_MARGIN = float(Environment.get("RUNON_TOKEN_CACHE_MARGIN") or 60)
+
+
+def token_key(token: Union[str, bytes], audience: Union[str, List[str]]) -> bytes:
+    """Hash a token with the audience it was verified for.
+
+    Only digests are kept, so the cache never holds usable credentials, and
+    a token verified for one client ID is not accepted for another.
+    """
+    if isinstance(token, str):
+        token = token.encode()
+    if not isinstance(audience, str):
+        audience = " ".join(audience)
+    return hashlib.blake2b(audience.encode() + b"\0" + token, digest_size=32).digest()
+
+
+class VerifiedTokenCache:
+    """Thread-safe LRU map of token hashes to their verified payloads.
+
+    An entry is served until the token's ``exp`` minus ``margin``, after
+    which the token is verified again; tokens that would expire within the
+    margin are not cached. The least recently used entry is evicted once
+    ``max_entries`` is reached.
+
+    Args:
+        max_entries: Maximum number of tokens
+        margin: Seconds before expiry to stop serving a token
+        clock: Wall-clock time source in epoch seconds, as ``exp`` is
+    """
+
+    def __init__(
+        self,
+        max_entries: int = TOKEN_CACHE_SIZE,
+        margin: float = TOKEN_CACHE_MARGIN,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.margin = margin
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, token: Union[str, bytes], audience: Union[str, List[str]]
+    ) -> Optional[Dict[str, Any]]:
+        """Get the payload of a token verified for ``audience``, if still valid.
+
+        Returns:
+            Optional[Dict[str, Any]]: A copy of the payload, or None on a miss
+        """
+        key = token_key(token, audience)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            payload, valid_until = entry
+            if self._clock() >= valid_until:
+                del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return dict(payload)
+
+    def put(
+        self, token: Union[str, bytes], audience: Union[str, List[str]], payload: Dict[str, Any]
+    ) -> None:
+        """Remember a verified token until its ``exp`` minus the margin."""
+        valid_until = float(payload.get("exp", 0)) - self.margin
+        if self._clock() >= valid_until or self.max_entries <= 0:
+            return
+        key = token_key(token, audience)
+        with self._lock:
+            self._entries[key] = (dict(payload), valid_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Forget every token. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters for monitoring."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
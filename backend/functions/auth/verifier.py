@@ -0,0 +1,282 @@
+"""Google ID token verification against cached, pre-parsed signing keys."""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+
+import jwt
+import requests
+from jwt.api_jwk import PyJWK, PyJWKSet
+from requests.adapters import HTTPAdapter
+
+from config.environment import Environment
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+# JWKS endpoint, overridable for local testing
+CERTS_URL = Environment.get("RUNON_GOOGLE_CERTS_URL") or GOOGLE_CERTS_URL
+# Seconds keys are kept when the response has no max-age
+CERTS_DEFAULT_MAX_AGE = float(Environment.get("RUNON_CERTS_DEFAULT_MAX_AGE") or 3600)
+# Keys are refreshed in the background once they expire within this many seconds
+CERTS_REFRESH_LEAD = float(Environment.get("RUNON_CERTS_REFRESH_LEAD") or 300)
+# Least seconds between refreshes forced by tokens signed with an unknown key
+CERTS_MIN_REFRESH_INTERVAL = float(Environment.get("RUNON_CERTS_MIN_REFRESH_INTERVAL") or 30)
+CERTS_TIMEOUT = float(Environment.get("RUNON_CERTS_TIMEOUT") or 5)
+# Seconds of clock difference tolerated when checking exp and iat
+TOKEN_CLOCK_SKEW = float(Environment.get("RUNON_TOKEN_CLOCK_SKEW") or 10)
+
+_MAX_AGE = re.compile(r"max-age=(\d+)", re.IGNORECASE)
+
+
+class KeySet(NamedTuple):
+    """Parsed signing keys by key ID and when they must be fetched again."""
+
+    keys: Dict[str, PyJWK]
+    fetched_at: float
+    expires_at: float
+
+
+def max_age(headers: Any, default: float) -> float:
+    """Get how long a response may be cached from its Cache-Control and Age headers."""
+    match = _MAX_AGE.search(headers.get("Cache-Control") or "")
+    if match is None:
+        return default
+    try:
+        age = float(headers.get("Age") or 0)
+    except ValueError:
+        age = 0.0
+    return max(float(match.group(1)) - age, 0.0)
+
+
+def _create_session() -> requests.Session:
+    """Create a keep-alive session for the certs endpoint."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class GoogleCerts:
+    """Google's token signing keys, fetched once and kept while the response allows.
+
+    Keys are parsed when fetched, so a verification only looks one up by
+    key ID. They are kept for the max-age of the certs response and
+    refreshed in the background shortly before that runs out; only a
+    first fetch, or one after the keys expired, blocks. A token signed with
+    an unknown key triggers a refresh, at most once per
+    ``min_refresh_interval``, to pick up rotated keys. Thread-safe.
+
+    Args:
+        url: JWKS endpoint
+        session: Pooled session to fetch with; one is created if not given
+        default_max_age: Seconds to keep keys when the response has no max-age
+        refresh_lead: Seconds before expiry to refresh in the background
+        min_refresh_interval: Least seconds between refreshes for unknown keys
+        timeout: Seconds to wait for the endpoint
+        clock: Time source in seconds
+    """
+
+    def __init__(
+        self,
+        url: str = CERTS_URL,
+        session: Optional[requests.Session] = None,
+        default_max_age: float = CERTS_DEFAULT_MAX_AGE,
+        refresh_lead: float = CERTS_REFRESH_LEAD,
+        min_refresh_interval: float = CERTS_MIN_REFRESH_INTERVAL,
+        timeout: float = CERTS_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.url = url
+        self.default_max_age = default_max_age
+        self.refresh_lead = refresh_lead
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._session = session
+        self._clock = clock
+        # Held while fetching, so concurrent callers share one fetch
+        self._lock = threading.Lock()
+        self._schedule_lock = threading.Lock()
+        self._keyset: Optional[KeySet] = None
+        self._refreshing: Optional[threading.Thread] = None
+        self._fetches = 0
+        self._failures = 0
+
+    def _get_session(self) -> requests.Session:
+        if self._session is None:
+            self._session = _create_session()
+        return self._session
+
+    def _fetch(self) -> KeySet:
+        """Download and parse the keys."""
+        try:
+            response = self._get_session().get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            jwks = PyJWKSet.from_dict(response.json())
+        except (requests.RequestException, ValueError, jwt.PyJWTError) as e:
+            self._failures += 1
+            raise ValueError(f"Could not fetch token signing keys: {e}")
+        self._fetches += 1
+        keys = {key.key_id: key for key in jwks.keys if key.public_key_use in ("sig", None)}
+        now = self._clock()
+        expires_at = now + max_age(response.headers, self.default_max_age)
+        return KeySet(keys, fetched_at=now, expires_at=expires_at)
+
+    def refresh(self, stale: Optional[KeySet] = None) -> KeySet:
+        """Fetch the keys, unless another caller already replaced ``stale``.
+
+        Args:
+            stale: Key set the caller found unusable
+
+        Returns:
+            KeySet: Current keys
+
+        Raises:
+            ValueError: If the keys cannot be fetched
+        """
+        with self._lock:
+            if self._keyset is not stale:
+                return self._keyset
+            self._keyset = self._fetch()
+            return self._keyset
+
+    def _refresh_in_background(self, stale: KeySet) -> None:
+        try:
+            self.refresh(stale)
+        except ValueError as e:
+            # The current keys stay in use until they expire
+            logger.warning(str(e))
+
+    def _schedule_refresh(self, stale: KeySet) -> None:
+        with self._schedule_lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+            self._refreshing = threading.Thread(
+                target=self._refresh_in_background,
+                args=(stale,),
+                name="runon-certs-refresh",
+                daemon=True,
+            )
+            self._refreshing.start()
+
+    def needs_fetch(self, kid: Optional[str]) -> bool:
+        """Check whether finding key ``kid`` would block on a fetch."""
+        keyset = self._keyset
+        if keyset is None or self._clock() >= keyset.expires_at:
+            return True
+        return kid not in keyset.keys and self._may_refresh(keyset)
+
+    def _may_refresh(self, keyset: KeySet) -> bool:
+        return self._clock() - keyset.fetched_at >= self.min_refresh_interval
+
+    def key(self, kid: Optional[str]) -> PyJWK:
+        """Find the signing key with ID ``kid``.
+
+        Raises:
+            ValueError: If there is no such key or the keys cannot be fetched
+        """
+        keyset = self._keyset
+        now = self._clock()
+        if keyset is None or now >= keyset.expires_at:
+            keyset = self.refresh(keyset)
+        elif now >= keyset.expires_at - self.refresh_lead:
+            self._schedule_refresh(keyset)
+        found = keyset.keys.get(kid)
+        if found is None and self._may_refresh(keyset):
+            found = self.refresh(keyset).keys.get(kid)
+        if found is None:
+            raise ValueError(f"Unknown token signing key: {kid!r}")
+        return found
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Wait for a background refresh to finish."""
+        thread = self._refreshing
+        if thread is not None:
+            thread.join(timeout)
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.wait()
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get key cache state for monitoring."""
+        keyset = self._keyset
+        return {
+            "keys": len(keyset.keys) if keyset else 0,
+            "expires_in": keyset.expires_at - self._clock() if keyset else None,
+            "fetches": self._fetches,
+            "failures": self._failures,
+        }
+
+
+class GoogleIdTokenVerifier:
+    """Verify Google ID tokens: signature, issuer, audience and lifetime.
+
+    Args:
+        certs: Signing keys
+        issuers: Accepted ``iss`` claims
+        clock_skew: Seconds of clock difference tolerated for ``exp`` and ``iat``
+    """
+
+    def __init__(
+        self,
+        certs: GoogleCerts,
+        issuers: Sequence[str] = GOOGLE_ISSUERS,
+        clock_skew: float = TOKEN_CLOCK_SKEW,
+    ):
+        self.certs = certs
+        self.issuers = list(issuers)
+        self.clock_skew = clock_skew
+
+    def verify(self, token: Union[str, bytes], audience: Union[str, List[str]]) -> Dict[str, Any]:
+        """Verify a token and get its claims.
+
+        Args:
+            token: Encoded ID token
+            audience: OAuth client ID, or IDs, the token must be issued for
+
+        Returns:
+            Dict[str, Any]: The decoded token payload
+
+        Raises:
+            ValueError: If the token is invalid or the keys cannot be fetched
+        """
+        try:
+            key = self.certs.key(jwt.get_unverified_header(token).get("kid"))
+            return jwt.decode(
+                token,
+                key.key,
+                algorithms=[key.algorithm_name],
+                audience=audience,
+                issuer=self.issuers,
+                leeway=self.clock_skew,
+                options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+            )
+        except jwt.PyJWTError as e:
+            raise ValueError(str(e))
+
+    async def verify_async(
+        self, token: Union[str, bytes], audience: Union[str, List[str]]
+    ) -> Dict[str, Any]:
+        """Verify a token as ``verify`` does, without blocking the event loop.
+
+        Tokens signed with a key already in memory are verified inline,
+        which takes well under a millisecond; only when the keys must be
+        fetched first does verification move to a worker thread.
+        """
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.PyJWTError as e:
+            raise ValueError(str(e))
+        if self.certs.needs_fetch(kid):
+            return await asyncio.to_thread(self.verify, token, audience)
+        return self.verify(token, audience)
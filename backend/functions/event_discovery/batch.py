@@ -0,0 +1,93 @@
+"""Several searches answered in one request."""
+
+import asyncio
+import time
+from typing import Annotated, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from config.environment import Environment
+from functions.event_discovery import search
+from functions.event_discovery.search import MAX_RESULTS, PAGE_SIZE
+from models.event import Event
+
+# Queries accepted in one batch request
+BATCH_MAX_QUERIES = int(Environment.get("RUNON_SEARCH_BATCH_MAX_QUERIES") or 10)
+
+OK = "ok"
+ERROR = "error"
+
+
+class BatchSearchRequest(BaseModel):
+    """Several searches for one location."""
+
+    queries: List[Annotated[str, Field(min_length=1)]] = Field(
+        min_length=1, max_length=BATCH_MAX_QUERIES
+    )
+    location: Optional[str] = None
+    max_results: int = Field(default=PAGE_SIZE, ge=1, le=MAX_RESULTS)
+
+
+class QueryResult(BaseModel):
+    """Outcome of one query of a batch."""
+
+    query: str
+    status: str
+    event_ids: List[str]
+    elapsed_ms: float
+    error: Optional[str] = None
+
+
+class BatchSearchResponse(BaseModel):
+    """Events found by any query, each once, and the outcome of every query."""
+
+    events: List[Event]
+    results: List[QueryResult]
+
+
+async def _timed_search(query: str, location: Optional[str], max_results: int) -> Dict[str, object]:
+    """Run one search, recording its events or error and how long it took."""
+    started = time.perf_counter()
+    try:
+        events = await search.search_running_events_async(query, location, max_results)
+        error = None
+    except Exception as e:
+        events, error = [], str(e)
+    return {
+        "query": query,
+        "events": events,
+        "error": error,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+async def search_batch_async(request: BatchSearchRequest) -> Dict[str, object]:
+    """Run every query of a batch concurrently and combine the results.
+
+    Each query goes through the search cache and request coalescing, so
+    queries with the same canonical form share one lookup. Events found by
+    several queries are returned once, in the order first found, and each
+    query lists the IDs of its events. Events are matched by URL, since
+    an undated result can get another ID from each query. A failing query
+    is reported in its result without failing the others.
+
+    Args:
+        request: Queries, location and result budget per query
+
+    Returns:
+        Dict[str, object]: ``events`` and per-query ``results``, shaped like
+        BatchSearchResponse
+    """
+    outcomes = await asyncio.gather(
+        *(_timed_search(q, request.location, request.max_results) for q in request.queries)
+    )
+    events: Dict[str, Event] = {}
+    results = []
+    for outcome in outcomes:
+        ids = []
+        for event in outcome.pop("events"):
+            ids.append(events.setdefault(event.url or event.id, event).id)
+        outcome["status"] = OK if outcome["error"] is None else ERROR
+        outcome["event_ids"] = ids
+        results.append(outcome)
+    return {"events": list(events.values()), "results": results}
@@ -0,0 +1,128 @@
+"""Circuit breaker for upstream API calls."""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stop calling a failing upstream until it has had time to recover.
+
+    The breaker opens after ``failure_threshold`` consecutive failures and
+    rejects calls for ``reset_timeout`` seconds. It then lets a limited
+    number of probe calls through (half-open); a successful probe closes it
+    again and a failed one reopens it.
+
+    Args:
+        name: Name used in logs
+        failure_threshold: Consecutive failures that open the breaker
+        reset_timeout: Seconds to stay open before probing
+        half_open_max_calls: Concurrent probe calls allowed while half-open
+        clock: Monotonic time source in seconds
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Close the breaker and clear all counters."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = 0.0
+            self._probes = 0
+            self._rejected = 0
+            self._times_opened = 0
+
+    def _transition(self, state: str) -> None:
+        if state != self._state:
+            logger.warning(f"Circuit {self.name}: {self._state} -> {state}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = self._clock()
+            self._times_opened += 1
+            self._probes = 0
+
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open."""
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Check whether a call may go upstream now.
+
+        Every allowed call must be followed by ``record_success``,
+        ``record_failure`` or, if it is not made after all, ``release``.
+
+        Returns:
+            bool: True if the call may proceed
+        """
+        state = self.state
+        with self._lock:
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def release(self) -> None:
+        """Give back an allowed call that was not made, freeing its probe slot."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self) -> None:
+        """Record a successful upstream call."""
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        """Record a failed upstream call."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters for monitoring.
+
+        Returns:
+            Dict[str, Any]: State, consecutive failures, rejected calls and opens
+        """
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "rejected": self._rejected,
+                "times_opened": self._times_opened,
+            }
@@ -0,0 +1,645 @@
+"""Bounded in-process and shared Redis caches for search results."""
+
+import hashlib
+import json
+import logging
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+import orjson
+import redis
+
+from config.environment import Environment
+from models.event import Event
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+# Rough per-object overhead of an Event instance and its field values
+EVENT_OVERHEAD_BYTES = 600
+
+
+def estimate_events_size(events: List[Event]) -> int:
+    """Estimate the memory held by a list of events.
+
+    Exact deep sizing is far too slow for the hot path; string lengths plus a
+    fixed per-object overhead track real usage closely enough for budgeting.
+
+    Args:
+        events: Cached search results
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    size = 64 + 8 * len(events)
+    for event in events:
+        size += (
+            EVENT_OVERHEAD_BYTES
+            + len(event.id)
+            + len(event.name)
+            + len(event.location)
+            + len(event.description)
+            + len(event.url)
+        )
+    return size
+
+
+def hash_events(events: List[Event]) -> str:
+    """Hash every field of every event, in order.
+
+    Args:
+        events: Events to hash
+
+    Returns:
+        str: 32 hex character BLAKE2b digest
+    """
+    payload = orjson.dumps([event.__dict__ for event in events])
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class CachedEvents(List[Event]):
+    """Search results with a content hash computed once, when they are cached.
+
+    Behaves as a plain list of events. ``content_hash`` changes whenever
+    any field of any event does, so it can serve as an HTTP validator
+    without serializing the events, and ``fresh_until`` is the wall-clock
+    time at which the results turn stale.
+
+    Args:
+        events: Search results
+        fresh_until: Epoch seconds until which the results are fresh
+        content_hash: Hash of ``events`` if already known
+    """
+
+    def __init__(
+        self,
+        events: Iterable[Event] = (),
+        fresh_until: float = 0.0,
+        content_hash: Optional[str] = None,
+    ):
+        super().__init__(events)
+        self.fresh_until = fresh_until
+        self.content_hash = content_hash or hash_events(self)
+
+    @classmethod
+    def of(cls, events: List[Event]) -> "CachedEvents":
+        """Get ``events`` as CachedEvents, hashing them if they are a plain list."""
+        return events if isinstance(events, cls) else cls(events)
+
+
+class _Entry(Generic[V]):
+    """Cached value with its insertion time, lifetimes and estimated size."""
+
+    __slots__ = ("value", "stored_at", "ttl", "hard_ttl", "size")
+
+    def __init__(self, value: V, stored_at: float, ttl: float, hard_ttl: float, size: int):
+        self.value = value
+        self.stored_at = stored_at
+        self.ttl = ttl
+        self.hard_ttl = hard_ttl
+        self.size = size
+
+
+class SearchCache(Generic[V]):
+    """Thread-safe LRU cache with soft and hard TTLs, an entry limit and a memory budget.
+
+    An entry is fresh until ``ttl`` (the soft TTL) and stale until
+    ``hard_ttl``, after which it is expired. ``lookup`` serves stale entries so
+    callers can answer at once and refresh in the background; ``get`` only
+    serves fresh ones. Entries are evicted least-recently-used first whenever
+    either limit is exceeded, and expired entries are dropped on read or by
+    the optional background sweeper.
+
+    Args:
+        ttl: How long an entry stays fresh
+        hard_ttl: How long an entry may be served at all, defaults to ``ttl``
+        max_entries: Maximum number of entries
+        max_bytes: Memory budget in estimated bytes
+        sizeof: Function estimating the size of a value in bytes
+        clock: Monotonic time source in seconds
+    """
+
+    def __init__(
+        self,
+        ttl: timedelta,
+        hard_ttl: Optional[timedelta] = None,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        sizeof: Callable[[V], int] = estimate_events_size,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if hard_ttl is not None and hard_ttl < ttl:
+            raise ValueError("hard_ttl must not be shorter than ttl")
+        self.ttl = ttl
+        self.hard_ttl = hard_ttl or ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry[V]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._stale_hits = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _is_expired(self, entry: _Entry[V], now: float) -> bool:
+        return now - entry.stored_at >= entry.hard_ttl
+
+    def _remove(self, key: str) -> _Entry[V]:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        return entry
+
+    def lookup(self, key: str) -> Optional[Tuple[V, bool]]:
+        """Get a value and whether it is stale, if present and not expired.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Optional[Tuple[V, bool]]: Cached value and its staleness, or None
+            on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            now = self._clock()
+            if self._is_expired(entry, now):
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            stale = now - entry.stored_at >= entry.ttl
+            if stale:
+                self._stale_hits += 1
+            else:
+                self._hits += 1
+            return entry.value, stale
+
+    def get(self, key: str) -> Optional[V]:
+        """Get a value if present and fresh.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Optional[V]: Cached value, or None on a miss or stale entry
+        """
+        found = self.lookup(key)
+        if found is None or found[1]:
+            return None
+        return found[0]
+
+    def fresh_for(self, key: str) -> Optional[float]:
+        """Get how long an entry stays fresh, without counting a lookup.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Optional[float]: Seconds until the entry goes stale, negative if
+            it already is, or None if it is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = self._clock() - entry.stored_at
+            if age >= entry.hard_ttl:
+                return None
+            return entry.ttl - age
+
+    def _lifetimes(
+        self, ttl: Optional[timedelta], hard_ttl: Optional[timedelta]
+    ) -> Tuple[timedelta, timedelta]:
+        soft = ttl or self.ttl
+        return soft, hard_ttl or soft + (self.hard_ttl - self.ttl)
+
+    def set(
+        self,
+        key: str,
+        value: V,
+        ttl: Optional[timedelta] = None,
+        age: float = 0.0,
+        hard_ttl: Optional[timedelta] = None,
+    ) -> None:
+        """Store a value, evicting least-recently-used entries to stay in budget.
+
+        Values larger than the whole memory budget are not cached.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Soft TTL of this entry, defaults to the cache TTL
+            age: Seconds the value has already spent in another cache
+            hard_ttl: Hard TTL of this entry, defaults to ``ttl`` plus the
+                cache's stale window
+        """
+        soft, hard = self._lifetimes(ttl, hard_ttl)
+        lifetime, hard_lifetime = soft.total_seconds(), hard.total_seconds()
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                logger.warning(f"Not caching {key}: {size} bytes exceeds budget")
+                return
+            stored_at = self._clock() - age
+            self._entries[key] = _Entry(value, stored_at, lifetime, hard_lifetime, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Remove all entries. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def sweep(self) -> int:
+        """Remove every expired entry.
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            now = self._clock()
+            expired = [k for k, e in self._entries.items() if self._is_expired(e, now)]
+            for key in expired:
+                self._remove(key)
+            self._expirations += len(expired)
+        return len(expired)
+
+    def start_sweeper(self, interval: float = 60.0) -> None:
+        """Start a daemon thread that sweeps expired entries periodically.
+
+        Args:
+            interval: Seconds between sweeps
+        """
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._stop_sweeper.clear()
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop, args=(interval,), name="runon-cache-sweeper", daemon=True
+            )
+            self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Stop the background sweeper if it is running."""
+        self._stop_sweeper.set()
+        sweeper, self._sweeper = self._sweeper, None
+        if sweeper is not None:
+            sweeper.join()
+
+    def _sweep_loop(self, interval: float) -> None:
+        while not self._stop_sweeper.wait(interval):
+            removed = self.sweep()
+            if removed:
+                logger.debug(f"Swept {removed} expired cache entries")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters for monitoring.
+
+        Returns:
+            Dict[str, Any]: Hits, stale hits, misses, evictions, expirations and usage
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Format marker for the serialized event lists stored in Redis
+CODEC_VERSION = 1
+REDIS_KEY_PREFIX = "runon:search:"
+
+# Stored-at epoch seconds, soft TTL and hard TTL seconds, prepended to Redis values
+_ENVELOPE = struct.Struct(">ddd")
+
+
+def encode_events(events: List[Event]) -> bytes:
+    """Serialize events into a compact, versioned byte string.
+
+    Events are stored as positional rows instead of objects, so field names
+    are not repeated, and the JSON is zlib-compressed.
+
+    Args:
+        events: Events to serialize
+
+    Returns:
+        bytes: Encoded payload
+    """
+    rows = [
+        [
+            e.id,
+            e.name,
+            e.date.isoformat() if e.date is not None else None,
+            e.location,
+            e.description,
+            e.url,
+            e.distance,
+            e.calendar_event_id,
+        ]
+        for e in events
+    ]
+    payload = json.dumps([CODEC_VERSION, rows], separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(payload.encode("utf-8"), 1)
+
+
+def decode_events(data: bytes) -> List[Event]:
+    """Deserialize events produced by ``encode_events``.
+
+    Args:
+        data: Encoded payload
+
+    Returns:
+        List[Event]: Decoded events
+
+    Raises:
+        ValueError: If the payload is corrupt or from an unknown version
+    """
+    try:
+        version, rows = json.loads(zlib.decompress(data))
+    except (zlib.error, ValueError, TypeError) as e:
+        raise ValueError(f"Corrupt cache payload: {e}")
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported cache payload version: {version}")
+    # Rows were written by encode_events, so the events skip validation
+    try:
+        return Event.construct_many(
+            {
+                "id": row[0],
+                "name": row[1],
+                "date": datetime.fromisoformat(row[2]) if row[2] is not None else None,
+                "location": row[3],
+                "description": row[4],
+                "url": row[5],
+                "distance": row[6],
+                "calendar_event_id": row[7],
+            }
+            for row in rows
+        )
+    except (IndexError, KeyError, TypeError) as e:
+        raise ValueError(f"Corrupt cache payload: {e}")
+
+
+def create_redis_client() -> Optional[redis.Redis]:
+    """Create a pooled Redis client from the environment.
+
+    Returns None when ``REDIS_HOST`` is not set, so deployments without Redis
+    keep using the in-process cache only.
+
+    Returns:
+        Optional[redis.Redis]: Client backed by a shared connection pool
+    """
+    host = Environment.get("REDIS_HOST")
+    if not host:
+        return None
+    pool = redis.ConnectionPool(
+        host=host,
+        port=int(Environment.get("REDIS_PORT") or 6379),
+        db=int(Environment.get("REDIS_DB") or 0),
+        password=Environment.get("REDIS_PASSWORD") or None,
+        max_connections=int(Environment.get("REDIS_MAX_CONNECTIONS") or 32),
+        socket_timeout=float(Environment.get("REDIS_SOCKET_TIMEOUT") or 0.25),
+        socket_connect_timeout=float(Environment.get("REDIS_SOCKET_TIMEOUT") or 0.25),
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+class RedisCache:
+    """Search result cache stored in Redis and shared by all workers.
+
+    Each value carries the wall-clock time it was stored and its TTLs, so
+    every worker agrees on when a shared entry turns stale. Redis expires the
+    key at the hard TTL.
+
+    Any Redis error marks the backend unavailable for ``retry_after`` seconds,
+    during which calls return immediately instead of waiting on timeouts.
+
+    Args:
+        client: Redis client, normally from ``create_redis_client``
+        prefix: Namespace for keys
+        retry_after: Seconds to skip Redis after an error
+        clock: Monotonic time source in seconds
+        wall_clock: Wall-clock time source in epoch seconds
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        prefix: str = REDIS_KEY_PREFIX,
+        retry_after: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._unavailable_until = 0.0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    @property
+    def available(self) -> bool:
+        """Whether Redis is currently being used."""
+        return self._clock() >= self._unavailable_until
+
+    def _failed(self, action: str, error: Exception) -> None:
+        logger.warning(f"Redis {action} failed, using local cache only: {error}")
+        with self._lock:
+            self._errors += 1
+            self._unavailable_until = self._clock() + self.retry_after
+
+    def get_entry(self, key: str) -> Optional[Tuple[CachedEvents, float, float, float]]:
+        """Get events with their age and TTLs.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Optional[Tuple[CachedEvents, float, float, float]]: Events, seconds
+            since they were stored, and soft and hard TTL in seconds, or None
+            on a miss or when Redis is unavailable
+        """
+        if not self.available:
+            return None
+        try:
+            data = self.client.get(self.prefix + key)
+        except redis.RedisError as e:
+            self._failed("get", e)
+            return None
+        entry = None
+        if data is not None:
+            try:
+                stored_at, ttl, hard_ttl = _ENVELOPE.unpack_from(data)
+                events = CachedEvents(
+                    decode_events(data[_ENVELOPE.size :]), fresh_until=stored_at + ttl
+                )
+                entry = (events, max(0.0, self._wall_clock() - stored_at), ttl, hard_ttl)
+            except (ValueError, struct.error) as e:
+                logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return entry
+
+    def set(self, key: str, events: List[Event], ttl: timedelta, hard_ttl: timedelta) -> None:
+        """Store events that go stale after ``ttl`` and expire after ``hard_ttl``.
+
+        Args:
+            key: Cache key
+            events: Events to store
+            ttl: Soft TTL
+            hard_ttl: Hard TTL, after which Redis drops the key
+        """
+        if not self.available:
+            return
+        envelope = _ENVELOPE.pack(self._wall_clock(), ttl.total_seconds(), hard_ttl.total_seconds())
+        data = envelope + encode_events(events)
+        try:
+            self.client.set(self.prefix + key, data, px=hard_ttl)
+        except redis.RedisError as e:
+            self._failed("set", e)
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+        if not self.available:
+            return
+        try:
+            self.client.delete(self.prefix + key)
+        except redis.RedisError as e:
+            self._failed("delete", e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get Redis cache counters for monitoring."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "errors": self._errors,
+                "available": self.available,
+            }
+
+
+class TieredSearchCache(SearchCache[List[Event]]):
+    """Local LRU cache (L1) in front of a shared Redis cache (L2).
+
+    Reads check L1 first and fall back to L2 on a miss or a stale local
+    entry, since another worker may already have refreshed it. Entries copied
+    from L2 keep their original age. Writes go to both levels. When Redis is
+    unavailable the cache behaves exactly like a plain ``SearchCache``.
+
+    Args:
+        remote: Shared Redis cache
+        **kwargs: Arguments for the local ``SearchCache``
+    """
+
+    def __init__(self, remote: RedisCache, **kwargs):
+        super().__init__(**kwargs)
+        self.remote = remote
+
+    def lookup(self, key: str) -> Optional[Tuple[List[Event], bool]]:
+        """Get events from L1, falling back to L2."""
+        found = super().lookup(key)
+        if found is not None and not found[1]:
+            return found
+        shared = self.remote.get_entry(key)
+        if shared is None:
+            return found
+        events, age, ttl, hard_ttl = shared
+        super().set(
+            key,
+            events,
+            ttl=timedelta(seconds=ttl),
+            age=age,
+            hard_ttl=timedelta(seconds=hard_ttl),
+        )
+        return events, age >= ttl
+
+    def set(
+        self,
+        key: str,
+        value: List[Event],
+        ttl: Optional[timedelta] = None,
+        age: float = 0.0,
+        hard_ttl: Optional[timedelta] = None,
+    ) -> None:
+        """Store events in both levels."""
+        super().set(key, value, ttl=ttl, age=age, hard_ttl=hard_ttl)
+        soft, hard = self._lifetimes(ttl, hard_ttl)
+        self.remote.set(key, value, ttl=soft, hard_ttl=hard)
+
+    def delete(self, key: str) -> None:
+        """Remove a key from both levels."""
+        super().delete(key)
+        self.remote.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get local counters plus the Redis counters under ``remote``."""
+        stats = super().stats()
+        stats["remote"] = self.remote.stats()
+        return stats
+
+
+def create_search_cache(
+    ttl: timedelta, hard_ttl: timedelta, max_entries: int, max_bytes: int
+) -> SearchCache[List[Event]]:
+    """Create the search cache, adding a Redis tier when one is configured.
+
+    Args:
+        ttl: How long results stay fresh
+        hard_ttl: How long results may be served stale
+        max_entries: Local entry limit
+        max_bytes: Local memory budget in estimated bytes
+
+    Returns:
+        SearchCache[List[Event]]: Local or tiered cache
+    """
+    options = dict(ttl=ttl, hard_ttl=hard_ttl, max_entries=max_entries, max_bytes=max_bytes)
+    client = create_redis_client()
+    if client is None:
+        return SearchCache(**options)
+    return TieredSearchCache(remote=RedisCache(client), **options)
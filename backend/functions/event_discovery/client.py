@@ -0,0 +1,74 @@
+"""Pooled HTTP client for the Google Custom Search API."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.environment import Environment
+
+SEARCH_API_URL = "https://www.googleapis.com/customsearch/v1"
+POOL_SIZE = int(Environment.get("RUNON_SEARCH_POOL_SIZE") or 32)
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_search_api_url() -> str:
+    """Get the Custom Search endpoint, overridable for local testing."""
+    return Environment.get("RUNON_SEARCH_API_URL") or SEARCH_API_URL
+
+
+def _create_session(pool_size: int) -> requests.Session:
+    """Create a keep-alive session whose pool matches the worker count."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def init_client(pool_size: int = POOL_SIZE) -> None:
+    """Create the shared session and bounded executor.
+
+    Called once at application startup. Calling it again is a no-op while the
+    client is open.
+
+    Args:
+        pool_size: Maximum concurrent upstream requests and pooled connections
+    """
+    global _session, _executor
+    with _lock:
+        if _session is None:
+            _session = _create_session(pool_size)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="runon-search")
+
+
+def close_client() -> None:
+    """Close pooled connections and stop the executor."""
+    global _session, _executor
+    with _lock:
+        session, executor = _session, _executor
+        _session, _executor = None, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+    if session is not None:
+        session.close()
+
+
+def get_session() -> requests.Session:
+    """Get the shared session, creating it lazily outside the app lifespan."""
+    if _session is None:
+        init_client()
+    return _session
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the bounded executor used to run blocking searches."""
+    if _executor is None:
+        init_client()
+    return _executor
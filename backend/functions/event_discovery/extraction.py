@@ -0,0 +1,245 @@
+"""Single-pass extraction of race dates and distances from search snippets."""
+
+import itertools
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dateutil import parser as date_parser
+
+from config.environment import Environment
+
+_MONTH_NAMES = (
+    "January|February|March|April|May|June|July|August|September|October|November|December"
+)
+MONTHS: Dict[str, int] = {
+    name.lower(): number for number, name in enumerate(_MONTH_NAMES.split("|"), start=1)
+}
+
+# Date formats in priority order; the first format with a valid date wins,
+# wherever it appears in the text
+DATE_KINDS = ("mdy", "dmy", "slash", "iso")
+
+# Batch extraction splits input into chunks of this many items per task
+BATCH_CHUNK_SIZE = int(Environment.get("RUNON_EXTRACT_CHUNK_SIZE") or 2000)
+
+# Distances in priority order, in kilometers
+DISTANCES: Dict[str, float] = {"k5": 5.0, "k10": 10.0, "half": 21.1, "full": 42.2}
+
+_DATE_PATTERNS = (
+    # Month DD, YYYY
+    rf"(?P<mdy>\b(?P<mdy_month>{_MONTH_NAMES})\s+(?P<mdy_day>\d{{1,2}}),?\s+"
+    r"(?P<mdy_year>\d{4})\b)",
+    # DD Month YYYY
+    rf"(?P<dmy>\b(?P<dmy_day>\d{{1,2}})\s+(?P<dmy_month>{_MONTH_NAMES})\s+"
+    r"(?P<dmy_year>\d{4})\b)",
+    # MM/DD/YYYY
+    r"(?P<slash>\b(?P<slash_a>\d{1,2})/(?P<slash_b>\d{1,2})/(?P<slash_year>\d{4})\b)",
+    # YYYY-MM-DD
+    r"(?P<iso>\b(?P<iso_year>\d{4})-(?P<iso_month>\d{2})-(?P<iso_day>\d{2})\b)",
+)
+_DISTANCE_PATTERNS = (
+    r"(?P<k5>\b5k\b)",
+    r"(?P<k10>\b10k\b)",
+    r"(?P<half>\bhalf\s*marathon\b)",
+    r"(?P<full>\bmarathon\b)",
+)
+
+# Every alternative starts at a word boundary with a digit, a month initial,
+# "h" or "m"; checking that first lets the scan skip most positions cheaply
+_GUARD = r"\b(?=[\dADFJMNOSH])"
+
+# No two alternatives can match at the same position, so wrapping them in a
+# lookahead finds the first occurrence of every format in one overlapping scan
+_COMBINED = re.compile(
+    _GUARD + "(?=" + "|".join(_DATE_PATTERNS + _DISTANCE_PATTERNS) + ")", re.IGNORECASE
+)
+_DATES_ONLY = re.compile(_GUARD + "(?=" + "|".join(_DATE_PATTERNS) + ")", re.IGNORECASE)
+_DISTANCES_ONLY = re.compile(_GUARD + "(?:" + "|".join(_DISTANCE_PATTERNS) + ")", re.IGNORECASE)
+
+
+def _to_datetime(kind: str, match: "re.Match[str]") -> Optional[datetime]:
+    """Convert a date match, using dateutil only when the fast path cannot."""
+    year = int(match.group(f"{kind}_year"))
+    try:
+        # dateutil applies century guessing to zero-padded years
+        if year >= 1000:
+            if kind == "mdy":
+                month = MONTHS[match.group("mdy_month").lower()]
+                return datetime(year, month, int(match.group("mdy_day")))
+            if kind == "dmy":
+                month = MONTHS[match.group("dmy_month").lower()]
+                return datetime(year, month, int(match.group("dmy_day")))
+            if kind == "iso":
+                return datetime(year, int(match.group("iso_month")), int(match.group("iso_day")))
+            month, day = int(match.group("slash_a")), int(match.group("slash_b"))
+            # dateutil reads an impossible month as the day instead
+            if month <= 12:
+                return datetime(year, month, day)
+    except (KeyError, ValueError):
+        pass
+    try:
+        return date_parser.parse(match.group(kind))
+    except (ValueError, TypeError):
+        return None
+
+
+def _scan(
+    pattern: "re.Pattern[str]", text: str, dates: bool, distances: bool
+) -> Dict[str, "re.Match[str]"]:
+    """Record the first match of every kind in one pass over ``text``.
+
+    The scan stops early once the top-priority date has parsed and the
+    top-priority distance has been seen, since nothing later can win.
+    """
+    first: Dict[str, "re.Match[str]"] = {}
+    date_final = not dates
+    distance_final = not distances
+    for match in pattern.finditer(text):
+        kind = match.lastgroup
+        if kind in first:
+            continue
+        first[kind] = match
+        if kind == "mdy":
+            date_final = _to_datetime(kind, match) is not None
+        elif kind == "k5":
+            distance_final = True
+        if date_final and distance_final:
+            break
+    return first
+
+
+def _resolve_date(first: Dict[str, "re.Match[str]"]) -> Optional[datetime]:
+    for kind in DATE_KINDS:
+        match = first.get(kind)
+        if match is not None:
+            date = _to_datetime(kind, match)
+            if date is not None:
+                return date
+    return None
+
+
+def _resolve_distance(found: Dict[str, "re.Match[str]"]) -> Optional[float]:
+    for kind, distance in DISTANCES.items():
+        if kind in found:
+            return distance
+    return None
+
+
+def extract_date(text: str) -> Optional[datetime]:
+    """Extract the highest-priority valid date from text.
+
+    Args:
+        text: Text containing potential date information
+
+    Returns:
+        Optional[datetime]: Parsed date if found, None otherwise
+    """
+    return _resolve_date(_scan(_DATES_ONLY, text, dates=True, distances=False))
+
+
+def extract_distance(text: str) -> Optional[float]:
+    """Extract the highest-priority race distance from text.
+
+    Args:
+        text: Text containing potential distance information
+
+    Returns:
+        Optional[float]: Distance in kilometers if found, None otherwise
+    """
+    if not text.isascii():
+        # Lowercasing can change word boundaries outside ASCII
+        text = text.lower()
+    return _resolve_distance(_scan(_DISTANCES_ONLY, text, dates=False, distances=True))
+
+
+def extract_date_and_distance(text: str) -> Tuple[Optional[datetime], Optional[float]]:
+    """Extract both the date and the distance with a single scan of ``text``.
+
+    Args:
+        text: Text containing potential date and distance information
+
+    Returns:
+        Tuple[Optional[datetime], Optional[float]]: Date and distance in
+        kilometers, each None if not found
+    """
+    if not text.isascii():
+        return extract_date(text), extract_distance(text)
+    first = _scan(_COMBINED, text, dates=True, distances=True)
+    return _resolve_date(first), _resolve_distance(first)
+
+
+def extract_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract Event fields from one Custom Search result item.
+
+    Args:
+        item: Search result item with optional title, snippet and link
+
+    Returns:
+        Dict[str, Any]: name, description, url, date and distance; date and
+        distance are None when the text contains neither
+    """
+    # Combine title and snippet for better date/distance extraction
+    date, distance = extract_date_and_distance(f"{item.get('title', '')} {item.get('snippet', '')}")
+    return {
+        "name": item.get("title", "Unknown Event"),
+        "description": item.get("snippet", ""),
+        "url": item.get("link", ""),
+        "date": date,
+        "distance": distance,
+    }
+
+
+def _extract_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [extract_item(item) for item in chunk]
+
+
+def _chunks(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def extract_events_batch(
+    items: Iterable[Dict[str, Any]],
+    workers: Optional[int] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Extract Event fields from many search result items.
+
+    Items are read lazily in chunks and spread over worker processes, with
+    at most two chunks per worker queued at a time, so arbitrarily long
+    streams run in bounded memory. Results come back in input order and
+    are identical to calling ``extract_item`` on each item. Input that fits
+    in a single chunk is processed in this process.
+
+    Args:
+        items: List or stream of search result items
+        workers: Worker processes; defaults to the CPU count, 1 runs inline
+        chunk_size: Items per task sent to a worker
+
+    Yields:
+        Dict[str, Any]: Fields for each item, as returned by ``extract_item``
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(items, chunk_size)
+    head = list(itertools.islice(chunks, 2))
+    if workers == 1 or len(head) < 2:
+        for chunk in itertools.chain(head, chunks):
+            yield from _extract_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque(executor.submit(_extract_chunk, chunk) for chunk in head)
+        for chunk in chunks:
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(_extract_chunk, chunk))
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,430 @@
+"""Negotiated response formats and compression for search results."""
+
+import gzip
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import msgpack
+import orjson
+
+from config.environment import Environment
+from models.event import Event
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/x-msgpack"
+
+# Accepted media types and the format each one selects; wildcards get JSON
+MEDIA_TYPES: Dict[str, str] = {
+    JSON: JSON,
+    MSGPACK: MSGPACK,
+    "application/msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/*": JSON,
+    "*/*": JSON,
+}
+
+NDJSON = "application/x-ndjson"
+EVENT_STREAM = "text/event-stream"
+
+# Accepted media types of streamed results; wildcards get NDJSON
+STREAM_MEDIA_TYPES: Dict[str, str] = {
+    NDJSON: NDJSON,
+    "application/ndjson": NDJSON,
+    "application/jsonl": NDJSON,
+    EVENT_STREAM: EVENT_STREAM,
+    "application/*": NDJSON,
+    "text/*": EVENT_STREAM,
+    "*/*": NDJSON,
+}
+
+# Request headers that select the representation
+VARY = "Accept, Accept-Encoding"
+
+# Fields a response can be limited to
+EVENT_FIELDS: Tuple[str, ...] = tuple(Event.model_fields)
+
+# Bumped whenever the msgpack layout or the encoding of a field changes
+MSGPACK_VERSION = 1
+# Default row layout of msgpack responses; dates are epoch milliseconds in UTC,
+# nil when unknown
+MSGPACK_FIELDS = ("id", "name", "date", "location", "description", "url", "distance")
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(Environment.get("RUNON_COMPRESS_MIN_BYTES") or 1024)
+GZIP_LEVEL = int(Environment.get("RUNON_GZIP_LEVEL") or 6)
+BROTLI_QUALITY = int(Environment.get("RUNON_BROTLI_QUALITY") or 5)
+
+# Content codings in order of preference when the client accepts several
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def _qualities(header: str) -> Dict[str, float]:
+    """Parse an Accept-style header into values and their quality, in order."""
+    qualities: Dict[str, float] = {}
+    for part in header.split(","):
+        value, *params = (piece.strip() for piece in part.split(";"))
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        qualities.setdefault(value.lower(), quality)
+    return qualities
+
+
+def negotiate_format(accept: Optional[str]) -> Optional[str]:
+    """Choose the response format for an Accept header.
+
+    The supported type with the highest quality wins, the first listed on
+    a tie; wildcards and a missing header select JSON.
+
+    Args:
+        accept: Accept request header
+
+    Returns:
+        Optional[str]: JSON or MSGPACK, or None if neither is acceptable
+    """
+    return _negotiate(accept, MEDIA_TYPES, JSON)
+
+
+def negotiate_stream_format(accept: Optional[str]) -> Optional[str]:
+    """Choose the format of streamed results for an Accept header.
+
+    Args:
+        accept: Accept request header
+
+    Returns:
+        Optional[str]: NDJSON or EVENT_STREAM, or None if neither is acceptable
+    """
+    return _negotiate(accept, STREAM_MEDIA_TYPES, NDJSON)
+
+
+def _negotiate(accept: Optional[str], media_types: Dict[str, str], default: str) -> Optional[str]:
+    """Pick the supported type of highest quality, the first listed on a tie."""
+    if not accept:
+        return default
+    chosen, best = None, 0.0
+    for media_type, quality in _qualities(accept).items():
+        media_format = media_types.get(media_type)
+        if media_format is not None and quality > best:
+            chosen, best = media_format, quality
+    return chosen
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Choose the content coding for an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Accept-Encoding request header
+
+    Returns:
+        Optional[str]: "br" or "gzip", or None to send the body as is
+    """
+    if not accept_encoding:
+        return None
+    qualities = _qualities(accept_encoding)
+    default = qualities.get("*", 0.0)
+    chosen, best = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, default)
+        if quality > best:
+            chosen, best = encoding, quality
+    return chosen
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a comma-separated ``fields`` parameter.
+
+    Args:
+        fields: Event field names, or None for every field
+
+    Returns:
+        Optional[Tuple[str, ...]]: Distinct field names in the given order,
+        or None for every field
+
+    Raises:
+        ValueError: If a name is not an Event field or none is given
+    """
+    if fields is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in EVENT_FIELDS]
+    if unknown or not names:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)}; choose from {', '.join(EVENT_FIELDS)}"
+        )
+    return names
+
+
+def entity_tag(
+    content_hash: str,
+    media_type: str,
+    encoding: Optional[str],
+    fields: Optional[Sequence[str]] = None,
+) -> str:
+    """Build the strong ETag of one representation of a result set.
+
+    Each format, content coding and field selection gets its own tag,
+    since their bytes differ; compression is deterministic, so equal
+    inputs give equal bytes.
+
+    Args:
+        content_hash: Hash of the events
+        media_type: JSON or MSGPACK
+        encoding: Negotiated content coding, or None
+        fields: Selected fields, or None for the full events
+
+    Returns:
+        str: Quoted entity tag
+    """
+    if fields is not None:
+        selection = f"{content_hash}:{','.join(fields)}".encode()
+        content_hash = hashlib.blake2b(selection, digest_size=16).hexdigest()
+    suffix = "msgpack" if media_type == MSGPACK else "json"
+    if encoding is not None:
+        suffix += f"+{encoding}"
+    return f'"{content_hash}-{suffix}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag, with weak comparison.
+
+    Args:
+        if_none_match: If-None-Match request header
+        etag: Current entity tag
+
+    Returns:
+        bool: True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def cache_control(fresh_for: float) -> str:
+    """Build the Cache-Control header for results fresh for ``fresh_for`` seconds.
+
+    Responses need authorization, so only the client may cache them.
+    """
+    return f"private, max-age={max(int(fresh_for), 0)}"
+
+
+def to_epoch_millis(date: Optional[datetime]) -> Optional[int]:
+    """Convert a date to epoch milliseconds, taking naive dates as UTC; None stays None."""
+    if date is None:
+        return None
+    return (date - (_EPOCH if date.tzinfo is None else _EPOCH_UTC)) // _MILLISECOND
+
+
+def encode_json(events: List[Event], fields: Optional[Sequence[str]] = None) -> bytes:
+    """Encode events as JSON with the same content as the pydantic serializer.
+
+    Args:
+        events: Events to encode
+        fields: Fields to include, or None for every field
+
+    Returns:
+        bytes: JSON array of event objects
+    """
+    if fields is None:
+        rows: List[Dict[str, Any]] = [event.__dict__ for event in events]
+    else:
+        rows = [{name: event.__dict__[name] for name in fields} for event in events]
+    return orjson.dumps(rows, option=orjson.OPT_UTC_Z)
+
+
+def _event_fields(value: Any) -> Dict[str, Any]:
+    """Let orjson encode events found inside other documents."""
+    if isinstance(value, Event):
+        return value.__dict__
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def encode_json_document(document: Any) -> bytes:
+    """Encode a JSON document that may contain events anywhere inside.
+
+    Args:
+        document: Dicts, lists and scalars, with Events encoded as by
+            ``encode_json``
+
+    Returns:
+        bytes: JSON document
+    """
+    return orjson.dumps(document, default=_event_fields, option=orjson.OPT_UTC_Z)
+
+
+def encode_stream_event(
+    event: Event, media_type: str, fields: Optional[Sequence[str]] = None
+) -> bytes:
+    """Encode one event of a streamed response.
+
+    Args:
+        event: Event to send
+        media_type: NDJSON or EVENT_STREAM, from ``negotiate_stream_format``
+        fields: Fields to include, or None for every field
+
+    Returns:
+        bytes: A JSON line, or an ``event`` server-sent event with the
+        event as JSON data
+    """
+    row = event.__dict__ if fields is None else {name: event.__dict__[name] for name in fields}
+    data = orjson.dumps(row, option=orjson.OPT_UTC_Z)
+    if media_type == EVENT_STREAM:
+        return b"event: event\ndata: " + data + b"\n\n"
+    return data + b"\n"
+
+
+def encode_stream_end(count: int, media_type: str) -> Optional[bytes]:
+    """Encode the end of a streamed response that sent ``count`` events.
+
+    A JSON lines stream simply ends; an event stream gets an ``end`` event,
+    so clients can tell completion from a dropped connection and stop
+    reconnecting.
+    """
+    if media_type != EVENT_STREAM:
+        return None
+    return b"event: end\ndata: " + orjson.dumps({"count": count}) + b"\n\n"
+
+
+def encode_stream_error(message: str, media_type: str) -> bytes:
+    """Encode a failure after a streamed response has started.
+
+    The status line is already sent by then, so the error goes in the
+    body: an ``error`` event, or a JSON line with an ``error`` key.
+    """
+    data = orjson.dumps({"error": message})
+    if media_type == EVENT_STREAM:
+        return b"event: error\ndata: " + data + b"\n\n"
+    return data + b"\n"
+
+
+def encode_msgpack(events: List[Event], fields: Optional[Sequence[str]] = None) -> bytes:
+    """Encode events as a compact msgpack document.
+
+    The document is a map with the schema ``version``, the ``fields`` of
+    each row and the ``events`` as arrays in that order, so field names
+    are sent once. Dates are epoch milliseconds in UTC.
+
+    Args:
+        events: Events to encode
+        fields: Fields to include, or None for MSGPACK_FIELDS
+
+    Returns:
+        bytes: msgpack document
+    """
+    fields = tuple(fields or MSGPACK_FIELDS)
+    values = [event.__dict__ for event in events]
+    # Gathering column by column keeps the per-field cost in tight loops
+    columns = []
+    for name in fields:
+        column = [row[name] for row in values]
+        if name == "date":
+            column = [to_epoch_millis(date) for date in column]
+        columns.append(column)
+    rows = list(zip(*columns))
+    return msgpack.packb({"version": MSGPACK_VERSION, "fields": fields, "events": rows})
+
+
+def decode_msgpack_rows(body: bytes) -> List[Dict[str, Any]]:
+    """Decode the rows of a document encoded by ``encode_msgpack``.
+
+    Args:
+        body: msgpack document
+
+    Returns:
+        List[Dict[str, Any]]: Field values of each event, with naive UTC dates
+
+    Raises:
+        ValueError: If the document has an unknown version or field
+    """
+    document = msgpack.unpackb(body)
+    fields = document.get("fields", ())
+    if document.get("version") != MSGPACK_VERSION or not set(fields) <= set(EVENT_FIELDS):
+        raise ValueError("Unsupported msgpack schema")
+    rows = [dict(zip(fields, values)) for values in document["events"]]
+    if "date" in fields:
+        for row in rows:
+            if row["date"] is not None:
+                row["date"] = _EPOCH + row["date"] * _MILLISECOND
+    return rows
+
+
+def decode_msgpack(body: bytes) -> List[Event]:
+    """Decode events encoded by ``encode_msgpack`` with the default fields.
+
+    Args:
+        body: msgpack document
+
+    Returns:
+        List[Event]: Events with naive UTC dates
+
+    Raises:
+        ValueError: If the document has an unknown version or lacks fields
+    """
+    rows = decode_msgpack_rows(body)
+    if rows and not set(MSGPACK_FIELDS) <= rows[0].keys():
+        raise ValueError("msgpack document lacks event fields")
+    return Event.construct_many(rows)
+
+
+_ENCODERS = {JSON: encode_json, MSGPACK: encode_msgpack}
+
+
+def compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Compress a body if it is large enough to benefit.
+
+    Args:
+        body: Encoded response body
+        encoding: Negotiated content coding, or None
+
+    Returns:
+        Tuple[bytes, Optional[str]]: Body to send and its content coding
+    """
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), encoding
+    # A fixed mtime makes equal bodies compress to equal bytes
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), encoding
+
+
+def render_events(
+    events: List[Event],
+    media_type: str,
+    encoding: Optional[str],
+    fields: Optional[Sequence[str]] = None,
+) -> Tuple[bytes, Dict[str, str]]:
+    """Encode and compress events for a response.
+
+    Args:
+        events: Events to send
+        media_type: JSON or MSGPACK, from ``negotiate_format``
+        encoding: Content coding from ``negotiate_encoding``, or None
+        fields: Fields to include, from ``parse_fields``; None for the default
+
+    Returns:
+        Tuple[bytes, Dict[str, str]]: Body and the Vary and Content-Encoding
+        headers to send with it
+    """
+    body, encoding = compress(_ENCODERS[media_type](events, fields), encoding)
+    headers = {"Vary": VARY}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return body, headers
@@ -0,0 +1,327 @@
+"""Offline gazetteer for resolving locations and filtering events by distance."""
+
+import csv
+import functools
+import math
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.environment import Environment
+from functions.event_discovery.query import canonicalize_location
+from models.event import Event
+
+# Mean Earth radius
+EARTH_RADIUS_KM = 6371.0088
+
+# City and postal code CSV export, such as one built from GeoNames; radius
+# search is unavailable when unset
+GAZETTEER_PATH = Environment.get("RUNON_GAZETTEER_PATH")
+
+# Distinct location strings whose resolution is remembered
+RESOLVE_CACHE_SIZE = int(Environment.get("RUNON_GAZETTEER_CACHE_SIZE") or 8192)
+
+
+class Place(NamedTuple):
+    """A row of the gazetteer."""
+
+    name: str
+    region: str
+    country: str
+    postal_code: str
+    latitude: float
+    longitude: float
+    population: int
+
+    @property
+    def label(self) -> str:
+        """Name and region, as shown on events."""
+        return f"{self.name}, {self.region}" if self.region else self.name
+
+
+def haversine_km(latitude1: Any, longitude1: Any, latitude2: Any, longitude2: Any) -> Any:
+    """Great-circle distance in km between points given in degrees.
+
+    Takes floats or numpy arrays, which are broadcast against each other.
+    """
+    phi1, phi2 = np.radians(latitude1), np.radians(latitude2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = np.radians(np.subtract(longitude2, longitude1)) / 2
+    a = np.sin(half_dphi) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Convert degrees to points on the unit sphere, one row per point."""
+    phi, lam = np.radians(latitudes), np.radians(longitudes)
+    return np.column_stack((np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)))
+
+
+def _unit_vector(latitude: float, longitude: float) -> List[float]:
+    """Convert one point in degrees to a point on the unit sphere."""
+    phi, lam = math.radians(latitude), math.radians(longitude)
+    return [math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)]
+
+
+def _chord(radius_km: float) -> float:
+    """Straight-line distance on the unit sphere of a great-circle distance."""
+    return 2 * math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+class KDTree:
+    """Static k-d tree over 3D points, stored as a permutation of the points.
+
+    Each subrange of ``order`` is a subtree whose root is the middle
+    element, split on x, y and z in turn, so the tree needs no node
+    objects. On unit vectors, straight-line distance grows with great-circle
+    distance, which makes radius and nearest queries exact on the sphere.
+    """
+
+    def __init__(self, points: np.ndarray):
+        """Build the tree.
+
+        Args:
+            points: Array of shape (n, 3)
+        """
+        self.order = np.arange(len(points))
+        stack = [(0, len(points), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= 1:
+                continue
+            mid = (lo + hi) // 2
+            segment = self.order[lo:hi]
+            self.order[lo:hi] = segment[np.argpartition(points[segment, axis], mid - lo)]
+            stack.append((lo, mid, (axis + 1) % 3))
+            stack.append((mid + 1, hi, (axis + 1) % 3))
+        # Queries walk the tree in Python, where lists beat numpy scalars
+        self._order: List[int] = self.order.tolist()
+        self._points: List[List[float]] = points.tolist()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def within(self, point: Sequence[float], radius: float) -> List[int]:
+        """Find the indexes of the points within ``radius`` of ``point``."""
+        found = []
+        squared = radius * radius
+        stack = [(0, len(self._order), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            index = self._order[mid]
+            node = self._points[index]
+            dx, dy, dz = point[0] - node[0], point[1] - node[1], point[2] - node[2]
+            if dx * dx + dy * dy + dz * dz <= squared:
+                found.append(index)
+            diff = point[axis] - node[axis]
+            if diff <= radius:
+                stack.append((lo, mid, (axis + 1) % 3))
+            if diff >= -radius:
+                stack.append((mid + 1, hi, (axis + 1) % 3))
+        return found
+
+    def nearest(self, point: Sequence[float]) -> int:
+        """Find the index of the point closest to ``point``."""
+        best, best_squared = -1, math.inf
+        stack = [(0, len(self._order), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            index = self._order[mid]
+            node = self._points[index]
+            dx, dy, dz = point[0] - node[0], point[1] - node[1], point[2] - node[2]
+            squared = dx * dx + dy * dy + dz * dz
+            if squared < best_squared:
+                best, best_squared = index, squared
+            diff = point[axis] - node[axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff <= 0 else ((mid + 1, hi), (lo, mid))
+            if diff * diff < best_squared:
+                stack.append((*far, (axis + 1) % 3))
+            # Pushed last so the side holding the point is searched first
+            stack.append((*near, (axis + 1) % 3))
+        return best
+
+
+def _place_keys(place: Place) -> Iterable[str]:
+    """Canonical strings that name a place."""
+    yield canonicalize_location(place.name)
+    yield canonicalize_location(f"{place.name} {place.region}")
+    yield canonicalize_location(f"{place.name} {place.region} {place.country}")
+    yield canonicalize_location(f"{place.name} {place.country}")
+    if place.postal_code:
+        yield canonicalize_location(place.postal_code)
+
+
+class Gazetteer:
+    """Places with coordinates, for resolving free-text locations offline.
+
+    A location resolves to the place named by its longest run of words,
+    preferring runs nearer the end ("Central Park, New York, NY" resolves
+    to New York) and, for names shared by several places, the most
+    populous one unless a region or country is given. Resolutions are
+    memoized, since events mostly repeat a few locations.
+    """
+
+    def __init__(self, places: Sequence[Place], cache_size: int = RESOLVE_CACHE_SIZE):
+        """Index the places.
+
+        Args:
+            places: Gazetteer rows
+            cache_size: Distinct location strings to remember
+        """
+        self.places = list(places)
+        self.latitudes = np.array([place.latitude for place in self.places], dtype=np.float64)
+        self.longitudes = np.array([place.longitude for place in self.places], dtype=np.float64)
+        self._tree = KDTree(_unit_vectors(self.latitudes, self.longitudes))
+        self._keys: Dict[str, int] = {}
+        by_population = sorted(
+            range(len(self.places)), key=lambda index: -self.places[index].population
+        )
+        for index in by_population:
+            for key in _place_keys(self.places[index]):
+                self._keys.setdefault(key, index)
+        self._longest_key = max((len(key.split()) for key in self._keys), default=0)
+        self.resolve = functools.lru_cache(maxsize=cache_size)(self._resolve)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "Gazetteer":
+        """Load a gazetteer file.
+
+        Args:
+            path: CSV file with name, region, country, postal_code, latitude,
+                longitude and population columns
+
+        Returns:
+            Gazetteer: The loaded places
+        """
+        with open(path, newline="", encoding="utf-8") as f:
+            places = [
+                Place(
+                    name=row["name"],
+                    region=row["region"],
+                    country=row["country"],
+                    postal_code=row["postal_code"],
+                    latitude=float(row["latitude"]),
+                    longitude=float(row["longitude"]),
+                    population=int(row["population"] or 0),
+                )
+                for row in csv.DictReader(f)
+            ]
+        return cls(places)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def _resolve(self, location: Optional[str]) -> Optional[Place]:
+        """Find the place a free-text location names, or None."""
+        words = canonicalize_location(location).split()
+        for size in range(min(len(words), self._longest_key), 0, -1):
+            for start in range(len(words) - size, -1, -1):
+                index = self._keys.get(" ".join(words[start : start + size]))
+                if index is not None:
+                    return self.places[index]
+        return None
+
+    def nearest(self, latitude: float, longitude: float) -> Place:
+        """Find the place closest to a point."""
+        return self.places[self._tree.nearest(_unit_vector(latitude, longitude))]
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[Place]:
+        """Find the places within ``radius_km`` of a point, closest first."""
+        point = _unit_vector(latitude, longitude)
+        indexes = np.array(self._tree.within(point, _chord(radius_km)), dtype=np.intp)
+        distances = haversine_km(
+            latitude, longitude, self.latitudes[indexes], self.longitudes[indexes]
+        )
+        return [self.places[index] for index in indexes[np.argsort(distances, kind="stable")]]
+
+    def place_named(self, *texts: Optional[str]) -> Optional[Place]:
+        """Find the place named in the first of ``texts`` that names a known one."""
+        for text in texts:
+            place = self.resolve(text)
+            if place is not None:
+                return place
+        return None
+
+    def coordinates(self, places: Sequence[Optional[Place]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the coordinates of many places at once.
+
+        Args:
+            places: Places, None where unknown
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Latitudes and longitudes, NaN where
+            a place is unknown
+        """
+        latitudes = np.full(len(places), np.nan)
+        longitudes = np.full(len(places), np.nan)
+        for position, place in enumerate(places):
+            if place is not None:
+                latitudes[position], longitudes[position] = place.latitude, place.longitude
+        return latitudes, longitudes
+
+    def stats(self) -> Dict[str, Any]:
+        """Get gazetteer size and memoization counters for monitoring."""
+        info = self.resolve.cache_info()
+        return {
+            "places": len(self.places),
+            "cached": info.currsize,
+            "hits": info.hits,
+            "misses": info.misses,
+        }
+
+
+@functools.lru_cache(maxsize=1)
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Get the gazetteer loaded from GAZETTEER_PATH, loading it on first use.
+
+    Returns:
+        Optional[Gazetteer]: The gazetteer, or None if none is configured
+    """
+    if not GAZETTEER_PATH:
+        return None
+    return Gazetteer.from_csv(GAZETTEER_PATH)
+
+
+def sort_by_proximity(
+    events: Sequence[Event],
+    origin: Place,
+    radius_km: Optional[float] = None,
+    gazetteer: Optional[Gazetteer] = None,
+) -> List[Event]:
+    """Order events by distance from a place, optionally within a radius.
+
+    An event is at the place its name, its description or, failing both,
+    its ``location`` names. Search results carry no location of their own,
+    so one whose text names no known place is at the place searched.
+
+    Args:
+        events: Events to order
+        origin: Place to measure from
+        radius_km: Greatest distance to keep, or None to keep every event
+        gazetteer: Gazetteer resolving event locations; default the configured one
+
+    Returns:
+        List[Event]: Events closest first, ties in their original order;
+        events at no known place last, or dropped if a radius is given
+
+    Raises:
+        ValueError: If no gazetteer is given or configured
+    """
+    gazetteer = gazetteer or get_gazetteer()
+    if gazetteer is None:
+        raise ValueError("No gazetteer configured; set RUNON_GAZETTEER_PATH")
+    latitudes, longitudes = gazetteer.coordinates(
+        [gazetteer.place_named(event.name, event.description, event.location) for event in events]
+    )
+    distances = haversine_km(origin.latitude, origin.longitude, latitudes, longitudes)
+    # NaN distances of unknown locations sort last
+    order = np.argsort(distances, kind="stable")
+    if radius_km is not None:
+        order = order[distances[order] <= radius_km]
+    return [events[index] for index in order]
@@ -0,0 +1,327 @@
+"""Persistent local full-text index of discovered events."""
+
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.environment import Environment
+from functions.event_discovery.cache import CachedEvents
+from functions.event_discovery.query import canonicalize_location, canonicalize_query
+from models.event import Event
+
+logger = logging.getLogger(__name__)
+
+# SQLite database of the index; no index is kept when unset
+INDEX_PATH = Environment.get("RUNON_EVENT_INDEX_PATH")
+
+# How long a reader waits for the writer to release a lock
+BUSY_TIMEOUT_MS = int(Environment.get("RUNON_EVENT_INDEX_BUSY_TIMEOUT_MS") or 5000)
+
+# Stored in the database; an index written with another version is emptied
+# and rebuilt, as later searches index its events again
+SCHEMA_VERSION = 3
+
+_COLUMNS = ("url", "id", "name", "date", "location", "description", "distance", "calendar_event_id")
+_DATE = _COLUMNS.index("date")
+
+# Events are keyed by URL, so a result seen again, even for another
+# spelling of its search, replaces the stored copy. The FTS table mirrors
+# name, description and location of the events table through triggers, so
+# upserts keep both in step in one transaction
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    url TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    date TEXT,
+    location TEXT NOT NULL,
+    description TEXT NOT NULL,
+    distance REAL NOT NULL,
+    calendar_event_id TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_date ON events (date);
+CREATE INDEX IF NOT EXISTS events_distance ON events (distance);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5 (
+    name, description, location,
+    content='events', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, name, description, location)
+    VALUES (new.rowid, new.name, new.description, new.location);
+END;
+CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, name, description, location)
+    VALUES ('delete', old.rowid, old.name, old.description, old.location);
+END;
+CREATE TRIGGER IF NOT EXISTS events_au AFTER UPDATE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, name, description, location)
+    VALUES ('delete', old.rowid, old.name, old.description, old.location);
+    INSERT INTO events_fts (rowid, name, description, location)
+    VALUES (new.rowid, new.name, new.description, new.location);
+END;
+"""
+
+_DROP_SCHEMA = """
+DROP TRIGGER IF EXISTS events_ai;
+DROP TRIGGER IF EXISTS events_ad;
+DROP TRIGGER IF EXISTS events_au;
+DROP TABLE IF EXISTS events_fts;
+DROP TABLE IF EXISTS events;
+"""
+
+_UPSERT = f"""
+INSERT INTO events ({", ".join(_COLUMNS)}, indexed_at)
+VALUES ({", ".join("?" * (len(_COLUMNS) + 1))})
+ON CONFLICT (url) DO UPDATE SET
+    {", ".join(f"{name} = excluded.{name}" for name in _COLUMNS[1:])},
+    indexed_at = excluded.indexed_at
+"""
+
+
+def match_expression(query: str, location: Optional[str] = None) -> str:
+    """Build an FTS5 query matching every word of a search.
+
+    Words of the canonical query may appear in any indexed column, words
+    of the location only in the location column.
+
+    Args:
+        query: Search query for running events
+        location: Optional location to filter events
+
+    Returns:
+        str: FTS5 MATCH expression, empty if the search has no words
+    """
+    terms = [f'"{word}"' for word in canonicalize_query(query).split()]
+    terms.extend(f'location : "{word}"' for word in canonicalize_location(location).split())
+    return " AND ".join(terms)
+
+
+class EventIndex:
+    """SQLite FTS5 index of events, for answering searches without upstream calls.
+
+    The database runs in WAL mode, so any number of threads read
+    concurrently, each through a connection of its own, while one writer
+    connection upserts behind a lock.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
+        """Open or create the index.
+
+        Args:
+            path: SQLite database file
+            busy_timeout_ms: How long to wait for a lock held by another connection
+        """
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode = WAL")
+        self._writer.execute("PRAGMA synchronous = NORMAL")
+        version = self._writer.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            if version:
+                logger.info("Rebuilding event index of schema version %s", version)
+            self._writer.executescript(
+                f"BEGIN; {_DROP_SCHEMA} {_SCHEMA} PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;"
+            )
+        self._hits = 0
+        self._misses = 0
+        self._upserted = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Each connection is used by one thread at a time but may be closed
+        # from another
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        """Get the calling thread's read connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            with self._readers_lock:
+                self._readers.append(connection)
+        return connection
+
+    def upsert(self, events: Iterable[Event], indexed_at: Optional[float] = None) -> int:
+        """Insert events or refresh the stored copy of known ones.
+
+        Args:
+            events: Events to store, keyed by URL
+            indexed_at: When the events were seen upstream, default now
+
+        Returns:
+            int: Number of events written
+        """
+        indexed_at = time.time() if indexed_at is None else indexed_at
+        rows = []
+        for event in events:
+            values = event.__dict__
+            row: List[Any] = [values[name] for name in _COLUMNS]
+            if values["date"] is not None:
+                row[_DATE] = values["date"].isoformat()
+            row.append(indexed_at)
+            rows.append(row)
+        if not rows:
+            return 0
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                self._writer.executemany(_UPSERT, rows)
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+            self._writer.execute("COMMIT")
+            self._upserted += len(rows)
+        return len(rows)
+
+    def search(
+        self,
+        query: str,
+        location: Optional[str] = None,
+        limit: int = 10,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        min_distance: Optional[float] = None,
+        max_distance: Optional[float] = None,
+    ) -> List[Event]:
+        """Find events matching every word of a search.
+
+        Args:
+            query: Search query for running events
+            location: Optional location the events must be in
+            limit: Most events to return
+            date_from: Earliest event date, exclusive
+            date_to: Latest event date, inclusive
+            min_distance: Shortest distance in km
+            max_distance: Longest distance in km
+
+        Returns:
+            List[Event]: Best text matches first, then by date
+        """
+        return [
+            event
+            for event, _ in self._select(
+                query, location, limit, date_from, date_to, min_distance, max_distance
+            )
+        ]
+
+    def _select(
+        self,
+        query: str,
+        location: Optional[str],
+        limit: int,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        min_distance: Optional[float] = None,
+        max_distance: Optional[float] = None,
+        indexed_since: Optional[float] = None,
+    ) -> List[Tuple[Event, float]]:
+        """Find matching events along with when each was indexed."""
+        expression = match_expression(query, location)
+        if not expression:
+            return []
+        conditions = ["events_fts MATCH ?"]
+        params: List[Any] = [expression]
+        for condition, value in (
+            ("events.date > ?", date_from and date_from.isoformat()),
+            ("events.date <= ?", date_to and date_to.isoformat()),
+            ("events.distance >= ?", min_distance),
+            ("events.distance <= ?", max_distance),
+            ("events.indexed_at >= ?", indexed_since),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        params.append(limit)
+        sql = (
+            f"SELECT {', '.join(f'events.{name}' for name in _COLUMNS)}, events.indexed_at "
+            "FROM events_fts JOIN events ON events.rowid = events_fts.rowid "
+            f"WHERE {' AND '.join(conditions)} "
+            "ORDER BY events_fts.rank, events.date LIMIT ?"
+        )
+        rows = self._reader().execute(sql, params).fetchall()
+        values = []
+        for row in rows:
+            fields = dict(zip(_COLUMNS, row))
+            if fields["date"] is not None:
+                fields["date"] = datetime.fromisoformat(fields["date"])
+            values.append(fields)
+        return list(zip(Event.construct_many(values), (row[-1] for row in rows)))
+
+    def lookup(
+        self,
+        query: str,
+        location: Optional[str],
+        wanted: int,
+        max_age: float,
+    ) -> CachedEvents:
+        """Find upcoming events for a search among events seen recently.
+
+        Args:
+            query: Search query for running events
+            location: Optional location the events must be in
+            wanted: Events the search needs
+            max_age: Seconds an indexed event stays fresh
+
+        Returns:
+            CachedEvents: Up to ``wanted`` fresh upcoming matches, fresh for
+            ``max_age`` after the least recently indexed one
+        """
+        since = time.time() - max_age
+        try:
+            found = self._select(
+                query, location, wanted, date_from=datetime.now(), indexed_since=since
+            )
+        except sqlite3.Error as e:
+            logger.warning("Event index lookup failed: %s", e)
+            found = []
+        if len(found) >= wanted:
+            self._hits += 1
+        else:
+            self._misses += 1
+        if not found:
+            return CachedEvents()
+        oldest = min(indexed_at for _, indexed_at in found)
+        return CachedEvents([event for event, _ in found], fresh_until=oldest + max_age)
+
+    def __len__(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index counters for monitoring."""
+        return {
+            "events": len(self),
+            "upserted": self._upserted,
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+    def close(self) -> None:
+        """Close every connection of the index."""
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for connection in readers:
+            connection.close()
+        self._local = threading.local()
+        with self._write_lock:
+            self._writer.close()
+
+
+def create_event_index() -> Optional[EventIndex]:
+    """Open the event index when RUNON_EVENT_INDEX_PATH is set.
+
+    Returns:
+        Optional[EventIndex]: The index, or None if none is configured
+    """
+    if not INDEX_PATH:
+        return None
+    return EventIndex(INDEX_PATH)
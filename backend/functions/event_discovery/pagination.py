@@ -0,0 +1,107 @@
+"""Opaque cursors for paging through cached search results."""
+
+import base64
+import binascii
+import hashlib
+from typing import NamedTuple, Optional, Tuple
+
+import orjson
+
+from functions.event_discovery.cache import CachedEvents
+
+# Bumped whenever the cursor layout changes; older cursors are rejected
+CURSOR_VERSION = 1
+
+
+class Cursor(NamedTuple):
+    """Position after the last event of a page.
+
+    Attributes:
+        content_hash: Hash of the result set the page was cut from
+        offset: Index of the next event in that result set
+        last_id: ID of the last event on the page
+    """
+
+    content_hash: str
+    offset: int
+    last_id: str
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """Encode a cursor as an opaque URL-safe string."""
+    payload = orjson.dumps([CURSOR_VERSION, *cursor])
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        token: Cursor from a previous response
+
+    Returns:
+        Cursor: Decoded position
+
+    Raises:
+        ValueError: If the cursor is malformed or from another version
+    """
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        version, content_hash, offset, last_id = orjson.loads(payload)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise ValueError("Malformed cursor")
+    valid = (
+        isinstance(content_hash, str)
+        and isinstance(offset, int)
+        and isinstance(last_id, str)
+        and offset >= 0
+    )
+    if version != CURSOR_VERSION or not valid:
+        raise ValueError("Unsupported cursor")
+    return Cursor(content_hash, offset, last_id)
+
+
+def _resume_at(events: CachedEvents, cursor: Cursor) -> int:
+    """Find where a page continues, also after the results were refreshed."""
+    if cursor.content_hash == events.content_hash:
+        return cursor.offset
+    # The results changed since the cursor was issued; continue after the
+    # last event the client saw if it is still there
+    for index, event in enumerate(events):
+        if event.id == cursor.last_id:
+            return index + 1
+    return cursor.offset
+
+
+def paginate(
+    events: CachedEvents, limit: Optional[int] = None, cursor: Optional[Cursor] = None
+) -> Tuple[CachedEvents, Optional[str]]:
+    """Cut one page out of a cached result set.
+
+    Pages are slices of results already in the cache, so paging never
+    calls upstream as long as the same search is repeated with the cursor.
+
+    Args:
+        events: Full result set
+        limit: Events per page, or None for every remaining event
+        cursor: Position from the previous page, or None for the first page
+
+    Returns:
+        Tuple[CachedEvents, Optional[str]]: The page, with a hash of its own,
+        and the cursor of the next page, or None on the last page
+    """
+    start = 0 if cursor is None else min(_resume_at(events, cursor), len(events))
+    end = len(events) if limit is None else min(start + limit, len(events))
+    if start == 0 and end == len(events):
+        return events, None
+
+    page_hash = f"{events.content_hash}:{start}:{end}".encode()
+    page = CachedEvents(
+        events[start:end],
+        fresh_until=events.fresh_until,
+        content_hash=hashlib.blake2b(page_hash, digest_size=16).hexdigest(),
+    )
+    next_cursor = None
+    if end < len(events):
+        next_cursor = encode_cursor(Cursor(events.content_hash, end, events[end - 1].id))
+    return page, next_cursor
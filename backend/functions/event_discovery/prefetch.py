@@ -0,0 +1,331 @@
+"""Popularity tracking and background prefetching of common searches."""
+
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A search: query and optional location, as first seen
+Search = Tuple[str, Optional[str]]
+
+
+class CountMinSketch:
+    """Approximate counts of many keys in fixed memory.
+
+    Each key increments one counter in each of ``depth`` rows of ``width``
+    counters and its estimate is the smallest of them, which never
+    undercounts and overcounts by at most about ``2 / width`` of the total
+    with probability ``1 - 2 ** -depth``.
+
+    Args:
+        width: Counters per row
+        depth: Rows, each with its own hash
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._rows = [[0] * width for _ in range(depth)]
+        self._unpack = struct.Struct(f"<{depth}Q").unpack
+        self.total = 0
+
+    def _columns(self, key: str) -> Tuple[int, ...]:
+        digest = hashlib.blake2b(key.encode(), digest_size=8 * self.depth).digest()
+        return tuple(value % self.width for value in self._unpack(digest))
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count ``key`` and get its new estimate."""
+        estimate = None
+        for row, column in zip(self._rows, self._columns(key)):
+            row[column] += count
+            estimate = row[column] if estimate is None else min(estimate, row[column])
+        self.total += count
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        """Get the estimated count of ``key``."""
+        return min(row[column] for row, column in zip(self._rows, self._columns(key)))
+
+    def decay(self) -> None:
+        """Halve every counter, so older searches weigh less than recent ones."""
+        for row in self._rows:
+            row[:] = [count >> 1 for count in row]
+        self.total >>= 1
+
+
+class PopularSearches:
+    """Top-K most frequent searches, counted with a count-min sketch.
+
+    Searches are keyed by a canonical form, so equivalent spellings count
+    together; each tracked key keeps the search it entered the top with,
+    which is the one prefetched. Thread-safe.
+
+    Args:
+        capacity: Searches to keep
+        sketch: Counter of every search seen
+    """
+
+    def __init__(self, capacity: int = 50, sketch: Optional[CountMinSketch] = None):
+        self.capacity = capacity
+        self.sketch = sketch or CountMinSketch()
+        self._lock = threading.Lock()
+        self._top: Dict[str, Tuple[Search, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._top)
+
+    def record(self, key: str, search: Search, count: int = 1) -> None:
+        """Count a search.
+
+        Args:
+            key: Canonical form of the search
+            search: Query and location to prefetch it with
+            count: Occurrences to add
+        """
+        with self._lock:
+            estimate = self.sketch.add(key, count)
+            if key in self._top:
+                self._top[key] = (self._top[key][0], estimate)
+                return
+            if len(self._top) < self.capacity:
+                self._top[key] = (search, estimate)
+                return
+            coldest = min(self._top, key=lambda k: self._top[k][1])
+            if estimate > self._top[coldest][1]:
+                del self._top[coldest]
+                self._top[key] = (search, estimate)
+
+    def top(self) -> List[Tuple[str, Search, int]]:
+        """Get the tracked searches, most frequent first."""
+        with self._lock:
+            ranked = sorted(self._top.items(), key=lambda item: -item[1][1])
+        return [(key, search, count) for key, (search, count) in ranked]
+
+    def decay(self) -> None:
+        """Halve every count."""
+        with self._lock:
+            self.sketch.decay()
+            self._top = {
+                key: (search, count >> 1) for key, (search, count) in self._top.items() if count > 1
+            }
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Get the tracked searches in a JSON-friendly form."""
+        return [
+            {"key": key, "query": query, "location": location, "count": count}
+            for key, (query, location), count in self.top()
+        ]
+
+    def restore(self, entries: List[Dict[str, Any]]) -> None:
+        """Count the searches of a snapshot as if they had been seen again."""
+        for entry in entries:
+            self.record(entry["key"], (entry["query"], entry["location"]), int(entry["count"]))
+
+
+class PrefetchScheduler:
+    """Keep the most popular searches cached by refreshing them before they go stale.
+
+    Every ``interval`` seconds, tracked searches are visited most popular
+    first, and those missing from the cache or fresh for less than
+    ``lead_time`` are refreshed in the background. A round keeps submitting
+    refreshes as earlier ones finish, with at most ``concurrency`` running
+    at a time and each search at most once, until every tracked search has
+    been visited or ``allows`` reports no spare quota. Counts are halved
+    every ``decay_interval`` seconds.
+
+    On start, searches from the snapshot at ``snapshot_path`` are counted
+    and a round runs at once to warm the cache; on stop, the snapshot is
+    saved for the next start.
+
+    Args:
+        popular: Popularity counter fed by the search
+        fresh_for: Seconds a search's cached results stay fresh, negative
+            if stale, or None if not cached
+        refresh: Fetches a search into the cache
+        allows: Whether spare quota is available for a prefetch
+        concurrency: Refreshes running at once
+        interval: Seconds between rounds
+        lead_time: Refresh searches fresh for less than this many seconds
+        decay_interval: Seconds between halvings of the counts
+        snapshot_path: JSON file of popular searches, or None for none
+        clock: Time source in seconds
+    """
+
+    def __init__(
+        self,
+        popular: PopularSearches,
+        fresh_for: Callable[[Search], Optional[float]],
+        refresh: Callable[[Search], Any],
+        allows: Callable[[], bool],
+        concurrency: int = 2,
+        interval: float = 60.0,
+        lead_time: float = 600.0,
+        decay_interval: float = 3600.0,
+        snapshot_path: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.popular = popular
+        self.concurrency = concurrency
+        self.interval = interval
+        self.lead_time = lead_time
+        self.decay_interval = decay_interval
+        self.snapshot_path = snapshot_path
+        self._fresh_for = fresh_for
+        self._refresh = refresh
+        self._allows = allows
+        self._clock = clock
+        # Reentrant, as a refresh that is already done reports back at once
+        self._lock = threading.RLock()
+        # Signalled once a finished refresh has been counted and removed, and on stop
+        self._finished_refresh = threading.Condition(self._lock)
+        self._pending: Dict[str, "Future[Any]"] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_decay = clock()
+        self._rounds = 0
+        self._prefetched = 0
+        self._failed = 0
+        self._skipped_quota = 0
+
+    def _submit(self, key: str, search: Search) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="runon-prefetch"
+            )
+        future = self._executor.submit(self._refresh, search)
+        self._pending[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done))
+
+    def _finished(self, key: str, future: "Future[Any]") -> None:
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+            if future.exception() is not None:
+                self._failed += 1
+                logger.warning(f"Prefetch failed: {future.exception()}")
+            else:
+                self._prefetched += 1
+            self._finished_refresh.notify_all()
+
+    def run_once(self) -> int:
+        """Run one prefetch round, submitting refreshes as slots free up.
+
+        Returns:
+            int: Searches submitted for refresh
+        """
+        if self._clock() - self._last_decay >= self.decay_interval:
+            self.popular.decay()
+            self._last_decay = self._clock()
+        submitted = 0
+        with self._lock:
+            self._rounds += 1
+            for key, search, _ in self.popular.top():
+                if key in self._pending:
+                    continue
+                self._finished_refresh.wait_for(
+                    lambda: self._stop.is_set() or len(self._pending) < self.concurrency
+                )
+                if self._stop.is_set():
+                    break
+                fresh_for = self._fresh_for(search)
+                if fresh_for is not None and fresh_for > self.lead_time:
+                    continue
+                if not self._allows():
+                    self._skipped_quota += 1
+                    break
+                self._submit(key, search)
+                submitted += 1
+        return submitted
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the refreshes in flight to finish and be counted.
+
+        Returns:
+            bool: False if the timeout passed first
+        """
+        with self._finished_refresh:
+            return self._finished_refresh.wait_for(lambda: not self._pending, timeout)
+
+    def load_snapshot(self) -> int:
+        """Count the searches saved at ``snapshot_path``.
+
+        Returns:
+            int: Searches loaded; 0 if there is no readable snapshot
+        """
+        if not self.snapshot_path:
+            return 0
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                entries = json.load(f)["searches"]
+            self.popular.restore(entries)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable prefetch snapshot: {e}")
+            return 0
+        return len(entries)
+
+    def save_snapshot(self) -> None:
+        """Save the tracked searches to ``snapshot_path``, atomically."""
+        if not self.snapshot_path:
+            return
+        partial = f"{self.snapshot_path}.tmp"
+        try:
+            with open(partial, "w", encoding="utf-8") as f:
+                json.dump({"searches": self.popular.snapshot()}, f)
+            os.replace(partial, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not save prefetch snapshot: {e}")
+
+    def start(self) -> None:
+        """Warm the cache from the snapshot and start prefetching in the background."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="runon-prefetcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop prefetching, wait for running refreshes and save the snapshot."""
+        self._stop.set()
+        with self._finished_refresh:
+            self._finished_refresh.notify_all()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.save_snapshot()
+
+    def _loop(self) -> None:
+        loaded = self.load_snapshot()
+        if loaded:
+            logger.info(f"Warming the search cache with {loaded} popular searches")
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning(f"Prefetch round failed: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """Get prefetch counters for monitoring."""
+        with self._lock:
+            return {
+                "tracked": len(self.popular),
+                "in_flight": len(self._pending),
+                "rounds": self._rounds,
+                "prefetched": self._prefetched,
+                "failed": self._failed,
+                "skipped_quota": self._skipped_quota,
+            }
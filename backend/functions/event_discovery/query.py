@@ -0,0 +1,70 @@
+"""Canonical forms of search queries, so equivalent searches share a cache entry."""
+
+import functools
+import re
+import unicodedata
+from typing import Dict, FrozenSet, List, Optional
+
+# Words that do not change what a race search finds
+STOP_WORDS: FrozenSet[str] = frozenset(
+    "a an and around at by find for from in me my near of on or search the to with".split()
+)
+
+# Spellings mapped to the tokens they mean; values may span several tokens
+ALIASES: Dict[str, str] = {
+    "half": "half marathon",
+    "halfmarathon": "half marathon",
+    "halfmarathons": "half marathon",
+    "marathons": "marathon",
+    "5km": "5k",
+    "5ks": "5k",
+    "10km": "10k",
+    "10ks": "10k",
+}
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> List[str]:
+    """Fold case, compatibility forms and accents, then split into words."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _TOKEN.findall(folded)
+
+
+@functools.lru_cache(maxsize=4096)
+def canonicalize_query(query: str) -> str:
+    """Reduce a search query to a canonical form.
+
+    "Boston 5K", "boston  5k" and "5k in Boston" all become "5k boston".
+    Case, accents and punctuation are folded, stop words dropped, aliases
+    expanded, and the remaining words deduplicated and sorted.
+
+    Args:
+        query: Search query as typed by the user
+
+    Returns:
+        str: Canonical query; the folded query if it only has stop words
+    """
+    words = _tokens(query)
+    canonical = set()
+    for word in words:
+        if word not in STOP_WORDS:
+            canonical.update(ALIASES.get(word, word).split())
+    return " ".join(sorted(canonical) if canonical else words)
+
+
+@functools.lru_cache(maxsize=4096)
+def canonicalize_location(location: Optional[str]) -> str:
+    """Reduce a location to a canonical form.
+
+    Case, accents, punctuation and whitespace are folded but word order is
+    kept, so "Portland, ME" becomes "portland me".
+
+    Args:
+        location: Location as typed by the user, or None
+
+    Returns:
+        str: Canonical location, empty if none was given
+    """
+    return " ".join(_tokens(location)) if location else ""
@@ -0,0 +1,230 @@
+"""Rate and daily quota scheduling for Custom Search API calls."""
+
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional
+from zoneinfo import ZoneInfo
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Priorities, highest first
+INTERACTIVE = 0
+REFRESH = 1
+PREFETCH = 2
+PRIORITY_NAMES = ("interactive", "refresh", "prefetch")
+
+# Budget modes reported for monitoring
+NORMAL = "normal"
+CONSERVE = "conserve"
+CACHE_ONLY = "cache_only"
+
+# Custom Search quotas reset at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+# Shared daily usage counters outlive their quota day by a day
+COUNTER_TTL_SECONDS = 2 * 24 * 3600
+
+
+def quota_day() -> date:
+    """Get the current Custom Search quota day."""
+    return datetime.now(QUOTA_TIMEZONE).date()
+
+
+class QuotaScheduler:
+    """Admit upstream calls within a per-second rate and a daily budget.
+
+    Calls take a token from a bucket refilled at ``rate`` per second and
+    holding at most ``burst`` tokens, and count against ``daily_budget``.
+    Interactive calls may wait up to ``max_wait`` seconds for a token and
+    go ahead of any waiting refresh or prefetch call, which in turn goes
+    ahead of prefetches. Background calls do not wait by default.
+
+    Once the remaining budget falls to ``reserve`` of the daily budget only
+    interactive calls are admitted (conserve), and once it is spent none
+    are (cache only), so searches are answered from cache until the quota
+    day ends.
+
+    The rate is enforced per process. With a Redis client the daily usage
+    is a counter shared by every worker, incremented for each admitted
+    call, so all workers together stay within ``daily_budget``; without
+    one, or while Redis fails, each process counts its own calls.
+
+    Args:
+        rate: Tokens added per second
+        burst: Bucket capacity
+        daily_budget: Calls allowed per quota day
+        reserve: Fraction of the daily budget kept for interactive calls
+        max_wait: Default seconds an interactive call waits for a token
+        clock: Monotonic time source in seconds
+        today: Current quota day
+        redis_client: Redis holding the shared daily usage, or None
+        prefix: Prefix of the Redis counter keys
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        daily_budget: int,
+        reserve: float = 0.1,
+        max_wait: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+        today: Callable[[], date] = quota_day,
+        redis_client: Optional[redis.Redis] = None,
+        prefix: str = "runon:quota:",
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.daily_budget = daily_budget
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self._clock = clock
+        self._today = today
+        self._redis = redis_client
+        self._prefix = prefix
+        self._cond = threading.Condition()
+        self._waiting = [0] * len(PRIORITY_NAMES)
+        self.reset()
+
+    def reset(self) -> None:
+        """Refill the bucket and clear the day's usage and counters."""
+        with self._cond:
+            self._tokens = float(self.burst)
+            self._refilled_at = self._clock()
+            self._day = self._today()
+            self._used = 0
+            self._granted = [0] * len(PRIORITY_NAMES)
+            self._denied = [0] * len(PRIORITY_NAMES)
+            self._cond.notify_all()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        day = self._today()
+        if day != self._day:
+            logger.info(f"New quota day {day}, {self._used} calls used on {self._day}")
+            self._day = day
+            self._used = 0
+
+    def _mode(self) -> str:
+        remaining = self.daily_budget - self._used
+        if remaining <= 0:
+            return CACHE_ONLY
+        if remaining <= self.daily_budget * self.reserve:
+            return CONSERVE
+        return NORMAL
+
+    def _admits(self, priority: int) -> bool:
+        mode = self._mode()
+        return mode == NORMAL or (mode == CONSERVE and priority == INTERACTIVE)
+
+    @property
+    def mode(self) -> str:
+        """Current budget mode: normal, conserve or cache_only."""
+        with self._cond:
+            self._refill()
+            return self._mode()
+
+    def allows(self, priority: int) -> bool:
+        """Check whether the daily budget admits calls of ``priority`` now.
+
+        Args:
+            priority: INTERACTIVE, REFRESH or PREFETCH
+
+        Returns:
+            bool: False if such calls would be denied regardless of the rate
+        """
+        with self._cond:
+            self._refill()
+            return self._admits(priority)
+
+    def acquire(self, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> bool:
+        """Take a token for one upstream call.
+
+        Args:
+            priority: INTERACTIVE, REFRESH or PREFETCH
+            timeout: Seconds to wait for a token; defaults to ``max_wait``
+                for interactive calls and 0 otherwise
+
+        Returns:
+            bool: True if the call may go upstream now
+        """
+        if timeout is None:
+            timeout = self.max_wait if priority == INTERACTIVE else 0.0
+        deadline = self._clock() + timeout
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    self._refill()
+                    if not self._admits(priority):
+                        break
+                    ahead = any(self._waiting[:priority])
+                    if not ahead and self._tokens >= 1:
+                        if not self._count_call(priority):
+                            break
+                        self._tokens -= 1
+                        self._granted[priority] += 1
+                        return True
+                    wait = deadline - self._clock()
+                    if wait <= 0:
+                        break
+                    if not ahead:
+                        wait = min(wait, (1 - self._tokens) / self.rate)
+                    self._cond.wait(wait)
+                self._denied[priority] += 1
+                return False
+            finally:
+                self._waiting[priority] -= 1
+                # Let lower priorities check again
+                self._cond.notify_all()
+
+    def _count_call(self, priority: int) -> bool:
+        """Count a call against the daily budget, if the shared usage still admits it."""
+        if self._redis is None:
+            self._used += 1
+            return True
+        key = f"{self._prefix}{self._day.isoformat()}"
+        try:
+            pipeline = self._redis.pipeline()
+            pipeline.incr(key)
+            pipeline.expire(key, COUNTER_TTL_SECONDS)
+            used = pipeline.execute()[0]
+        except redis.RedisError as e:
+            logger.warning(f"Shared quota counter unavailable, counting locally: {e}")
+            self._used += 1
+            return True
+        # Calls of other workers may have used up the budget meanwhile
+        self._used = used - 1
+        if not self._admits(priority):
+            try:
+                self._redis.decr(key)
+            except redis.RedisError as e:
+                logger.warning(f"Could not return a denied call to the quota counter: {e}")
+            return False
+        self._used = used
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get budget and admission counters for monitoring.
+
+        Returns:
+            Dict[str, Any]: Mode, remaining and used budget, available tokens,
+            and granted and denied calls per priority
+        """
+        with self._cond:
+            self._refill()
+            return {
+                "mode": self._mode(),
+                "daily_budget": self.daily_budget,
+                "remaining": max(self.daily_budget - self._used, 0),
+                "used": self._used,
+                "tokens": round(self._tokens, 2),
+                "granted": dict(zip(PRIORITY_NAMES, self._granted)),
+                "denied": dict(zip(PRIORITY_NAMES, self._denied)),
+            }
@@ -0,0 +1,248 @@
+"""Timeouts, jittered retries and hedging for upstream search requests."""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, FrozenSet, Optional, Set, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth another attempt: rate limiting and transient server errors
+RETRYABLE_STATUSES: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+# (connect, read) timeout of one attempt, in seconds
+Timeout = Tuple[float, float]
+Send = Callable[[Timeout], requests.Response]
+
+
+class RetryPolicy:
+    """Limits and delays for upstream attempts.
+
+    Args:
+        max_attempts: Cap on attempts per request, hedges included
+        connect_timeout: Seconds to wait for a connection per attempt
+        read_timeout: Seconds to wait for the response per attempt
+        backoff_base: Upper bound of the first retry delay, doubled per retry
+        backoff_max: Cap on the retry delay
+        hedge: Send a second attempt when the first is slower than usual
+        hedge_quantile: Observed latency quantile after which to hedge
+        hedge_min_samples: Latencies to observe before hedging starts
+        retry_statuses: HTTP statuses that are retried
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        retry_statuses: FrozenSet[int] = RETRYABLE_STATUSES,
+    ):
+        self.max_attempts = max(max_attempts, 1)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.retry_statuses = retry_statuses
+
+    @property
+    def timeout(self) -> Timeout:
+        """Timeout passed to each attempt."""
+        return (self.connect_timeout, self.read_timeout)
+
+    def backoff(self, retry: int, rng: Callable[[], float] = random.random) -> float:
+        """Get the delay before retry number ``retry``, from 1, with full jitter."""
+        return rng() * min(self.backoff_max, self.backoff_base * 2 ** (retry - 1))
+
+
+class LatencyTracker:
+    """Sliding window of recent successful attempt latencies.
+
+    Args:
+        window: Number of latencies kept
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Add one latency sample."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Get the ``q`` quantile of the window, or None if it is empty."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+class RetryingCaller:
+    """Send upstream requests with timeouts, retries and optional hedging.
+
+    Each attempt gets the policy's timeout. Timeouts, connection errors and
+    retryable statuses are retried after a jittered exponential backoff.
+    With hedging on, a second attempt is started when the first has been
+    outstanding longer than the observed latency quantile, and the first
+    usable response wins. Every attempt after the first must be admitted by
+    the ``admit`` callback, so retries and hedges stay within the quota.
+
+    Args:
+        policy: Attempt limits and delays
+        hedge_workers: Threads available to hedged attempts
+        sleep: Sleep function used for backoff
+        rng: Random source in [0, 1) used for jitter
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        hedge_workers: int = 32,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.policy = policy
+        self.latency = LatencyTracker()
+        self._hedge_workers = hedge_workers
+        self._sleep = sleep
+        self._rng = rng
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._counts = {"requests": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._hedge_workers, thread_name_prefix="runon-hedge"
+                )
+            return self._executor
+
+    def close(self) -> None:
+        """Stop the hedging threads; they are recreated on demand."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _retryable(self, outcome: Future) -> bool:
+        error = outcome.exception()
+        if error is not None:
+            return isinstance(
+                error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+            )
+        return outcome.result().status_code in self.policy.retry_statuses
+
+    def _attempt(self, send: Send) -> requests.Response:
+        self._count("attempts")
+        started = time.monotonic()
+        response = send(self.policy.timeout)
+        if response.status_code not in self.policy.retry_statuses:
+            self.latency.record(time.monotonic() - started)
+        return response
+
+    def _run_inline(self, send: Send) -> Future:
+        outcome: Future = Future()
+        try:
+            outcome.set_result(self._attempt(send))
+        except Exception as e:
+            outcome.set_exception(e)
+        return outcome
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.policy.hedge or len(self.latency) < self.policy.hedge_min_samples:
+            return None
+        return self.latency.quantile(self.policy.hedge_quantile)
+
+    def _run_hedged(
+        self, send: Send, delay: float, can_hedge: Callable[[], bool]
+    ) -> Tuple[Future, int]:
+        """Run one attempt, adding a hedge if it is slow; return the winner and attempts."""
+        executor = self._get_executor()
+        primary = executor.submit(self._attempt, send)
+        done, _ = wait([primary], timeout=delay)
+        if done or not can_hedge():
+            return primary, 1
+
+        self._count("hedges")
+        hedge = executor.submit(self._attempt, send)
+        pending: Set[Future] = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Both may finish in the same wait; a usable answer beats a retryable one
+            for outcome in sorted(done, key=self._retryable):
+                if not pending or not self._retryable(outcome):
+                    if outcome is hedge:
+                        self._count("hedge_wins")
+                    return outcome, 2
+
+    def call(self, send: Send, admit: Callable[[], bool] = lambda: True) -> requests.Response:
+        """Send a request, retrying and hedging within the policy.
+
+        Args:
+            send: Function making one attempt with the given timeout
+            admit: Called before every extra attempt; False prevents it
+
+        Returns:
+            requests.Response: First usable response, or the last response if
+            every attempt got a retryable status
+
+        Raises:
+            requests.exceptions.RequestException: If the last attempt failed
+        """
+        self._count("requests")
+        attempts = 0
+        retry = 0
+        while True:
+            remaining = self.policy.max_attempts - attempts
+            delay = self._hedge_delay() if remaining > 1 else None
+            if delay is None:
+                outcome, used = self._run_inline(send), 1
+            else:
+                outcome, used = self._run_hedged(send, delay, admit)
+            attempts += used
+            if not self._retryable(outcome) or attempts >= self.policy.max_attempts:
+                return outcome.result()
+            if not admit():
+                return outcome.result()
+            retry += 1
+            self._count("retries")
+            pause = self.policy.backoff(retry, self._rng)
+            logger.info(f"Retrying upstream request in {pause:.2f}s (attempt {attempts + 1})")
+            self._sleep(pause)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get attempt counters and observed latency for monitoring.
+
+        Returns:
+            Dict[str, Any]: Requests, attempts, retries, hedges, hedge wins and
+            p50/p95 latency in milliseconds
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counts)
+        for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95)):
+            value = self.latency.quantile(q)
+            stats[name] = round(value * 1000, 1) if value is not None else None
+        return stats
@@ -1,44 +1,215 @@
 """Event discovery using Google Search."""
 
+import asyncio
+import functools
 import hashlib
-import re
+import itertools
+import sqlite3
+import time
+from concurrent.futures import Future
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
 
 import requests
-from dateutil import parser as date_parser
 
 from config.environment import Environment
+from functions.event_discovery.breaker import CircuitBreaker
+from functions.event_discovery.cache import (
+    CachedEvents,
+    SearchCache,
+    create_redis_client,
+    create_search_cache,
+)
+from functions.event_discovery.client import (
+    POOL_SIZE,
+    get_executor,
+    get_search_api_url,
+    get_session,
+)
+from functions.event_discovery.extraction import (
+    extract_date,
+    extract_distance,
+    extract_item,
+)
+from functions.event_discovery.index import EventIndex, create_event_index
+from functions.event_discovery.prefetch import PopularSearches, PrefetchScheduler, Search
+from functions.event_discovery.query import canonicalize_location, canonicalize_query
+from functions.event_discovery.quota import INTERACTIVE, PREFETCH, REFRESH, QuotaScheduler
+from functions.event_discovery.retry import RetryingCaller, RetryPolicy
+from functions.event_discovery.singleflight import SingleFlight
 from models.event import Event
 
-# Simple in-memory cache
-_cache: Dict[str, tuple[List[Event], datetime]] = {}
-CACHE_TTL = timedelta(hours=24)  # Cache results for 24 hours
+# Results are fresh for CACHE_TTL, then served stale while being refreshed
+# until CACHE_HARD_TTL
+CACHE_TTL = timedelta(seconds=float(Environment.get("RUNON_SEARCH_CACHE_TTL_SECONDS") or 24 * 3600))
+CACHE_HARD_TTL = timedelta(
+    seconds=float(Environment.get("RUNON_SEARCH_CACHE_HARD_TTL_SECONDS") or 30 * 3600)
+)
+CACHE_MAX_ENTRIES = int(Environment.get("RUNON_SEARCH_CACHE_MAX_ENTRIES") or 1024)
+CACHE_MAX_BYTES = int(Environment.get("RUNON_SEARCH_CACHE_MAX_BYTES") or 64 * 1024 * 1024)
+CACHE_SWEEP_INTERVAL = float(Environment.get("RUNON_SEARCH_CACHE_SWEEP_SECONDS") or 300)
+
+# Custom Search returns at most 10 results per page and 100 per query
+PAGE_SIZE = 10
+MAX_RESULTS = 100
+
+# Upstream call rate, burst and daily budget; the last QUOTA_RESERVE of the
+# budget is kept for interactive searches
+QUOTA_RATE = float(Environment.get("RUNON_SEARCH_RATE_PER_SECOND") or 1.5)
+QUOTA_BURST = int(Environment.get("RUNON_SEARCH_RATE_BURST") or 10)
+QUOTA_DAILY_BUDGET = int(Environment.get("RUNON_SEARCH_DAILY_BUDGET") or 10000)
+QUOTA_RESERVE = float(Environment.get("RUNON_SEARCH_QUOTA_RESERVE") or 0.1)
+QUOTA_MAX_WAIT = float(Environment.get("RUNON_SEARCH_QUOTA_WAIT_SECONDS") or 2)
+
+# Per-attempt timeouts, retries of transient failures and optional hedging
+# of slow Custom Search requests; retries and hedges count against the quota
+RETRY_POLICY = RetryPolicy(
+    max_attempts=int(Environment.get("RUNON_SEARCH_MAX_ATTEMPTS") or 3),
+    connect_timeout=float(Environment.get("RUNON_SEARCH_CONNECT_TIMEOUT_SECONDS") or 3.05),
+    read_timeout=float(Environment.get("RUNON_SEARCH_READ_TIMEOUT_SECONDS") or 10),
+    backoff_base=float(Environment.get("RUNON_SEARCH_BACKOFF_SECONDS") or 0.2),
+    backoff_max=float(Environment.get("RUNON_SEARCH_BACKOFF_MAX_SECONDS") or 2),
+    hedge=(Environment.get("RUNON_SEARCH_HEDGE") or "").lower() in ("1", "true", "yes"),
+)
+
+# Popular searches are refreshed in the background, with spare quota only,
+# when fresh for less than PREFETCH_LEAD_TIME; a concurrency of 0 disables
+# prefetching. Counts are halved every PREFETCH_DECAY_INTERVAL and saved to
+# PREFETCH_SNAPSHOT_PATH on shutdown to warm the cache on the next start.
+PREFETCH_TOP_K = int(Environment.get("RUNON_PREFETCH_TOP_K") or 50)
+PREFETCH_CONCURRENCY = int(Environment.get("RUNON_PREFETCH_CONCURRENCY") or 2)
+PREFETCH_INTERVAL = float(Environment.get("RUNON_PREFETCH_INTERVAL_SECONDS") or 60)
+PREFETCH_LEAD_TIME = float(Environment.get("RUNON_PREFETCH_LEAD_SECONDS") or 900)
+PREFETCH_DECAY_INTERVAL = float(Environment.get("RUNON_PREFETCH_DECAY_SECONDS") or 3600)
+PREFETCH_SNAPSHOT_PATH = Environment.get("RUNON_PREFETCH_SNAPSHOT_PATH")
+
+# Failed searches are cached as empty results for a short time
+NEGATIVE_CACHE_TTL = timedelta(
+    seconds=float(Environment.get("RUNON_SEARCH_NEGATIVE_TTL_SECONDS") or 60)
+)
+
+# Bounded in-memory cache, backed by Redis when REDIS_HOST is set
+_cache: SearchCache[List[Event]] = create_search_cache(
+    ttl=CACHE_TTL,
+    hard_ttl=max(CACHE_HARD_TTL, CACHE_TTL),
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+)
+
+# Every discovered event, for answering new searches locally; None unless
+# RUNON_EVENT_INDEX_PATH is set
+_index: Optional[EventIndex] = create_event_index()
+
+# Upstream fetches currently in flight, keyed by cache key
+_inflight: SingleFlight[List[Event]] = SingleFlight()
+
+# Background refreshes of stale entries, at most one per cache key
+_refreshing: SingleFlight[List[Event]] = SingleFlight()
+
+# Trips after repeated Custom Search failures (quota exhausted, 5xx, timeouts)
+_breaker = CircuitBreaker(
+    "custom_search",
+    failure_threshold=int(Environment.get("RUNON_SEARCH_BREAKER_FAILURES") or 5),
+    reset_timeout=float(Environment.get("RUNON_SEARCH_BREAKER_RESET_SECONDS") or 30),
+)
+
+
+# Admits upstream calls by priority within the rate and daily budget; the
+# budget is shared by every worker through Redis when REDIS_HOST is set
+_quota = QuotaScheduler(
+    rate=QUOTA_RATE,
+    burst=QUOTA_BURST,
+    daily_budget=QUOTA_DAILY_BUDGET,
+    reserve=QUOTA_RESERVE,
+    max_wait=QUOTA_MAX_WAIT,
+    redis_client=create_redis_client(),
+)
+
+
+# Sends Custom Search requests; the primary and hedged attempt of every
+# pooled request may run at the same time
+_upstream = RetryingCaller(RETRY_POLICY, hedge_workers=2 * POOL_SIZE)
+
+
+def _prefetch_fresh_for(search: Search) -> Optional[float]:
+    """Get how long the first page of a search stays fresh in the cache."""
+    return _cache.fresh_for(_get_cache_key(*search))
+
+
+def _prefetch(search: Search) -> List[Event]:
+    """Refresh the first page of a search at prefetch priority."""
+    query, location = search
+    cache_key = _get_cache_key(query, location)
+    return _refreshing.do(
+        cache_key, functools.partial(_fetch_events, cache_key, query, location, 1, PREFETCH)
+    )
+
+
+# Most frequent searches, and the scheduler keeping them cached
+_popular = PopularSearches(PREFETCH_TOP_K)
+_prefetcher = PrefetchScheduler(
+    _popular,
+    fresh_for=_prefetch_fresh_for,
+    refresh=_prefetch,
+    allows=lambda: _quota.allows(PREFETCH),
+    concurrency=PREFETCH_CONCURRENCY,
+    interval=PREFETCH_INTERVAL,
+    lead_time=PREFETCH_LEAD_TIME,
+    decay_interval=PREFETCH_DECAY_INTERVAL,
+    snapshot_path=PREFETCH_SNAPSHOT_PATH,
+)
 
 
 def _get_cache_key(query: str, location: Optional[str] = None) -> str:
-    """Generate cache key from search parameters."""
-    key = f"{query}:{location if location else ''}"
+    """Generate cache key from the canonical forms of the search parameters."""
+    key = f"{canonicalize_query(query)}:{canonicalize_location(location)}"
     return hashlib.md5(key.encode()).hexdigest()
 
 
-def _get_from_cache(cache_key: str) -> Optional[List[Event]]:
-    """Get results from cache if available and not expired."""
-    if cache_key in _cache:
-        results, timestamp = _cache[cache_key]
-        if datetime.now() - timestamp < CACHE_TTL:
-            print(f"Cache hit for key: {cache_key}")
-            return results
-        else:
-            print(f"Cache expired for key: {cache_key}")
-            del _cache[cache_key]
-    return None
+def _get_page_key(query: str, location: Optional[str], start: int) -> str:
+    """Generate cache key for the result page starting at ``start``."""
+    cache_key = _get_cache_key(query, location)
+    return cache_key if start == 1 else f"{cache_key}:{start}"
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get search cache counters for monitoring."""
+    return _cache.stats()
+
+
+def get_search_stats() -> Dict[str, Any]:
+    """Get cache, coalescing, refresh, circuit, quota and upstream state for monitoring."""
+    return {
+        "cache": _cache.stats(),
+        "coalescing": _inflight.stats(),
+        "refresh": _refreshing.stats(),
+        "circuit": _breaker.stats(),
+        "quota": _quota.stats(),
+        "upstream": _upstream.stats(),
+        "index": _index.stats() if _index is not None else None,
+        "prefetch": _prefetcher.stats(),
+    }
+
+
+def start_cache_sweeper() -> None:
+    """Start the background sweep of expired cache entries."""
+    _cache.start_sweeper(CACHE_SWEEP_INTERVAL)
+
+
+def stop_cache_sweeper() -> None:
+    """Stop the background cache sweep."""
+    _cache.stop_sweeper()
 
 
-def _save_to_cache(cache_key: str, results: List[Event]):
-    """Save results to cache."""
-    _cache[cache_key] = (results, datetime.now())
-    print(f"Saved to cache: {cache_key}")
+def start_prefetcher() -> None:
+    """Warm the cache from the popularity snapshot and start prefetching."""
+    if PREFETCH_CONCURRENCY > 0:
+        _prefetcher.start()
+
+
+def stop_prefetcher() -> None:
+    """Stop prefetching and save the popularity snapshot."""
+    _prefetcher.stop()
 
 
 def extract_date_from_text(text: str) -> Optional[datetime]:
@@ -50,27 +221,7 @@ def extract_date_from_text(text: str) -> Optional[datetime]:
     Returns:
         Optional[datetime]: Parsed date if found, None otherwise
     """
-    # Common date patterns in running event descriptions
-    date_patterns = [
-        # Month DD, YYYY
-        r"\b(?:January|February|March|April|May|June|July|August|September|"
-        r"October|November|December)\s+\d{1,2},?\s+\d{4}\b",
-        # DD Month YYYY
-        r"\b\d{1,2}\s+(?:January|February|March|April|May|June|July|August|"
-        r"September|October|November|December)\s+\d{4}\b",
-        r"\b\d{1,2}/\d{1,2}/\d{4}\b",  # MM/DD/YYYY
-        r"\b\d{4}-\d{2}-\d{2}\b",  # YYYY-MM-DD
-    ]
-
-    for pattern in date_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            try:
-                return date_parser.parse(match.group())
-            except (ValueError, TypeError):
-                continue
-
-    return None
+    return extract_date(text)
 
 
 def extract_distance_from_text(text: str) -> Optional[float]:
@@ -82,93 +233,473 @@ def extract_distance_from_text(text: str) -> Optional[float]:
     Returns:
         Optional[float]: Distance in kilometers if found, None otherwise
     """
-    # Common race distance patterns (5K, 10K, half marathon, marathon)
-    distance_patterns = {
-        r"\b5k\b": 5.0,
-        r"\b10k\b": 10.0,
-        r"\bhalf\s*marathon\b": 21.1,
-        r"\bmarathon\b": 42.2,
-    }
-
-    text = text.lower()
-    for pattern, distance in distance_patterns.items():
-        if re.search(pattern, text, re.IGNORECASE):
-            return distance
-
-    return None
+    return extract_distance(text)
 
 
-def search_running_events(query: str, location: Optional[str] = None) -> List[Event]:
+def search_running_events(
+    query: str, location: Optional[str] = None, max_results: int = PAGE_SIZE
+) -> CachedEvents:
     """Search for running events using Google Custom Search.
 
+    Searches are answered from the local event index when it has enough
+    fresh upcoming matches. Otherwise upstream fills the gap: result pages
+    are cached individually and concurrent misses for the same page share a
+    single upstream call. When ``max_results`` is more than one page,
+    further pages are fetched concurrently until enough events are found.
+
     Args:
         query: Search query for running events
         location: Optional location to filter events
+        max_results: Unique upcoming events wanted, up to MAX_RESULTS
 
     Returns:
-        List[Event]: List of running events found
+        CachedEvents: Running events found, in rank order, with their content
+        hash and freshness
     """
-    # Check cache first
-    cache_key = _get_cache_key(query, location)
-    cached_results = _get_from_cache(cache_key)
+    _popular.record(_get_cache_key(query, location), (query, location))
+    local = _search_index(query, location, max_results)
+    if len(local) >= max_results:
+        return local
+    fan_out = _FanOut(max_results, local)
+    starts = fan_out.next_starts()
+    while starts:
+        # Fetch the first page of each round here and the rest in parallel
+        futures = [_submit_page(query, location, start) for start in starts[1:]]
+        pages = [_search_page(query, location, starts[0])]
+        pages.extend(future.result() for future in futures)
+        starts = fan_out.add(pages)
+    return fan_out.events
+
+
+def _search_index(query: str, location: Optional[str], max_results: int) -> CachedEvents:
+    """Find fresh upcoming events for a search in the local index."""
+    if _index is None:
+        return CachedEvents()
+    wanted = min(max(max_results, 1), MAX_RESULTS)
+    return _index.lookup(query, location, wanted, max_age=CACHE_TTL.total_seconds())
+
+
+def _index_events(events: List[Event], fetched_at: float) -> None:
+    """Add discovered events to the local index, if there is one."""
+    if _index is None or not events:
+        return
+    try:
+        _index.upsert(events, indexed_at=fetched_at)
+    except sqlite3.Error as e:
+        print(f"Event index update failed: {str(e)}")
+
+
+def _search_page(query: str, location: Optional[str], start: int) -> List[Event]:
+    """Get one result page from cache or from a coalesced upstream call."""
+    cache_key = _get_page_key(query, location, start)
+    cached_results = _get_cached(cache_key, query, location, start)
     if cached_results is not None:
         return cached_results
 
+    return _inflight.do(
+        cache_key, functools.partial(_fetch_events, cache_key, query, location, start)
+    )
+
+
+def _submit_page(query: str, location: Optional[str], start: int) -> "Future[List[Event]]":
+    """Get one result page on the shared executor."""
+    cache_key = _get_page_key(query, location, start)
+    return _inflight.submit(
+        cache_key,
+        functools.partial(_lookup_or_fetch, cache_key, query, location, start),
+        get_executor(),
+    )
+
+
+def _is_upcoming(event: Event, now: datetime) -> bool:
+    """Check that an event is not known to be past; undated events may be upcoming."""
+    return event.date is None or event.date > now
+
+
+class _FanOut:
+    """Choose which result pages to fetch and merge them in rank order.
+
+    Events already found locally come first. The first round fetches as
+    many pages as the rest of ``max_results`` could fill.
+    Later rounds only fetch enough pages to cover what is still missing,
+    and fetching stops once enough unique upcoming events are found, a
+    page comes back short or the Custom Search limit is reached. An event
+    is upcoming unless its date is known to be past, so undated events
+    count too.
+    """
+
+    def __init__(self, max_results: int, local: Optional[CachedEvents] = None):
+        self.max_results = min(max(max_results, 1), MAX_RESULTS)
+        self.events = CachedEvents()
+        self._pages: List[CachedEvents] = []
+        self._found = 0
+        self._next_start = 1
+        if local:
+            self._pages.append(local)
+            self._merge()
+
+    def next_starts(self) -> List[int]:
+        """Get the start indexes of the next round of pages to fetch."""
+        wanted = self.max_results - self._found
+        end = min(self._next_start + wanted + PAGE_SIZE - 1, MAX_RESULTS + 1)
+        starts = list(range(self._next_start, end - PAGE_SIZE + 1, PAGE_SIZE))
+        self._next_start += len(starts) * PAGE_SIZE
+        return starts
+
+    def add(self, pages: List[List[Event]]) -> List[int]:
+        """Merge a round of pages and get the start indexes of the next round."""
+        self._pages.extend(CachedEvents.of(page) for page in pages)
+        self._merge()
+        if self._found >= self.max_results or len(pages[-1]) < PAGE_SIZE:
+            return []
+        return self.next_starts()
+
+    def _merge(self) -> None:
+        now = datetime.now()
+        seen = set()
+        merged = []
+        found = 0
+        for event in itertools.chain.from_iterable(self._pages):
+            key = event.url or event.id
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(event)
+            if _is_upcoming(event, now):
+                found += 1
+                if found >= self.max_results:
+                    break
+        self._found = found
+        # A single page that needed no trimming is returned as cached
+        if len(self._pages) == 1 and len(merged) == len(self._pages[0]):
+            self.events = self._pages[0]
+            return
+        # The merge keeps a prefix of the deduplicated pages, so the page
+        # hashes and its length identify the content
+        parts = [str(len(merged))] + [page.content_hash for page in self._pages]
+        self.events = CachedEvents(
+            merged,
+            fresh_until=min(page.fresh_until for page in self._pages),
+            content_hash=hashlib.blake2b(":".join(parts).encode(), digest_size=16).hexdigest(),
+        )
+
+
+def _get_cached(
+    cache_key: str, query: str, location: Optional[str], start: int = 1
+) -> Optional[List[Event]]:
+    """Get cached events, scheduling a background refresh if they are stale."""
+    found = _cache.lookup(cache_key)
+    if found is None:
+        return None
+    cached_results, stale = found
+    # Refresh only while the budget has room for background calls
+    if stale and _quota.allows(REFRESH):
+        _refreshing.submit(
+            cache_key,
+            functools.partial(_fetch_events, cache_key, query, location, start, REFRESH),
+            get_executor(),
+        )
+    return cached_results
+
+
+def _lookup_or_fetch(
+    cache_key: str, query: str, location: Optional[str], start: int = 1
+) -> List[Event]:
+    """Serve from cache or fetch, for callers already coalesced on ``cache_key``."""
+    cached_results = _get_cached(cache_key, query, location, start)
+    if cached_results is not None:
+        return cached_results
+    return _fetch_events(cache_key, query, location, start)
+
+
+def _fetch_events(
+    cache_key: str,
+    query: str,
+    location: Optional[str],
+    start: int = 1,
+    priority: int = INTERACTIVE,
+) -> List[Event]:
+    """Fetch one page of events from Google Custom Search and cache it.
+
+    Args:
+        cache_key: Cache key for the page
+        query: Search query for running events
+        location: Optional location to filter events
+        start: Rank of the first result on the page, from 1
+        priority: Quota priority of the call
+
+    Returns:
+        List[Event]: List of running events found
+    """
     api_key = Environment.get_required("RUNON_API_KEY")
     search_engine_id = Environment.get_required("RUNON_SEARCH_ENGINE_ID")
 
-    # Enhance query with running event specific terms
-    search_terms = [query, "running race", "marathon", "5K", "10K", "registration"]
-    if location:
-        search_terms.append(location)
+    # Enhance the canonical query with running event specific terms, so
+    # equivalent searches send the same request
+    canonical_query = canonicalize_query(query)
+    canonical_location = canonicalize_location(location)
+    search_terms = [canonical_query, "running race", "marathon", "5K", "10K", "registration"]
+    if canonical_location:
+        search_terms.append(canonical_location)
 
     enhanced_query = " ".join(search_terms)
 
-    base_url = "https://www.googleapis.com/customsearch/v1"
+    base_url = get_search_api_url()
     params = {
         "key": api_key,
         "cx": search_engine_id,
         "q": enhanced_query,
-        "num": 10,
+        "num": PAGE_SIZE,
         "sort": "date",  # Prioritize recent content
     }
+    if start > 1:
+        params["start"] = start
+
+    # Fail fast while the upstream is known to be failing, before waiting for quota
+    if not _breaker.allow_request():
+        print("Custom Search circuit is open, skipping request")
+        return CachedEvents()
+
+    # Stay within the Custom Search rate and daily budget
+    if not _quota.acquire(priority):
+        _breaker.release()
+        print(f"Custom Search quota unavailable ({_quota.mode}), skipping request")
+        return CachedEvents()
 
     try:
-        print(f"Making request to Google Custom Search API with query: {enhanced_query}")
-        response = requests.get(base_url, params=params)
+        print(
+            f"Making request to Google Custom Search API with query: {enhanced_query}"
+            + (f" (start {start})" if start > 1 else "")
+        )
+        response = _upstream.call(
+            lambda timeout: get_session().get(base_url, params=params, timeout=timeout),
+            admit=lambda: _quota.acquire(priority, timeout=0),
+        )
         print(f"Response status code: {response.status_code}")
 
         if response.status_code != 200:
             print(f"Error response body: {response.text}")
-            return []
+            return _record_upstream_failure(cache_key)
 
         search_results = response.json()
 
-        events = []
-        for item in search_results.get("items", []):
-            # Combine title and snippet for better date/distance extraction
-            full_text = f"{item.get('title', '')} {item.get('snippet', '')}"
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Search error: {str(e)}")
+        return _record_upstream_failure(cache_key)
 
-            # Extract date from text or fall back to current date
-            event_date = extract_date_from_text(full_text) or datetime.now()
+    _breaker.record_success()
 
-            # Extract distance or default to 0
-            distance = extract_distance_from_text(full_text) or 0.0
+    events = list(_parse_events(search_results.get("items", []), query, location))
 
-            event = Event(
-                name=item.get("title", "Unknown Event"),
-                date=event_date,
-                location=location or query,
-                description=item.get("snippet", ""),
-                url=item.get("link", ""),
-                distance=distance,
-            )
-            events.append(event)
+    # Cache successful results, hashed once for every response that uses them
+    fetched_at = time.time()
+    results = CachedEvents(events, fresh_until=fetched_at + CACHE_TTL.total_seconds())
+    _cache.set(cache_key, results)
+    _index_events(events, fetched_at)
+    return results
 
-        # Cache successful results
-        _save_to_cache(cache_key, events)
-        return events
 
-    except requests.exceptions.RequestException as e:
-        print(f"Search error: {str(e)}")
-        return []
+def _parse_events(
+    items: Iterable[Dict[str, Any]], query: str, location: Optional[str]
+) -> Iterator[Event]:
+    """Extract an Event from each Custom Search result item, located at the searched place."""
+    location = location or query
+    for item in items:
+        fields = extract_item(item)
+
+        # Undated results keep no date; unknown distances are 0
+        yield Event(
+            name=fields["name"],
+            date=fields["date"],
+            location=location,
+            description=fields["description"],
+            url=fields["url"],
+            distance=fields["distance"] or 0.0,
+        )
+
+
+def _record_upstream_failure(cache_key: str) -> CachedEvents:
+    """Count a failed upstream call and briefly cache the empty result.
+
+    A stale entry for the key is kept rather than replaced, so it can still
+    be served while the upstream recovers.
+
+    Returns:
+        CachedEvents: The empty result
+    """
+    _breaker.record_failure()
+    if cache_key in _cache:
+        return CachedEvents()
+    results = CachedEvents(fresh_until=time.time() + NEGATIVE_CACHE_TTL.total_seconds())
+    _cache.set(cache_key, results, ttl=NEGATIVE_CACHE_TTL, hard_ttl=NEGATIVE_CACHE_TTL)
+    return results
+
+
+async def search_running_events_async(
+    query: str, location: Optional[str] = None, max_results: int = PAGE_SIZE
+) -> CachedEvents:
+    """Search for running events without blocking the event loop.
+
+    Blocking lookups, in the local index and upstream, run on the shared
+    bounded executor so that slow round trips never stall other requests. Concurrent calls for the
+    same page, sync or async, share a single lookup, and the pages of each
+    round are fetched concurrently.
+
+    Args:
+        query: Search query for running events
+        location: Optional location to filter events
+        max_results: Unique upcoming events wanted, up to MAX_RESULTS
+
+    Returns:
+        CachedEvents: Running events found, in rank order, with their content
+        hash and freshness
+    """
+    _popular.record(_get_cache_key(query, location), (query, location))
+    local = await asyncio.wrap_future(
+        get_executor().submit(_search_index, query, location, max_results)
+    )
+    if len(local) >= max_results:
+        return local
+    fan_out = _FanOut(max_results, local)
+    starts = fan_out.next_starts()
+    while starts:
+        pages = await asyncio.gather(
+            *(asyncio.wrap_future(_submit_page(query, location, start)) for start in starts)
+        )
+        starts = fan_out.add(list(pages))
+    return fan_out.events
+
+
+class _UpcomingFilter:
+    """Pass each event once until enough upcoming events have passed.
+
+    The streaming counterpart of the ``_FanOut`` merge: events repeated on
+    later pages are dropped, and the stream ends with the ``max_results``-th
+    upcoming event.
+    """
+
+    def __init__(self, max_results: int):
+        self.max_results = min(max(max_results, 1), MAX_RESULTS)
+        self.found = 0
+        self._now = datetime.now()
+        self._seen: set = set()
+
+    @property
+    def remaining(self) -> int:
+        """Upcoming events still wanted."""
+        return self.max_results - self.found
+
+    def admit(self, event: Event) -> bool:
+        """Check whether an event is new, counting it if it is upcoming."""
+        key = event.url or event.id
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        if _is_upcoming(event, self._now):
+            self.found += 1
+        return True
+
+
+def _next_round(
+    query: str, location: Optional[str], start: int, wanted: _UpcomingFilter
+) -> "List[Future[List[Event]]]":
+    """Start fetching, from ``start``, as many pages as the events still wanted could fill."""
+    end = min(start + wanted.remaining + PAGE_SIZE - 1, MAX_RESULTS + 1)
+    return [
+        _submit_page(query, location, page_start)
+        for page_start in range(start, end - PAGE_SIZE + 1, PAGE_SIZE)
+    ]
+
+
+def _stream_pages(query: str, location: Optional[str], wanted: _UpcomingFilter) -> Iterator[Event]:
+    """Yield the events of each result page in rank order as its fetch completes.
+
+    Pages are fetched in the same rounds as ``_FanOut`` fetches them, so a
+    stream costs no more upstream calls than a search, and the events of
+    the first page are yielded while later pages of its round are in flight.
+    """
+    start = 1
+    while wanted.remaining > 0 and start <= MAX_RESULTS:
+        pending = _next_round(query, location, start, wanted)
+        start += len(pending) * PAGE_SIZE
+        for page in pending:
+            events = page.result()
+            yield from events
+            if len(events) < PAGE_SIZE:
+                return
+
+
+def stream_running_events(
+    query: str, location: Optional[str] = None, max_results: int = PAGE_SIZE
+) -> Iterator[Event]:
+    """Search for running events, yielding each as soon as its page is in.
+
+    A generator pipeline over the same index, cache and coalesced page
+    fetches as ``search_running_events``: fresh local matches first, then
+    result pages in rank order, each event once. Only the pages of one
+    fetch round are held at a time, each page's events are built as its
+    fetch completes, and iteration stops once ``max_results`` upcoming
+    events have been yielded.
+
+    Args:
+        query: Search query for running events
+        location: Optional location to filter events
+        max_results: Unique upcoming events wanted, up to MAX_RESULTS
+
+    Yields:
+        Event: Running events in the order ``search_running_events`` returns them
+    """
+    _popular.record(_get_cache_key(query, location), (query, location))
+    wanted = _UpcomingFilter(max_results)
+    local = _search_index(query, location, wanted.max_results)
+    for event in itertools.chain(local, _stream_pages(query, location, wanted)):
+        if wanted.admit(event):
+            yield event
+            if wanted.remaining <= 0:
+                return
+
+
+async def _stream_pages_async(
+    query: str, location: Optional[str], wanted: _UpcomingFilter
+) -> AsyncIterator[Event]:
+    """Yield the events of each result page as ``_stream_pages`` does, without blocking."""
+    start = 1
+    while wanted.remaining > 0 and start <= MAX_RESULTS:
+        pending = _next_round(query, location, start, wanted)
+        start += len(pending) * PAGE_SIZE
+        for page in pending:
+            events = await asyncio.wrap_future(page)
+            for event in events:
+                yield event
+            if len(events) < PAGE_SIZE:
+                return
+
+
+async def stream_running_events_async(
+    query: str, location: Optional[str] = None, max_results: int = PAGE_SIZE
+) -> AsyncIterator[Event]:
+    """Search for running events as ``stream_running_events`` does, without blocking.
+
+    Args:
+        query: Search query for running events
+        location: Optional location to filter events
+        max_results: Unique upcoming events wanted, up to MAX_RESULTS
+
+    Yields:
+        Event: Running events in the order ``search_running_events`` returns them
+    """
+    _popular.record(_get_cache_key(query, location), (query, location))
+    wanted = _UpcomingFilter(max_results)
+    local = await asyncio.wrap_future(
+        get_executor().submit(_search_index, query, location, wanted.max_results)
+    )
+    for event in local:
+        if wanted.admit(event):
+            yield event
+    if wanted.remaining <= 0:
+        return
+    async for event in _stream_pages_async(query, location, wanted):
+        if wanted.admit(event):
+            yield event
+            if wanted.remaining <= 0:
+                return
@@ -0,0 +1,120 @@
+"""Coalescing of identical concurrent calls into a single execution."""
+
+import asyncio
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Generic, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Run at most one call per key at a time and share its result.
+
+    The first caller for a key becomes the leader and executes the function;
+    callers arriving while it is in flight wait for the same result, or the
+    same exception. Sync and async callers share one table of in-flight calls,
+    so a thread and a coroutine asking for the same key also coalesce.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, "Future[T]"] = {}
+        self._executions = 0
+        self._coalesced = 0
+
+    def _join(self, key: str) -> Tuple["Future[T]", bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._executions += 1
+            return future, True
+
+    def _forget(self, key: str, future: "Future[T]") -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        """Call ``fn`` unless a call for ``key`` is already in flight.
+
+        Args:
+            key: Coalescing key
+            fn: Function to run if this caller is the leader
+
+        Returns:
+            T: Result of the leader's call
+        """
+        future, leader = self._join(key)
+        if leader:
+            try:
+                result = fn()
+            except BaseException as e:
+                self._forget(key, future)
+                future.set_exception(e)
+            else:
+                self._forget(key, future)
+                future.set_result(result)
+        return future.result()
+
+    def submit(self, key: str, fn: Callable[[], T], executor: Executor) -> "Future[T]":
+        """Start ``fn`` on ``executor`` unless a call for ``key`` is in flight.
+
+        Args:
+            key: Coalescing key
+            fn: Blocking function to run if this caller is the leader
+            executor: Executor for the leader's call
+
+        Returns:
+            Future[T]: Future shared by every caller of the in-flight call
+        """
+        future, leader = self._join(key)
+        if leader:
+            try:
+                task = executor.submit(fn)
+            except BaseException as e:
+                future.set_exception(e)
+                self._forget(key, future)
+            else:
+                task.add_done_callback(lambda done: self._settle(key, future, done))
+        return future
+
+    async def do_async(self, key: str, fn: Callable[[], T], executor: Executor) -> T:
+        """Async variant of ``do`` that runs the leader's call on ``executor``.
+
+        Args:
+            key: Coalescing key
+            fn: Blocking function to run if this caller is the leader
+            executor: Executor for the leader's call
+
+        Returns:
+            T: Result of the leader's call
+        """
+        return await asyncio.wrap_future(self.submit(key, fn, executor))
+
+    def _settle(self, key: str, future: "Future[T]", done: "Future[T]") -> None:
+        # Forget the call before waking waiters, so nobody who runs after
+        # them can join a call that has already finished
+        self._forget(key, future)
+        error = done.exception()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(done.result())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing counters for monitoring.
+
+        Returns:
+            Dict[str, Any]: Executed calls, coalesced callers and calls in flight
+        """
+        with self._lock:
+            return {
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls),
+            }
@@ -1,15 +1,73 @@
 """Main FastAPI application."""
 
-from typing import List, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Sequence
 
-from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 from config.environment import Environment
-from functions.event_discovery.search import search_running_events
+from functions.auth.auth import close_verifier, verify_google_id_token_async
+from functions.event_discovery.batch import (
+    BatchSearchRequest,
+    BatchSearchResponse,
+    search_batch_async,
+)
+from functions.event_discovery.cache import CachedEvents
+from functions.event_discovery.client import close_client, init_client
+from functions.event_discovery.formats import (
+    EVENT_STREAM,
+    JSON,
+    MSGPACK,
+    NDJSON,
+    VARY,
+    cache_control,
+    compress,
+    encode_json_document,
+    encode_stream_end,
+    encode_stream_error,
+    encode_stream_event,
+    entity_tag,
+    etag_matches,
+    negotiate_encoding,
+    negotiate_format,
+    negotiate_stream_format,
+    parse_fields,
+    render_events,
+)
+from functions.event_discovery.geo import Place, get_gazetteer, sort_by_proximity
+from functions.event_discovery.pagination import decode_cursor, paginate
+from functions.event_discovery.search import (
+    MAX_RESULTS,
+    PAGE_SIZE,
+    get_search_stats,
+    search_running_events_async,
+    start_cache_sweeper,
+    start_prefetcher,
+    stop_cache_sweeper,
+    stop_prefetcher,
+    stream_running_events_async,
+)
 from models.event import Event
 
-app = FastAPI(title="RunOn API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared search client and background tasks at startup, stop them on shutdown."""
+    init_client()
+    start_cache_sweeper()
+    start_prefetcher()
+    yield
+    stop_prefetcher()
+    stop_cache_sweeper()
+    close_client()
+    close_verifier()
+
+
+app = FastAPI(title="RunOn API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -22,7 +80,7 @@ app.add_middleware(
 
 
 async def verify_token(authorization: Optional[str] = Header(None)):
-    """Verify the authorization token."""
+    """Verify the authorization token: a Google ID token issued for our client ID."""
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header required")
 
@@ -38,23 +96,192 @@ async def verify_token(authorization: Optional[str] = Header(None)):
     if token == client_id:
         return True
 
-    raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        await verify_google_id_token_async(token)
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    return True
+
 
+def _resolve_origin(location: Optional[str], radius_km: Optional[float]) -> Optional[Place]:
+    """Find the place a radius search is centred on.
 
-@app.post("/events/search")
+    Raises:
+        HTTPException: If a radius is given but no gazetteer is configured
+        ValueError: If a radius is given without a known location
+    """
+    if radius_km is None:
+        return None
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        raise HTTPException(status_code=501, detail="Radius search is not configured")
+    origin = gazetteer.resolve(location) if location else None
+    if origin is None:
+        raise ValueError(f"Unknown location for radius search: {location!r}")
+    return origin
+
+
+@app.get("/events/search", response_model=List[Event])
+@app.post("/events/search", response_model=List[Event])
 async def search_and_create_events(
-    query: str, authorized: bool = Depends(verify_token)
-) -> List[Event]:
-    """Search for events and create them in calendar."""
+    query: str,
+    max_results: int = Query(PAGE_SIZE, ge=1, le=MAX_RESULTS),
+    location: Optional[str] = Query(None, description="City or postal code to search near"),
+    radius_km: Optional[float] = Query(None, gt=0, description="Only events this close"),
+    fields: Optional[str] = Query(None, description="Comma-separated event fields to return"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_RESULTS),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    authorized: bool = Depends(verify_token),
+) -> Response:
+    """Search for events and create them in calendar.
+
+    Responds with JSON or, when the Accept header asks for it, msgpack, and
+    compresses large responses with a coding from Accept-Encoding. The
+    ETag comes from the cached results' content hash, so a request whose
+    If-None-Match still matches gets a 304 without the events being encoded.
+
+    With ``radius_km``, only events within that distance of ``location``
+    are returned, closest first, measured with the offline gazetteer at
+    RUNON_GAZETTEER_PATH. An event is placed by the place its name or
+    description names, or else by its location; events at no place the
+    gazetteer knows are left out.
+
+    ``fields`` limits the events to the named fields. With ``limit`` the
+    results come in pages; repeating the search with the X-Next-Cursor of
+    a response as ``cursor`` gets the next page from the cached results.
+    """
+    media_type = negotiate_format(accept)
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Supported formats: {JSON}, {MSGPACK}")
+    try:
+        selected = parse_fields(fields)
+        position = decode_cursor(cursor) if cursor else None
+        origin = _resolve_origin(location, radius_km)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         # Use the real search implementation
-        events = search_running_events(query)
-        return events
+        events = CachedEvents.of(
+            await search_running_events_async(query, location, max_results=max_results)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if origin is not None:
+        nearby = sort_by_proximity(events, origin, radius_km)
+        events = CachedEvents(nearby, fresh_until=events.fresh_until)
+    page, next_cursor = paginate(events, limit, position)
+    encoding = negotiate_encoding(accept_encoding)
+    headers = {
+        "ETag": entity_tag(page.content_hash, media_type, encoding, selected),
+        "Cache-Control": cache_control(page.fresh_until - time.time()),
+    }
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers={**headers, "Vary": VARY})
+    body, encoded = render_events(page, media_type, encoding, selected)
+    return Response(content=body, media_type=media_type, headers={**headers, **encoded})
+
+
+async def _stream_events(
+    first: Optional[Event],
+    events: AsyncIterator[Event],
+    media_type: str,
+    fields: Optional[Sequence[str]],
+) -> AsyncIterator[bytes]:
+    """Encode the first event, found before the response began, then the rest as found."""
+    count = 0
+    try:
+        if first is not None:
+            yield encode_stream_event(first, media_type, fields)
+            count += 1
+            async for event in events:
+                yield encode_stream_event(event, media_type, fields)
+                count += 1
+    except Exception as e:
+        # The status has been sent, so later failures can only be reported in-band
+        yield encode_stream_error(str(e), media_type)
+        return
+    end = encode_stream_end(count, media_type)
+    if end is not None:
+        yield end
+
+
+@app.get("/events/search:stream")
+@app.post("/events/search:stream")
+async def stream_search_events(
+    query: str,
+    max_results: int = Query(PAGE_SIZE, ge=1, le=MAX_RESULTS),
+    location: Optional[str] = Query(None, description="City or postal code to search near"),
+    fields: Optional[str] = Query(None, description="Comma-separated event fields to return"),
+    accept: Optional[str] = Header(None),
+    authorized: bool = Depends(verify_token),
+) -> StreamingResponse:
+    """Search for events and send each one as soon as it is found.
+
+    Events come as JSON lines or, when the Accept header asks for
+    text/event-stream, as server-sent events ending with an ``end`` event,
+    in the same order as from ``/events/search``. Local index matches are
+    sent first, then each page of search results as it arrives.
+
+    The response starts once the first event is found, so a search that
+    fails before then gets a 500 as from ``/events/search``; errors after
+    it are reported in the stream.
+    """
+    media_type = negotiate_stream_format(accept)
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Supported formats: {NDJSON}, {EVENT_STREAM}")
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    events = stream_running_events_async(query, location, max_results=max_results)
+    try:
+        first: Optional[Event] = await events.__anext__()
+    except StopAsyncIteration:
+        first = None
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        _stream_events(first, events, media_type, selected),
+        media_type=media_type,
+        # Sent uncompressed and unbuffered, so each event reaches the client at once
+        headers={"Cache-Control": "no-cache", "Vary": "Accept", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/events/search:batch", response_model=BatchSearchResponse)
+async def batch_search_events(
+    batch: BatchSearchRequest,
+    accept_encoding: Optional[str] = Header(None),
+    authorized: bool = Depends(verify_token),
+) -> Response:
+    """Run several searches for one location in a single request.
+
+    Queries run concurrently through the search cache, events found by
+    more than one query are returned once, and every query reports its
+    status, event IDs and time taken.
+    """
+    result = await search_batch_async(batch)
+    body, encoding = compress(encode_json_document(result), negotiate_encoding(accept_encoding))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=JSON, headers=headers)
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get("/health/search")
+async def search_health_check():
+    """Search cache, coalescing and circuit breaker state for monitoring."""
+    # Counting the event index reads SQLite, so keep it off the event loop
+    return await run_in_threadpool(get_search_stats)
@@ -1,7 +1,6 @@
 """Data models package."""
 
-from .event import Event
+from .event import Event, make_event_id
+from .event_batch import EventBatch
 
-__all__ = ["Event"]
-
-"""Models package initialization."""
+__all__ = ["Event", "EventBatch", "make_event_id"]
@@ -1,10 +1,56 @@
 """Event model."""
 
-from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+import hashlib
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
+# Separates the normalized fields hashed into an event ID
+_ID_SEPARATOR = "\x1f"
+
+
+def _normalize_text(text: str) -> str:
+    """Fold compatibility forms, case and whitespace."""
+    # NFKC leaves ASCII unchanged
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.casefold().split())
+
+
+def _normalize_date(date: datetime) -> str:
+    """Format a date, converting aware dates to naive UTC."""
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date.isoformat()
+
+
+def make_event_id(name: str, date: Optional[datetime], location: str, url: str = "") -> str:
+    """Build a stable event ID from the normalized name, date and location.
+
+    The ID is a BLAKE2b digest, so it is the same in every process and
+    after restarts, and events that differ only in case, whitespace or
+    Unicode compatibility forms share it. An undated event is keyed on its
+    URL in place of the date, so parsing the same result again gives the
+    same ID without merging different undated events of the same name.
+
+    Args:
+        name: Event name
+        date: Event date, or None if unknown
+        location: Event location
+        url: Event URL, only used for undated events
+
+    Returns:
+        str: 32 hex character ID
+    """
+    if date is None:
+        parts = (_normalize_text(name), "", _normalize_text(location), url.strip())
+    else:
+        parts = (_normalize_text(name), _normalize_date(date), _normalize_text(location))
+    canonical = _ID_SEPARATOR.join(parts)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
 
 class Event(BaseModel):
     """Running event model."""
@@ -24,7 +70,7 @@ class Event(BaseModel):
 
     id: str = Field(default_factory=lambda: "")
     name: str
-    date: datetime
+    date: Optional[datetime]
     location: str
     description: str
     url: str
@@ -32,17 +78,23 @@ class Event(BaseModel):
     calendar_event_id: Optional[str] = None
 
     def __init__(self, **data):
-        """Initialize event with auto-generated ID if not provided."""
-        if "id" not in data:
-            data["id"] = str(hash(f"{data['name']}{data['date']}{data['location']}"))
+        """Initialize event with a content-derived ID if not provided."""
         super().__init__(**data)
+        if "id" not in data:
+            self.id = make_event_id(self.name, self.date, self.location, self.url)
 
     def to_calendar_event(self) -> Dict:
         """Convert to Google Calendar event format.
 
         Returns:
             Dict: Calendar event data
+
+        Raises:
+            ValueError: If the event has no date
         """
+        if self.date is None:
+            raise ValueError(f"Event has no date to schedule: {self.name}")
+
         # Estimate event duration based on distance
         # Rough estimate: 1km = 8 minutes for average runner
         duration_minutes = int(self.distance * 8) if self.distance > 0 else 120
@@ -104,3 +156,121 @@ class Event(BaseModel):
             "distance": self.distance,
             "calendar_event_id": self.calendar_event_id,
         }
+
+    @classmethod
+    def construct_many(cls, rows: Iterable[Dict[str, Any]]) -> List["Event"]:
+        """Create events from trusted data without validation.
+
+        For internal data whose values already have the field types (a
+        datetime ``date``, a float ``distance``), such as decoded cache
+        entries. Sets the same state as ``model_construct`` without its
+        per-field overhead, and generates IDs like ``Event(**row)``, so the
+        events equal validated ones.
+
+        Args:
+            rows: Field values of each event
+
+        Returns:
+            List[Event]: New event instances
+        """
+        new = cls.__new__
+        set_attribute = object.__setattr__
+        events = []
+        for row in rows:
+            values = _FIELD_DEFAULTS.copy()
+            values.update(row)
+            fields_set = set(row)
+            if "id" not in row:
+                values["id"] = make_event_id(
+                    values["name"], values["date"], values["location"], values["url"]
+                )
+                fields_set.add("id")
+            event = new(cls)
+            set_attribute(event, "__dict__", values)
+            set_attribute(event, "__pydantic_fields_set__", fields_set)
+            set_attribute(event, "__pydantic_extra__", None)
+            set_attribute(event, "__pydantic_private__", None)
+            events.append(event)
+        return events
+
+    @staticmethod
+    def to_dicts(events: Iterable["Event"]) -> List[Dict[str, Any]]:
+        """Convert many events to dictionaries, as ``to_dict`` does for one.
+
+        Args:
+            events: Events to convert
+
+        Returns:
+            List[Dict[str, Any]]: Event data in input order
+        """
+        rows = []
+        for event in events:
+            values = event.__dict__
+            date = values["date"]
+            rows.append(
+                {
+                    "id": values["id"],
+                    "name": values["name"],
+                    "date": date.isoformat() if date else None,
+                    "location": values["location"],
+                    "description": values["description"],
+                    "url": values["url"],
+                    "distance": values["distance"],
+                    "calendar_event_id": values["calendar_event_id"],
+                }
+            )
+        return rows
+
+    @staticmethod
+    def to_calendar_events(events: Iterable["Event"]) -> List[Dict]:
+        """Convert many events to Google Calendar format, as ``to_calendar_event`` does.
+
+        Args:
+            events: Events to convert
+
+        Returns:
+            List[Dict]: Calendar event data in input order
+
+        Raises:
+            ValueError: If an event has no date
+        """
+        calendar_events = []
+        durations: Dict[float, timedelta] = {}
+        for event in events:
+            values = event.__dict__
+            date = values["date"]
+            distance = values["distance"]
+            url = values["url"]
+            if date is None:
+                raise ValueError(f"Event has no date to schedule: {values['name']}")
+            # Same duration estimate as to_calendar_event, reused per distance
+            duration = durations.get(distance)
+            if duration is None:
+                minutes = int(distance * 8) if distance > 0 else 120
+                duration = durations[distance] = timedelta(minutes=minutes)
+            calendar_events.append(
+                {
+                    "summary": f"🏃 {values['name']}",
+                    "location": values["location"],
+                    "description": (
+                        f"{values['description']}\n\nDistance: {distance}km\nRegistration: {url}"
+                    ),
+                    "start": {"dateTime": date.isoformat(), "timeZone": "UTC"},
+                    "end": {"dateTime": (date + duration).isoformat(), "timeZone": "UTC"},
+                    "reminders": {
+                        "useDefault": False,
+                        "overrides": [
+                            {"method": "email", "minutes": 24 * 60},
+                            {"method": "popup", "minutes": 60},
+                        ],
+                    },
+                    "source": {"url": url, "title": "RunOn App"},
+                }
+            )
+        return calendar_events
+
+
+# Field values used by construct_many for fields missing from a row
+_FIELD_DEFAULTS: Dict[str, Any] = {
+    name: field.get_default(call_default_factory=True) for name, field in Event.model_fields.items()
+}
@@ -0,0 +1,317 @@
+"""Columnar event batch backed by NumPy arrays."""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .event import Event
+
+# Columns EventBatch can sort, rank and deduplicate by
+NUMERIC_COLUMNS = ("date", "distance")
+STRING_COLUMNS = ("id", "name", "location", "description", "url", "calendar_event_id")
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Date of undated rows; datetime64 reads it as NaT
+_NO_DATE = np.iinfo(np.int64).min
+
+Index = Union[int, slice, Sequence[int], np.ndarray]
+
+
+class DictionaryColumn:
+    """String column stored as integer codes into an array of unique values.
+
+    Repeated strings such as locations are stored once, and selecting rows
+    only copies codes; the values array is shared between selections.
+
+    Args:
+        codes: Index into ``values`` for each row
+        values: Unique strings, or None for missing values
+    """
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self, codes: np.ndarray, values: np.ndarray):
+        self.codes = codes
+        self.values = values
+
+    @classmethod
+    def encode(cls, strings: Iterable[Optional[str]]) -> "DictionaryColumn":
+        """Dictionary-encode strings in first-seen order."""
+        index: Dict[Optional[str], int] = {}
+        codes = np.fromiter((index.setdefault(s, len(index)) for s in strings), dtype=np.int32)
+        values = np.empty(len(index), dtype=object)
+        values[:] = list(index)
+        return cls(codes, values)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        return self.values[self.codes[row]]
+
+    def take(self, rows: Union[slice, np.ndarray]) -> "DictionaryColumn":
+        """Select rows, sharing the values array."""
+        return DictionaryColumn(self.codes[rows], self.values)
+
+    def decode(self) -> List[Optional[str]]:
+        """Get the strings of every row; the same str objects are returned."""
+        return self.values[self.codes].tolist()
+
+    def ranks(self) -> np.ndarray:
+        """Get a sort key per row that orders rows like their strings."""
+        order = np.argsort(np.where(self.values == None, "", self.values).astype(str))  # noqa: E711
+        ranks = np.empty(len(self.values), dtype=np.int64)
+        ranks[order] = np.arange(len(self.values))
+        return ranks[self.codes]
+
+    def isin(self, strings: Iterable[Optional[str]]) -> np.ndarray:
+        """Get a mask of the rows whose string is one of ``strings``."""
+        wanted = set(strings)
+        matching = [code for code, value in enumerate(self.values) if value in wanted]
+        return np.isin(self.codes, matching)
+
+
+class EventBatch:
+    """Events stored column by column for vectorized filtering and sorting.
+
+    Dates are int64 microseconds since the Unix epoch; naive dates are
+    taken as UTC and aware dates come back as UTC. Undated rows never pass
+    a date filter and sort after every date. Distances are float32
+    and come back as the shortest decimal that rounds to the stored value,
+    which is exact for distances with up to seven significant digits.
+    String fields are dictionary-encoded.
+
+    Filtering, sorting, top-k and dedup return new batches that share the
+    string dictionaries; Events are only created when rows are read.
+
+    Args:
+        date: Epoch microseconds per row
+        utc: Whether each row's date was timezone-aware
+        distance: Distance in kilometers per row
+        strings: Dictionary column for each name in STRING_COLUMNS
+    """
+
+    def __init__(
+        self,
+        date: np.ndarray,
+        utc: np.ndarray,
+        distance: np.ndarray,
+        strings: Dict[str, DictionaryColumn],
+    ):
+        self.date = date
+        self.utc = utc
+        self.distance = distance
+        self.strings = strings
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event]) -> "EventBatch":
+        """Build a batch from events.
+
+        Args:
+            events: Events to store
+
+        Returns:
+            EventBatch: Batch with one row per event, in order
+        """
+        rows = [event.__dict__ for event in events]
+        dates = [row["date"] for row in rows]
+        utc = np.fromiter(
+            (date is not None and date.tzinfo is not None for date in dates),
+            dtype=bool,
+            count=len(rows),
+        )
+        return cls(
+            date=np.fromiter(map(_to_epoch_us, dates), dtype=np.int64, count=len(rows)),
+            utc=utc,
+            distance=np.fromiter(
+                (row["distance"] for row in rows), dtype=np.float32, count=len(rows)
+            ),
+            strings={
+                name: DictionaryColumn.encode(row[name] for row in rows) for name in STRING_COLUMNS
+            },
+        )
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def column(self, name: str) -> np.ndarray:
+        """Get a sortable array for a column.
+
+        Args:
+            name: A name from NUMERIC_COLUMNS or STRING_COLUMNS
+
+        Returns:
+            np.ndarray: The numeric values, or string ranks in sort order
+        """
+        if name == "date":
+            return np.where(self.date == _NO_DATE, np.iinfo(np.int64).max, self.date)
+        if name in NUMERIC_COLUMNS:
+            return getattr(self, name)
+        if name in STRING_COLUMNS:
+            return self.strings[name].ranks()
+        raise ValueError(f"Unknown column: {name}")
+
+    def take(self, rows: Union[slice, np.ndarray]) -> "EventBatch":
+        """Select rows by slice, index array or boolean mask.
+
+        Args:
+            rows: Rows to keep, in the order to keep them
+
+        Returns:
+            EventBatch: Batch of the selected rows
+        """
+        return EventBatch(
+            date=self.date[rows],
+            utc=self.utc[rows],
+            distance=self.distance[rows],
+            strings={name: column.take(rows) for name, column in self.strings.items()},
+        )
+
+    def filter(
+        self,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        min_distance: Optional[float] = None,
+        max_distance: Optional[float] = None,
+        locations: Optional[Iterable[str]] = None,
+    ) -> "EventBatch":
+        """Keep the rows matching every given condition.
+
+        Args:
+            date_from: Earliest date, inclusive
+            date_to: Latest date, exclusive
+            min_distance: Shortest distance in kilometers, inclusive
+            max_distance: Longest distance in kilometers, inclusive
+            locations: Locations to keep
+
+        Returns:
+            EventBatch: Matching rows in their current order
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if date_from is not None:
+            mask &= self.date >= _to_epoch_us(date_from)
+        if date_to is not None:
+            mask &= (self.date < _to_epoch_us(date_to)) & (self.date != _NO_DATE)
+        if min_distance is not None:
+            mask &= self.distance >= np.float32(min_distance)
+        if max_distance is not None:
+            mask &= self.distance <= np.float32(max_distance)
+        if locations is not None:
+            mask &= self.strings["location"].isin(locations)
+        return self.take(mask)
+
+    def argsort(self, *by: str, descending: bool = False) -> np.ndarray:
+        """Get the row order for sorting by one or more columns.
+
+        Args:
+            by: Column names, most significant first; defaults to date
+            descending: Sort from largest to smallest
+
+        Returns:
+            np.ndarray: Row indexes in sorted order; ties keep their order
+        """
+        keys = [self.column(name) for name in reversed(by or ("date",))]
+        if descending:
+            keys = [-key.astype(np.float64) if key.dtype == np.float32 else -key for key in keys]
+        return np.lexsort(keys) if len(keys) > 1 else np.argsort(keys[0], kind="stable")
+
+    def sort(self, *by: str, descending: bool = False) -> "EventBatch":
+        """Sort rows by one or more columns, keeping the order of ties.
+
+        Args:
+            by: Column names, most significant first; defaults to date
+            descending: Sort from largest to smallest
+
+        Returns:
+            EventBatch: Sorted batch
+        """
+        return self.take(self.argsort(*by, descending=descending))
+
+    def top_k(self, k: int, by: str = "date", largest: bool = False) -> "EventBatch":
+        """Get the ``k`` rows with the smallest or largest values, sorted.
+
+        Args:
+            k: Number of rows
+            by: Column name
+            largest: Take the largest values instead of the smallest
+
+        Returns:
+            EventBatch: Up to ``k`` rows in sorted order
+        """
+        if k >= len(self):
+            return self.sort(by, descending=largest)
+        if k <= 0:
+            return self.take(np.arange(0))
+        values = self.column(by).astype(np.float64)
+        if largest:
+            values = -values
+        # Among rows tied at the k-th value, keep the earliest, like a stable sort
+        kth = np.partition(values, k - 1)[k - 1]
+        below = np.flatnonzero(values < kth)
+        tied = np.flatnonzero(values == kth)[: k - len(below)]
+        candidates = np.concatenate((below, tied))
+        order = np.lexsort((candidates, values[candidates]))
+        return self.take(candidates[order])
+
+    def dedup(self, by: str = "id") -> "EventBatch":
+        """Keep the first row for each value of a column.
+
+        Args:
+            by: Column name
+
+        Returns:
+            EventBatch: Rows with distinct values, in their current order
+        """
+        if by in STRING_COLUMNS:
+            values = self.strings[by].codes
+        else:
+            values = self.column(by)
+        _, first = np.unique(values, return_index=True)
+        return self.take(np.sort(first))
+
+    def to_events(self) -> List[Event]:
+        """Create an Event for every row.
+
+        Returns:
+            List[Event]: Events in row order
+        """
+        dates = self.date.astype("datetime64[us]").astype(object).tolist()
+        if self.utc.any():
+            dates = [
+                date.replace(tzinfo=timezone.utc) if aware else date
+                for date, aware in zip(dates, self.utc.tolist())
+            ]
+        # str() of a float32 is its shortest round-tripping decimal
+        distances = self.distance.astype(str).astype(np.float64).tolist()
+        columns: Dict[str, List[Any]] = {
+            name: column.decode() for name, column in self.strings.items()
+        }
+        columns["date"] = dates
+        columns["distance"] = distances
+        names = list(columns)
+        return Event.construct_many(
+            dict(zip(names, values)) for values in zip(*(columns[name] for name in names))
+        )
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self.to_events())
+
+    def __getitem__(self, rows: Index) -> Union[Event, "EventBatch"]:
+        """Get one row as an Event, or a batch of the selected rows."""
+        if isinstance(rows, (int, np.integer)):
+            if not -len(self) <= rows < len(self):
+                raise IndexError("EventBatch index out of range")
+            return self.take(slice(rows, rows + 1 or None)).to_events()[0]
+        return self.take(rows if isinstance(rows, slice) else np.asarray(rows))
+
+
+def _to_epoch_us(date: Optional[datetime]) -> int:
+    """Convert a date to epoch microseconds, taking naive dates as UTC."""
+    if date is None:
+        return _NO_DATE
+    epoch = _EPOCH if date.tzinfo is None else _EPOCH_UTC
+    return (date - epoch) // _MICROSECOND
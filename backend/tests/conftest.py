@@ -2,7 +2,7 @@
 
 import os
 import sys
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 from google.oauth2.credentials import Credentials
@@ -11,6 +11,48 @@ from google.oauth2.credentials import Credentials
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
+# Radius search runs against a small gazetteer of major cities
+os.environ.setdefault(
+    "RUNON_GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv")
+)
+
+
+class FakeClock:
+    """Manually advanced clock, in place of time.monotonic or time.time."""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock_start() -> float:
+    """Time the ``clock`` fixture starts at; override it in a module to change it."""
+    return 0.0
+
+
+@pytest.fixture
+def clock(clock_start):
+    """Provide a controllable clock."""
+    return FakeClock(clock_start)
+
+
+@pytest.fixture(autouse=True)
+def reset_search_state():
+    """Start every test with empty caches, no index, ample quota and single-attempt requests."""
+    from functions.event_discovery import search
+    from functions.event_discovery.quota import QuotaScheduler
+    from functions.event_discovery.retry import RetryingCaller, RetryPolicy
+
+    search._cache.clear()
+    search._breaker.reset()
+    quota = QuotaScheduler(rate=1000, burst=1000, daily_budget=1_000_000)
+    upstream = RetryingCaller(RetryPolicy(max_attempts=1))
+    with patch.multiple(search, _quota=quota, _upstream=upstream, _index=None):
+        yield
+
 
 @pytest.fixture
 def mock_credentials():
@@ -0,0 +1,130 @@
+"""Tests for batch searches."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic import ValidationError
+
+from functions.event_discovery.batch import (
+    BATCH_MAX_QUERIES,
+    ERROR,
+    OK,
+    BatchSearchRequest,
+    search_batch_async,
+)
+
+
+@pytest.fixture
+def mock_env_vars():
+    """Mock environment variables."""
+    with patch("functions.event_discovery.search.Environment") as mock_env:
+        mock_env.get_required.side_effect = lambda x: {
+            "RUNON_API_KEY": "test_api_key",
+            "RUNON_SEARCH_ENGINE_ID": "test_search_engine_id",
+        }[x]
+        yield mock_env
+
+
+def race(link, snippet="5K on 2099-06-01"):
+    return {"title": f"Race {link}", "snippet": snippet, "link": f"https://r/{link}"}
+
+
+@pytest.fixture
+def mock_requests():
+    """Answer trail searches with races a and b, and every other search with b and c."""
+
+    def get(url, params, **kwargs):
+        links = ["a", "b"] if params["q"].startswith("run trail") else ["b", "c"]
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"items": [race(link) for link in links]}
+        return response
+
+    with patch("requests.Session.get", side_effect=get) as mock_get:
+        yield mock_get
+
+
+@pytest.mark.asyncio
+async def test_batch_dedups_events_across_queries(mock_env_vars, mock_requests):
+    """Test that events found by several queries are returned once."""
+    result = await search_batch_async(
+        BatchSearchRequest(queries=["trail run", "5k"], location="Boston")
+    )
+
+    assert [event.url for event in result["events"]] == [
+        "https://r/a",
+        "https://r/b",
+        "https://r/c",
+    ]
+    trail, five_k = result["results"]
+    assert trail["query"] == "trail run" and trail["status"] == OK
+    assert five_k["query"] == "5k" and five_k["status"] == OK
+    ids = {event.url: event.id for event in result["events"]}
+    assert trail["event_ids"] == [ids["https://r/a"], ids["https://r/b"]]
+    assert five_k["event_ids"] == [ids["https://r/b"], ids["https://r/c"]]
+    assert all(outcome["elapsed_ms"] >= 0 for outcome in result["results"])
+    assert all(outcome["error"] is None for outcome in result["results"])
+
+
+@pytest.mark.asyncio
+async def test_batch_dedups_undated_events_by_url(mock_env_vars):
+    """Test that an undated result found by two queries is returned once."""
+
+    def get(url, params, **kwargs):
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"items": [race("b", snippet="5K, register now")]}
+        return response
+
+    with patch("requests.Session.get", side_effect=get):
+        result = await search_batch_async(BatchSearchRequest(queries=["trail run", "5k"]))
+
+    assert [event.url for event in result["events"]] == ["https://r/b"]
+    assert result["events"][0].date is None
+    trail, five_k = result["results"]
+    assert trail["event_ids"] == five_k["event_ids"] == [result["events"][0].id]
+
+
+@pytest.mark.asyncio
+async def test_batch_coalesces_equivalent_queries(mock_env_vars, mock_requests):
+    """Test that queries with the same canonical form share one upstream call."""
+    result = await search_batch_async(
+        BatchSearchRequest(queries=["Trail Run", "  run TRAIL ", "trail run"])
+    )
+
+    assert mock_requests.call_count == 1
+    assert len(result["events"]) == 2
+    assert len({tuple(outcome["event_ids"]) for outcome in result["results"]}) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_failing_query():
+    """Test that one failing query is reported without failing the others."""
+
+    async def search(query, location, max_results):
+        if query == "broken":
+            raise RuntimeError("upstream exploded")
+        return []
+
+    with patch("functions.event_discovery.search.search_running_events_async", search):
+        result = await search_batch_async(BatchSearchRequest(queries=["fine", "broken"]))
+
+    fine, broken = result["results"]
+    assert fine["status"] == OK and fine["error"] is None
+    assert broken["status"] == ERROR
+    assert broken["error"] == "upstream exploded"
+    assert broken["event_ids"] == []
+    assert result["events"] == []
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"queries": []},
+        {"queries": [""]},
+        {"queries": ["5k"] * (BATCH_MAX_QUERIES + 1)},
+        {"queries": ["5k"], "max_results": 0},
+    ],
+)
+def test_batch_request_validation(fields):
+    """Test that empty, oversized and out-of-range batches are refused."""
+    with pytest.raises(ValidationError):
+        BatchSearchRequest(**fields)
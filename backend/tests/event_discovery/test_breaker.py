@@ -0,0 +1,114 @@
+"""Tests for the upstream circuit breaker."""
+
+import pytest
+
+from functions.event_discovery.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def breaker(clock):
+    """Provide a breaker that opens after three failures."""
+    return CircuitBreaker("test", failure_threshold=3, reset_timeout=10, clock=clock)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    """Test that the breaker opens at the failure threshold."""
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats() == {
+        "state": OPEN,
+        "consecutive_failures": 3,
+        "rejected": 1,
+        "times_opened": 1,
+    }
+
+
+def test_success_resets_failure_count(breaker):
+    """Test that only consecutive failures count."""
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_limited_probes(breaker, clock):
+    """Test that one probe goes through after the reset timeout."""
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_released_probe_frees_its_slot(breaker, clock):
+    """Test that a probe given back unmade lets another call probe."""
+    for _ in range(3):
+        breaker.record_failure()
+    breaker.release()
+
+    clock.now += 10
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_successful_probe_closes(breaker, clock):
+    """Test that a successful probe closes the breaker."""
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens(breaker, clock):
+    """Test that a failed probe reopens the breaker for another timeout."""
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now += 9
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_late_failures_do_not_extend_open_period(breaker, clock):
+    """Test that failures recorded while open keep the original timeout."""
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 5
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.state == HALF_OPEN
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_reset(breaker):
+    """Test that reset closes the breaker and clears counters."""
+    for _ in range(3):
+        breaker.record_failure()
+    breaker.reset()
+    assert breaker.stats() == {
+        "state": CLOSED,
+        "consecutive_failures": 0,
+        "rejected": 0,
+        "times_opened": 0,
+    }
@@ -0,0 +1,492 @@
+"""Tests for the bounded search cache."""
+
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+import pytest
+import redis
+
+from functions.event_discovery.cache import (
+    CODEC_VERSION,
+    REDIS_KEY_PREFIX,
+    CachedEvents,
+    RedisCache,
+    SearchCache,
+    TieredSearchCache,
+    create_redis_client,
+    create_search_cache,
+    decode_events,
+    encode_events,
+    estimate_events_size,
+    hash_events,
+)
+from models.event import Event
+
+
+@pytest.fixture
+def clock_start():
+    """Start the clock well after zero, as time.monotonic does."""
+    return 1000.0
+
+
+def make_events(count: int, description: str = "Annual run") -> list:
+    """Build a list of distinct events."""
+    return [
+        Event(
+            name=f"Run {i}",
+            date=datetime(2024, 3, 15),
+            location="Boston",
+            description=description,
+            url=f"https://example.com/{i}",
+        )
+        for i in range(count)
+    ]
+
+
+def test_estimate_events_size_grows_with_content():
+    """Test that the size estimate tracks the amount of cached text."""
+    small = estimate_events_size(make_events(1))
+    large = estimate_events_size(make_events(1, description="x" * 1000))
+    assert estimate_events_size([]) > 0
+    assert large - small == 1000 - len("Annual run")
+    assert estimate_events_size(make_events(10)) > 9 * small
+
+
+def test_get_and_set(clock):
+    """Test basic hits and misses."""
+    cache = SearchCache(ttl=timedelta(minutes=5), clock=clock)
+    events = make_events(2)
+
+    assert cache.get("a") is None
+    cache.set("a", events)
+    assert cache.get("a") is events
+    assert "a" in cache
+    assert len(cache) == 1
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["bytes"] == estimate_events_size(events)
+
+
+def test_expired_entry_is_removed_on_read(clock):
+    """Test that reads past the TTL miss and drop the entry."""
+    cache = SearchCache(ttl=timedelta(seconds=10), clock=clock)
+    cache.set("a", make_events(1))
+
+    clock.now += 9
+    assert cache.get("a") is not None
+    clock.now += 1
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["bytes"] == 0
+
+
+def test_lru_eviction_by_entry_count(clock):
+    """Test that the least recently used entry is evicted first."""
+    cache = SearchCache(ttl=timedelta(minutes=5), max_entries=2, clock=clock)
+    cache.set("a", make_events(1))
+    cache.set("b", make_events(1))
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", make_events(1))
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_memory_budget(clock):
+    """Test that entries are evicted to stay within the byte budget."""
+    entry_size = estimate_events_size(make_events(1))
+    cache = SearchCache(ttl=timedelta(minutes=5), max_bytes=entry_size * 3, clock=clock)
+    for key in "abcd":
+        cache.set(key, make_events(1))
+
+    assert len(cache) == 3
+    assert "a" not in cache
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    assert cache.stats()["evictions"] == 1
+
+
+def test_oversized_value_is_not_cached(clock):
+    """Test that a value larger than the whole budget is skipped."""
+    cache = SearchCache(ttl=timedelta(minutes=5), max_bytes=100, clock=clock)
+    cache.set("a", make_events(1))
+    assert "a" not in cache
+    assert cache.stats()["bytes"] == 0
+
+
+def test_overwrite_replaces_size(clock):
+    """Test that overwriting a key does not double count its size."""
+    cache = SearchCache(ttl=timedelta(minutes=5), clock=clock)
+    cache.set("a", make_events(1))
+    cache.set("a", make_events(2))
+    assert len(cache) == 1
+    assert cache.stats()["bytes"] == estimate_events_size(make_events(2))
+
+
+def test_delete_and_clear(clock):
+    """Test explicit removal."""
+    cache = SearchCache(ttl=timedelta(minutes=5), clock=clock)
+    cache.set("a", make_events(1))
+    cache.set("b", make_events(1))
+
+    cache.delete("a")
+    cache.delete("missing")
+    assert "a" not in cache
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_sweep_removes_only_expired(clock):
+    """Test that a sweep drops expired entries and keeps fresh ones."""
+    cache = SearchCache(ttl=timedelta(seconds=10), clock=clock)
+    cache.set("old", make_events(1))
+    clock.now += 5
+    cache.set("new", make_events(1))
+    clock.now += 6
+
+    assert cache.sweep() == 1
+    assert "old" not in cache
+    assert "new" in cache
+    assert cache.stats()["expirations"] == 1
+
+
+def test_background_sweeper():
+    """Test that the sweeper thread removes expired entries without reads."""
+    cache = SearchCache(ttl=timedelta(milliseconds=10))
+    cache.set("a", make_events(1))
+
+    cache.start_sweeper(interval=0.01)
+    cache.start_sweeper(interval=0.01)  # Already running
+    deadline = time.monotonic() + 2
+    while "a" in cache and time.monotonic() < deadline:
+        time.sleep(0.01)
+    cache.stop_sweeper()
+    cache.stop_sweeper()  # Already stopped
+
+    assert "a" not in cache
+
+
+def test_concurrent_access_stays_consistent(clock):
+    """Test that concurrent readers and writers keep the accounting exact."""
+    cache = SearchCache(ttl=timedelta(minutes=5), max_entries=50, clock=clock)
+    events = make_events(1)
+
+    def worker(offset: int):
+        for i in range(500):
+            key = str((offset + i) % 80)
+            if cache.get(key) is None:
+                cache.set(key, events)
+
+    threads = [threading.Thread(target=worker, args=(n * 7,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats["entries"] == len(cache) <= 50
+    assert stats["bytes"] == len(cache) * estimate_events_size(events)
+    assert stats["hits"] + stats["misses"] == 8 * 500
+
+
+def test_lookup_serves_stale_until_hard_ttl(clock):
+    """Test the fresh, stale and expired phases of an entry."""
+    cache = SearchCache(ttl=timedelta(seconds=10), hard_ttl=timedelta(seconds=30), clock=clock)
+    events = make_events(1)
+    cache.set("a", events)
+
+    assert cache.lookup("a") == (events, False)
+    clock.now += 10
+    assert cache.lookup("a") == (events, True)
+    assert cache.get("a") is None  # get() only serves fresh entries
+    assert "a" in cache
+    clock.now += 20
+    assert cache.lookup("a") is None
+    assert "a" not in cache
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["stale_hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+
+
+def test_fresh_for_peeks_without_counting(clock):
+    """Test the remaining freshness of an entry, without touching counters."""
+    cache = SearchCache(ttl=timedelta(seconds=10), hard_ttl=timedelta(seconds=30), clock=clock)
+    assert cache.fresh_for("a") is None
+    cache.set("a", make_events(1))
+
+    clock.now += 4
+    assert cache.fresh_for("a") == 6
+    clock.now += 10
+    assert cache.fresh_for("a") == -4
+    clock.now += 16
+    assert cache.fresh_for("a") is None
+    stats = cache.stats()
+    assert stats["hits"] == stats["stale_hits"] == stats["misses"] == 0
+
+
+def test_custom_ttl_keeps_stale_window(clock):
+    """Test that a per-entry soft TTL keeps the configured stale window."""
+    cache = SearchCache(ttl=timedelta(seconds=10), hard_ttl=timedelta(seconds=30), clock=clock)
+    cache.set("a", make_events(1), ttl=timedelta(seconds=2))
+
+    clock.now += 2
+    assert cache.lookup("a")[1] is True
+    clock.now += 19
+    assert cache.lookup("a")[1] is True
+    clock.now += 1
+    assert cache.lookup("a") is None
+
+
+def test_set_with_age(clock):
+    """Test that an entry copied from elsewhere keeps its age."""
+    cache = SearchCache(ttl=timedelta(seconds=10), hard_ttl=timedelta(seconds=30), clock=clock)
+    cache.set("a", make_events(1), age=15)
+    assert cache.lookup("a")[1] is True
+
+
+def test_custom_hard_ttl(clock):
+    """Test that an entry can opt out of the stale window."""
+    cache = SearchCache(ttl=timedelta(seconds=10), hard_ttl=timedelta(seconds=30), clock=clock)
+    cache.set("a", [], ttl=timedelta(seconds=2), hard_ttl=timedelta(seconds=2))
+
+    clock.now += 2
+    assert cache.lookup("a") is None
+
+
+def test_hard_ttl_must_not_be_shorter():
+    """Test that an inverted TTL configuration is rejected."""
+    with pytest.raises(ValueError):
+        SearchCache(ttl=timedelta(seconds=10), hard_ttl=timedelta(seconds=5))
+
+
+@pytest.fixture
+def redis_client():
+    """Provide an isolated fake Redis server."""
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def remote(redis_client, clock):
+    """Provide a Redis cache over fake Redis."""
+    return RedisCache(redis_client, clock=clock, wall_clock=clock)
+
+
+def make_tiered(client, clock) -> TieredSearchCache:
+    """Build a tiered cache as one worker would."""
+    return TieredSearchCache(
+        remote=RedisCache(client, clock=clock, wall_clock=clock),
+        ttl=timedelta(minutes=5),
+        hard_ttl=timedelta(minutes=10),
+        clock=clock,
+    )
+
+
+def test_encode_decode_round_trip():
+    """Test that the compact codec preserves every field."""
+    events = make_events(3)
+    events[0].calendar_event_id = "cal123"
+    events[1].distance = 21.1
+
+    data = encode_events(events)
+    assert decode_events(data) == events
+    assert len(data) < len("".join(e.model_dump_json() for e in events))
+
+    events[2].date = None
+    assert decode_events(encode_events(events)) == events
+
+
+def test_cached_events_content_hash():
+    """Test that the content hash covers every field and is computed once."""
+    events = make_events(3)
+    cached = CachedEvents(events, fresh_until=1234.0)
+
+    assert cached == events
+    assert cached.fresh_until == 1234.0
+    assert cached.content_hash == CachedEvents(make_events(3)).content_hash
+    assert CachedEvents.of(cached) is cached
+    assert CachedEvents.of(events).content_hash == cached.content_hash
+    assert CachedEvents().content_hash != cached.content_hash
+    assert CachedEvents(events[:2]).content_hash != cached.content_hash
+    assert CachedEvents(events[::-1]).content_hash != cached.content_hash
+
+    changed = make_events(3)
+    changed[1].description += "!"
+    assert hash_events(changed) != cached.content_hash
+
+
+def test_decode_rejects_corrupt_payload():
+    """Test that unreadable payloads raise ValueError."""
+    with pytest.raises(ValueError):
+        decode_events(b"not zlib")
+    with pytest.raises(ValueError):
+        decode_events(zlib.compress(json.dumps([99, []]).encode()))
+    with pytest.raises(ValueError):
+        decode_events(zlib.compress(json.dumps([CODEC_VERSION, [["id", "name"]]]).encode()))
+
+
+def test_create_redis_client_without_host():
+    """Test that no client is created when Redis is not configured."""
+    with patch.dict(os.environ, {}, clear=True):
+        assert create_redis_client() is None
+        cache = create_search_cache(timedelta(minutes=5), timedelta(minutes=10), 10, 10_000)
+        assert type(cache) is SearchCache
+        assert cache.hard_ttl == timedelta(minutes=10)
+
+
+def test_create_redis_client_from_environment():
+    """Test that Redis settings come from the environment."""
+    env = {"REDIS_HOST": "cache.internal", "REDIS_PORT": "6380", "REDIS_DB": "2"}
+    with patch.dict(os.environ, env, clear=True):
+        client = create_redis_client()
+        cache = create_search_cache(timedelta(minutes=5), timedelta(minutes=10), 10, 10_000)
+
+    kwargs = client.connection_pool.connection_kwargs
+    assert kwargs["host"] == "cache.internal"
+    assert kwargs["port"] == 6380
+    assert kwargs["db"] == 2
+    assert isinstance(cache, TieredSearchCache)
+
+
+def test_redis_cache_round_trip(remote, redis_client, clock):
+    """Test storing and reading events with their age and Redis expiry."""
+    events = make_events(2)
+    assert remote.get_entry("a") is None
+
+    remote.set("a", events, ttl=timedelta(minutes=5), hard_ttl=timedelta(minutes=10))
+    clock.now += 30
+    cached, age, ttl, hard_ttl = remote.get_entry("a")
+    assert cached == events
+    assert age == 30
+    assert ttl == 300
+    assert hard_ttl == 600
+    assert cached.fresh_until == 1300
+    assert cached.content_hash == hash_events(events)
+    assert 0 < redis_client.pttl(REDIS_KEY_PREFIX + "a") <= 600_000
+
+    remote.delete("a")
+    assert remote.get_entry("a") is None
+    assert remote.stats() == {"hits": 1, "misses": 2, "errors": 0, "available": True}
+
+
+def test_redis_cache_drops_corrupt_entry(remote, redis_client):
+    """Test that a corrupt shared entry counts as a miss."""
+    redis_client.set(REDIS_KEY_PREFIX + "a", b"garbage")
+    assert remote.get_entry("a") is None
+    redis_client.set(REDIS_KEY_PREFIX + "a", b"\x00" * 24 + b"garbage")
+    assert remote.get_entry("a") is None
+
+
+def test_redis_cache_backs_off_after_error(clock):
+    """Test that a Redis failure disables the backend for a while."""
+    client = MagicMock()
+    client.get.side_effect = redis.ConnectionError("down")
+    client.set.side_effect = redis.ConnectionError("down")
+    client.delete.side_effect = redis.ConnectionError("down")
+    remote = RedisCache(client, retry_after=30, clock=clock)
+    ttl = timedelta(minutes=5)
+
+    assert remote.get_entry("a") is None
+    assert not remote.available
+
+    # Calls are skipped while unavailable
+    remote.set("a", make_events(1), ttl=ttl, hard_ttl=ttl)
+    remote.delete("a")
+    assert remote.get_entry("a") is None
+    client.set.assert_not_called()
+
+    clock.now += 30
+    remote.set("a", make_events(1), ttl=ttl, hard_ttl=ttl)
+    clock.now += 30
+    remote.delete("a")
+    assert remote.stats()["errors"] == 3
+
+
+def test_tiered_cache_shares_entries_between_workers(redis_client, clock):
+    """Test that one worker's results are served to another via Redis."""
+    worker_a = make_tiered(redis_client, clock)
+    worker_b = make_tiered(redis_client, clock)
+    events = make_events(2)
+
+    worker_a.set("a", events)
+    assert worker_b.get("a") == events
+    assert "a" in worker_b  # Filled into L1
+    assert worker_b.get("a") == events
+    assert worker_b.stats()["remote"]["hits"] == 1
+    assert 0 < redis_client.pttl(REDIS_KEY_PREFIX + "a") <= 600_000
+
+    worker_a.delete("a")
+    assert redis_client.get(REDIS_KEY_PREFIX + "a") is None
+    assert worker_a.get("missing") is None
+
+
+def test_tiered_cache_keeps_age_of_shared_entry(redis_client, clock):
+    """Test that L1 copies go stale and expire with the shared entry."""
+    worker_a = make_tiered(redis_client, clock)
+    worker_b = make_tiered(redis_client, clock)
+    worker_a.set("a", make_events(1), ttl=timedelta(seconds=60))
+
+    clock.now += 50
+    assert worker_b.lookup("a")[1] is False
+    clock.now += 10
+    assert worker_b.lookup("a")[1] is True
+
+    redis_client.delete(REDIS_KEY_PREFIX + "a")
+    clock.now += 300
+    assert worker_b.lookup("a") is None
+
+
+def test_tiered_cache_prefers_refreshed_shared_entry(redis_client, clock):
+    """Test that a stale local entry is replaced by a fresher shared one."""
+    worker_a = make_tiered(redis_client, clock)
+    worker_b = make_tiered(redis_client, clock)
+    old, new = make_events(1), make_events(2)
+
+    worker_b.set("a", old)
+    clock.now += 400
+    worker_a.set("a", new)
+
+    assert worker_b.lookup("a") == (new, False)
+
+
+def test_tiered_cache_shares_custom_hard_ttl(redis_client, clock):
+    """Test that a short-lived entry stays short-lived on other workers."""
+    worker_a = make_tiered(redis_client, clock)
+    worker_b = make_tiered(redis_client, clock)
+    worker_a.set("a", [], ttl=timedelta(seconds=30), hard_ttl=timedelta(seconds=30))
+
+    assert worker_b.lookup("a") == ([], False)
+    redis_client.delete(REDIS_KEY_PREFIX + "a")
+    clock.now += 30
+    assert worker_b.lookup("a") is None
+
+
+def test_tiered_cache_falls_back_to_local(clock):
+    """Test that an unavailable Redis leaves the local cache working."""
+    client = MagicMock()
+    client.get.side_effect = redis.ConnectionError("down")
+    client.set.side_effect = redis.ConnectionError("down")
+    cache = TieredSearchCache(
+        remote=RedisCache(client, clock=clock), ttl=timedelta(minutes=5), clock=clock
+    )
+    events = make_events(1)
+
+    assert cache.get("a") is None
+    cache.set("a", events)
+    assert cache.get("a") is events
+    assert cache.stats()["remote"]["available"] is False
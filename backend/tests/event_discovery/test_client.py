@@ -0,0 +1,90 @@
+"""Tests for the pooled Custom Search client."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from functions.event_discovery import client
+from functions.event_discovery.search import search_running_events_async
+from models.event import Event
+
+
+@pytest.fixture
+def fresh_client():
+    """Start every test without a shared session or executor."""
+    client.close_client()
+    yield client
+    client.close_client()
+
+
+def test_get_search_api_url_default():
+    """Test the default Custom Search endpoint."""
+    with patch.dict(os.environ, {}, clear=True):
+        assert client.get_search_api_url() == client.SEARCH_API_URL
+
+
+def test_get_search_api_url_override():
+    """Test overriding the endpoint for a local fake server."""
+    with patch.dict(os.environ, {"RUNON_SEARCH_API_URL": "http://127.0.0.1:9000/cse"}):
+        assert client.get_search_api_url() == "http://127.0.0.1:9000/cse"
+
+
+def test_init_client_is_idempotent(fresh_client):
+    """Test that repeated initialization keeps the same pool."""
+    fresh_client.init_client(pool_size=4)
+    session = fresh_client.get_session()
+    executor = fresh_client.get_executor()
+
+    fresh_client.init_client(pool_size=4)
+    assert fresh_client.get_session() is session
+    assert fresh_client.get_executor() is executor
+    assert executor._max_workers == 4
+    assert session.get_adapter("https://example.com")._pool_maxsize == 4
+
+
+def test_get_session_creates_client_lazily(fresh_client):
+    """Test that the session is created on first use."""
+    assert fresh_client._session is None
+    assert fresh_client.get_session() is not None
+    assert fresh_client.get_executor() is not None
+
+
+def test_get_executor_creates_client_lazily(fresh_client):
+    """Test that the executor is created on first use."""
+    assert fresh_client.get_executor() is not None
+    assert fresh_client._session is not None
+
+
+def test_close_client_resets_state(fresh_client):
+    """Test that closing releases the session and executor."""
+    fresh_client.init_client(pool_size=2)
+    fresh_client.close_client()
+    assert fresh_client._session is None
+    assert fresh_client._executor is None
+
+    # Closing twice is harmless
+    fresh_client.close_client()
+
+
+@pytest.mark.asyncio
+async def test_search_running_events_async_uses_executor(fresh_client):
+    """Test that the async search runs the blocking search off the loop."""
+    event = Event(
+        name="Async Run",
+        date="2024-03-15T00:00:00",
+        location="Boston",
+        description="",
+        url="https://example.com",
+    )
+
+    def fake_lookup(cache_key, query, location, start):
+        import threading
+
+        assert threading.current_thread().name.startswith("runon-search")
+        return [event]
+
+    with patch("functions.event_discovery.search._lookup_or_fetch", fake_lookup):
+        events = await search_running_events_async("5K", "Boston")
+
+    assert events == [event]
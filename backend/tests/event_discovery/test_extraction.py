@@ -0,0 +1,103 @@
+"""Tests for the compiled date and distance extractor."""
+
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.bench_extraction import legacy_extract
+from benchmarks.corpus import generate_items, generate_snippets
+from functions.event_discovery.extraction import (
+    extract_date,
+    extract_date_and_distance,
+    extract_distance,
+    extract_events_batch,
+    extract_item,
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Race on march 15 2024", datetime(2024, 3, 15)),
+        ("Race on 5 MARCH 2024", datetime(2024, 3, 5)),
+        ("Race on 15/03/2024", datetime(2024, 3, 15)),
+        ("Race on 2024-03-15", datetime(2024, 3, 15)),
+        # An earlier format wins even when it appears later in the text
+        ("2024-01-05 or March 15, 2024", datetime(2024, 3, 15)),
+        # An invalid date falls through to the next format
+        ("February 30, 2024 moved to 2024-01-05", datetime(2024, 1, 5)),
+        # Zero-padded years keep dateutil's century handling
+        ("July 02, 0012", datetime(2012, 7, 2)),
+        ("Race on 2024-02-30", None),
+        ("No date here", None),
+    ],
+)
+def test_extract_date(text, expected):
+    """Test date formats, priority and fallbacks."""
+    assert extract_date(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Marathon and 10K", 10.0),
+        ("Half  Marathon then a 5K", 5.0),
+        ("HalfMarathon", 21.1),
+        ("The marathon", 42.2),
+        ("A 15k trail run", None),
+        # Lowercasing outside ASCII can create a word boundary
+        ("İ5k", 5.0),
+    ],
+)
+def test_extract_distance(text, expected):
+    """Test distance priority and word boundaries."""
+    assert extract_distance(text) == expected
+
+
+def test_extract_date_and_distance_non_ascii():
+    """Test that non-ASCII text gives the same results as the separate calls."""
+    text = "İ marathon on March 5, 2024"
+    assert extract_date_and_distance(text) == (datetime(2024, 3, 5), 42.2)
+
+
+def test_matches_legacy_extractors():
+    """Test parity with the original extractors on a realistic corpus."""
+    for text in generate_snippets(2000, seed=11):
+        assert extract_date_and_distance(text) == legacy_extract(text), text
+
+
+def test_extract_item():
+    """Test Event fields and defaults for a search result item."""
+    item = {"title": "City 10K", "snippet": "On 2024-05-04", "link": "https://example.com"}
+    assert extract_item(item) == {
+        "name": "City 10K",
+        "description": "On 2024-05-04",
+        "url": "https://example.com",
+        "date": datetime(2024, 5, 4),
+        "distance": 10.0,
+    }
+    assert extract_item({}) == {
+        "name": "Unknown Event",
+        "description": "",
+        "url": "",
+        "date": None,
+        "distance": None,
+    }
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_extract_events_batch_matches_items(workers):
+    """Test that chunked batches, inline or in processes, keep order and results."""
+    items = generate_items(250, seed=3)
+    results = extract_events_batch(iter(items), workers=workers, chunk_size=20)
+    assert list(results) == [extract_item(item) for item in items]
+
+
+def test_extract_events_batch_small_input_runs_inline():
+    """Test that input fitting one chunk never starts worker processes."""
+    items = generate_items(5)
+    with patch("functions.event_discovery.extraction.ProcessPoolExecutor") as pool:
+        assert list(extract_events_batch(items, workers=4)) == [extract_item(i) for i in items]
+        assert list(extract_events_batch([], workers=4)) == []
+    pool.assert_not_called()
@@ -0,0 +1,333 @@
+"""Tests for search response formats and compression."""
+
+import gzip
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import List
+from unittest.mock import patch
+
+import msgpack
+import pytest
+from pydantic import TypeAdapter
+
+from functions.event_discovery import formats
+from functions.event_discovery.formats import (
+    EVENT_STREAM,
+    JSON,
+    MSGPACK,
+    NDJSON,
+    cache_control,
+    compress,
+    decode_msgpack,
+    decode_msgpack_rows,
+    encode_json,
+    encode_json_document,
+    encode_msgpack,
+    encode_stream_end,
+    encode_stream_error,
+    encode_stream_event,
+    entity_tag,
+    etag_matches,
+    negotiate_encoding,
+    negotiate_format,
+    negotiate_stream_format,
+    parse_fields,
+    render_events,
+    to_epoch_millis,
+)
+from models.event import Event
+
+
+def make_events():
+    return [
+        Event(
+            name="Zürich Lauf",
+            date=datetime(2024, 3, 15, 9, 30, 0, 123456),
+            location="Zürich",
+            description="Scenic",
+            url="https://test.com/1",
+            distance=21.1,
+        ),
+        Event(
+            name="UTC Run",
+            date=datetime(2024, 4, 1, 8, tzinfo=timezone.utc),
+            location="Boston",
+            description="",
+            url="https://test.com/2",
+            distance=5.0,
+            calendar_event_id="cal1",
+        ),
+        Event(
+            name="Offset Run",
+            date=datetime(2024, 4, 1, 8, tzinfo=timezone(timedelta(hours=-5))),
+            location="Boston",
+            description="",
+            url="https://test.com/3",
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, JSON),
+        ("", JSON),
+        ("*/*", JSON),
+        ("application/json", JSON),
+        ("application/x-msgpack", MSGPACK),
+        ("application/msgpack, application/json", MSGPACK),
+        ("application/json;q=0.5, application/vnd.msgpack", MSGPACK),
+        ("application/x-msgpack;q=0.9, application/*", JSON),
+        ("text/html, */*;q=0.1", JSON),
+        ("APPLICATION/X-MSGPACK", MSGPACK),
+        ("text/html", None),
+        ("application/json;q=0", None),
+        ("application/json;q=bad", None),
+    ],
+)
+def test_negotiate_format(accept, expected):
+    """Test that the best supported type wins, first listed on ties."""
+    assert negotiate_format(accept) == expected
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, NDJSON),
+        ("*/*", NDJSON),
+        ("application/x-ndjson", NDJSON),
+        ("application/jsonl", NDJSON),
+        ("text/event-stream", EVENT_STREAM),
+        ("text/*", EVENT_STREAM),
+        ("application/x-ndjson;q=0.5, text/event-stream", EVENT_STREAM),
+        ("application/json", None),
+    ],
+)
+def test_negotiate_stream_format(accept, expected):
+    """Test choosing between JSON lines and server-sent events."""
+    assert negotiate_stream_format(accept) == expected
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "gzip"),
+        ("*", "gzip"),
+        ("gzip;q=0, *", None),
+        ("deflate", None),
+        ("gzip, , deflate", "gzip"),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    """Test content coding negotiation without brotli installed."""
+    with patch.object(formats, "ENCODINGS", ("gzip",)):
+        assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_negotiate_encoding_prefers_brotli():
+    """Test that brotli is preferred when available and accepted."""
+    with patch.object(formats, "ENCODINGS", ("br", "gzip")):
+        assert negotiate_encoding("gzip, deflate, br") == "br"
+        assert negotiate_encoding("gzip, br;q=0.5") == "gzip"
+
+
+def test_encode_json_matches_pydantic():
+    """Test that orjson output has the same content as pydantic's JSON."""
+    events = make_events()
+    pydantic_json = json.loads(TypeAdapter(List[Event]).dump_json(events))
+
+    assert json.loads(encode_json(events)) == pydantic_json
+    assert json.loads(encode_json([])) == []
+
+
+def test_encode_json_document_encodes_nested_events():
+    """Test that events inside other documents encode like ``encode_json``."""
+    events = make_events()
+    document = json.loads(encode_json_document({"events": events, "count": len(events)}))
+
+    assert document == {"events": json.loads(encode_json(events)), "count": len(events)}
+    with pytest.raises(TypeError):
+        encode_json_document({"events": {object()}})
+
+
+def test_encode_stream_ndjson():
+    """Test that each event is a JSON line like its ``encode_json`` object."""
+    events = make_events()
+    lines = b"".join(encode_stream_event(event, NDJSON) for event in events)
+
+    assert lines.count(b"\n") == len(events)
+    assert [json.loads(line) for line in lines.splitlines()] == json.loads(encode_json(events))
+    assert json.loads(encode_stream_event(events[0], NDJSON, ("name",))) == {"name": "Zürich Lauf"}
+    assert encode_stream_end(3, NDJSON) is None
+    assert json.loads(encode_stream_error("boom", NDJSON)) == {"error": "boom"}
+
+
+def test_encode_stream_event_stream():
+    """Test that events, the end and errors are framed as server-sent events."""
+    event = make_events()[1]
+    message = encode_stream_event(event, EVENT_STREAM, ("id", "date"))
+
+    assert message.startswith(b"event: event\ndata: ")
+    assert message.endswith(b"\n\n")
+    data = json.loads(message.split(b"data: ", 1)[1])
+    assert data == {"id": event.id, "date": "2024-04-01T08:00:00Z"}
+    assert encode_stream_end(3, EVENT_STREAM) == b'event: end\ndata: {"count":3}\n\n'
+    assert encode_stream_error("boom", EVENT_STREAM) == (
+        b'event: error\ndata: {"error":"boom"}\n\n'
+    )
+
+
+def test_msgpack_round_trip():
+    """Test msgpack encoding with epoch-millisecond UTC dates."""
+    events = make_events()
+    body = encode_msgpack(events)
+    document = msgpack.unpackb(body)
+
+    assert document["version"] == formats.MSGPACK_VERSION
+    assert document["fields"] == list(formats.MSGPACK_FIELDS)
+    assert document["events"][1][2] == 1711958400000
+    assert len(body) < len(encode_json(events))
+
+    decoded = decode_msgpack(body)
+    assert [event.id for event in decoded] == [event.id for event in events]
+    assert decoded[0].date == datetime(2024, 3, 15, 9, 30, 0, 123000)
+    assert decoded[1].date == datetime(2024, 4, 1, 8)
+    assert decoded[2].date == datetime(2024, 4, 1, 13)
+    assert decoded[0].distance == 21.1
+
+
+def test_decode_msgpack_rejects_unknown_schema():
+    """Test that documents with another schema are refused."""
+    body = msgpack.packb({"version": 2, "fields": formats.MSGPACK_FIELDS, "events": []})
+    with pytest.raises(ValueError):
+        decode_msgpack(body)
+    body = msgpack.packb({"version": 1, "fields": ["secret"], "events": []})
+    with pytest.raises(ValueError):
+        decode_msgpack(body)
+
+
+def test_to_epoch_millis():
+    """Test that naive dates are taken as UTC."""
+    assert to_epoch_millis(datetime(1970, 1, 1, 0, 0, 1)) == 1000
+    assert to_epoch_millis(datetime(1970, 1, 1, 1, tzinfo=timezone(timedelta(hours=1)))) == 0
+    assert to_epoch_millis(None) is None
+
+
+def test_undated_events_round_trip():
+    """Test that undated events keep no date in either format."""
+    event = Event(name="Someday", date=None, location="X", description="", url="https://a")
+
+    assert decode_msgpack(encode_msgpack([event])) == [event]
+    assert json.loads(encode_json([event]))[0]["date"] is None
+
+
+def test_compress_threshold():
+    """Test that only bodies above the threshold are compressed."""
+    small = b"x" * (formats.COMPRESS_MIN_BYTES - 1)
+    large = b"x" * formats.COMPRESS_MIN_BYTES
+
+    assert compress(small, "gzip") == (small, None)
+    assert compress(large, None) == (large, None)
+    body, encoding = compress(large, "gzip")
+    assert encoding == "gzip"
+    assert gzip.decompress(body) == large
+    assert compress(large, "gzip") == (body, "gzip")
+
+
+def test_compress_brotli():
+    """Test that the brotli coding uses the brotli module."""
+    fake = SimpleNamespace(compress=lambda body, quality: zlib.compress(body, quality))
+    large = b"x" * formats.COMPRESS_MIN_BYTES
+    with patch.object(formats, "brotli", fake):
+        body, encoding = compress(large, "br")
+    assert encoding == "br"
+    assert zlib.decompress(body) == large
+
+
+def test_render_events_headers():
+    """Test the headers sent with rendered events."""
+    body, headers = render_events(make_events()[:1], JSON, "gzip")
+    assert headers == {"Vary": "Accept, Accept-Encoding"}
+    assert json.loads(body)[0]["name"] == "Zürich Lauf"
+
+    events = make_events() * 10
+    body, headers = render_events(events, MSGPACK, "gzip")
+    assert headers["Content-Encoding"] == "gzip"
+    assert len(decode_msgpack(gzip.decompress(body))) == 30
+
+
+def test_entity_tag_per_representation():
+    """Test that every format and coding gets its own strong tag."""
+    tags = {
+        entity_tag("abc", media_type, encoding)
+        for media_type in (JSON, MSGPACK)
+        for encoding in (None, "gzip", "br")
+    }
+    assert len(tags) == 6
+    assert entity_tag("abc", JSON, None) == '"abc-json"'
+    assert entity_tag("abc", MSGPACK, "gzip") == '"abc-msgpack+gzip"'
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        (None, False),
+        ("", False),
+        ('"abc-json"', True),
+        ('W/"abc-json"', True),
+        ('"old-json", "abc-json"', True),
+        ("*", True),
+        ('"abc-msgpack"', False),
+        ("abc-json", False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    """Test If-None-Match comparison against the current tag."""
+    assert etag_matches(if_none_match, '"abc-json"') == expected
+
+
+def test_cache_control():
+    """Test that max-age is the whole seconds of remaining freshness."""
+    assert cache_control(3600.9) == "private, max-age=3600"
+    assert cache_control(-5) == "private, max-age=0"
+
+
+def test_parse_fields():
+    """Test parsing and validating a field selection."""
+    assert parse_fields(None) is None
+    assert parse_fields("name, date,distance,name") == ("name", "date", "distance")
+    with pytest.raises(ValueError):
+        parse_fields("name,secret")
+    with pytest.raises(ValueError):
+        parse_fields(" , ")
+
+
+def test_field_selection():
+    """Test that encoders only write the selected fields."""
+    events = make_events()
+    fields = ("name", "date", "distance")
+
+    rows = json.loads(encode_json(events, fields))
+    assert rows[0] == {
+        "name": "Zürich Lauf",
+        "date": "2024-03-15T09:30:00.123456",
+        "distance": 21.1,
+    }
+    assert len(encode_json(events, fields)) < len(encode_json(events)) / 2
+
+    rows = decode_msgpack_rows(encode_msgpack(events, fields))
+    assert rows[1] == {"name": "UTC Run", "date": datetime(2024, 4, 1, 8), "distance": 5.0}
+    assert decode_msgpack_rows(encode_msgpack(events, ("calendar_event_id",)))[1] == {
+        "calendar_event_id": "cal1"
+    }
+    with pytest.raises(ValueError):
+        decode_msgpack(encode_msgpack(events, fields))
+    assert decode_msgpack(encode_msgpack([], fields)) == []
+
+    assert entity_tag("abc", JSON, None, fields) != entity_tag("abc", JSON, None)
+    assert entity_tag("abc", JSON, None, fields) != entity_tag("abc", JSON, None, fields[:2])
@@ -0,0 +1,197 @@
+"""Tests for the offline gazetteer and radius filtering."""
+
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from functions.event_discovery import geo
+from functions.event_discovery.geo import (
+    Gazetteer,
+    KDTree,
+    Place,
+    _unit_vectors,
+    get_gazetteer,
+    haversine_km,
+    sort_by_proximity,
+)
+from models.event import Event
+
+
+@pytest.fixture
+def gazetteer():
+    """The test gazetteer, with fresh memoization counters."""
+    return Gazetteer(get_gazetteer().places)
+
+
+def make_event(location):
+    return Event(
+        name=f"Run in {location}",
+        date=datetime(2099, 1, 1),
+        location=location,
+        description="",
+        url=f"https://example.com/{location}",
+    )
+
+
+def test_haversine_km():
+    """Test distances against known city pairs, with arrays broadcast."""
+    assert haversine_km(42.3601, -71.0589, 40.7128, -74.0060) == pytest.approx(306, abs=2)
+    assert haversine_km(51.5074, -0.1278, 48.8566, 2.3522) == pytest.approx(344, abs=2)
+    distances = haversine_km(0.0, 0.0, np.array([0.0, 0.0]), np.array([0.0, 180.0]))
+    assert distances[0] == 0
+    assert distances[1] == pytest.approx(np.pi * 6371.0088)
+
+
+@pytest.mark.parametrize(
+    "location, expected",
+    [
+        ("Boston", ("Boston", "MA")),
+        ("boston,  MA", ("Boston", "MA")),
+        ("Central Park, New York, NY", ("New York", "NY")),
+        ("02108", ("Boston", "MA")),
+        ("5k boston", ("Boston", "MA")),
+        ("Portland", ("Portland", "OR")),
+        ("Portland, ME", ("Portland", "ME")),
+        ("Concord", ("Concord", "NH")),
+        ("Concord, MA", ("Concord", "MA")),
+        ("Montréal", ("Montreal", "QC")),
+    ],
+)
+def test_resolve(gazetteer, location, expected):
+    """Test that free-text locations resolve to the place they name."""
+    place = gazetteer.resolve(location)
+    assert (place.name, place.region) == expected
+
+
+def test_resolve_unknown_and_memoized(gazetteer):
+    """Test that unknown locations give None and repeats are memoized."""
+    assert gazetteer.resolve("Atlantis") is None
+    assert gazetteer.resolve(None) is None
+    assert gazetteer.resolve("") is None
+    gazetteer.resolve("Boston")
+    gazetteer.resolve("Boston")
+
+    stats = gazetteer.stats()
+    assert stats["places"] == len(gazetteer) > 90
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+
+
+def test_kd_tree_matches_brute_force():
+    """Test radius and nearest queries against a linear scan."""
+    rng = np.random.default_rng(7)
+    latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, 500)))
+    longitudes = rng.uniform(-180, 180, 500)
+    points = _unit_vectors(latitudes, longitudes)
+    tree = KDTree(points)
+    assert len(tree) == 500
+
+    for latitude, longitude in [(42.36, -71.06), (-33.87, 151.21), (89.9, 0.0), (0.0, 179.9)]:
+        point = _unit_vectors(np.array([latitude]), np.array([longitude]))[0]
+        chords = np.linalg.norm(points - point, axis=1)
+        for radius in (0.05, 0.3, 1.0):
+            assert sorted(tree.within(point.tolist(), radius)) == list(
+                np.flatnonzero(chords <= radius)
+            )
+        assert tree.nearest(point.tolist()) == int(np.argmin(chords))
+
+
+def test_within_and_nearest(gazetteer):
+    """Test finding places around a point, closest first."""
+    boston = gazetteer.resolve("Boston")
+    nearby = gazetteer.within(boston.latitude, boston.longitude, 65)
+    assert [(place.name, place.region) for place in nearby] == [
+        ("Boston", "MA"),
+        ("Cambridge", "MA"),
+        ("Concord", "MA"),
+        ("Hopkinton", "MA"),
+        ("Worcester", "MA"),
+    ]
+    assert gazetteer.within(0.0, -30.0, 100) == []
+    assert gazetteer.nearest(42.37, -71.11).name == "Cambridge"
+    assert gazetteer.nearest(-34.0, 151.0).name == "Sydney"
+
+
+def test_empty_gazetteer():
+    """Test that a gazetteer without places resolves nothing."""
+    empty = Gazetteer([])
+    assert empty.resolve("Boston") is None
+    assert empty.within(0.0, 0.0, 100) == []
+
+
+def test_from_csv(tmp_path):
+    """Test loading a gazetteer file with the bundled columns."""
+    path = tmp_path / "places.csv"
+    path.write_text(
+        "name,region,country,postal_code,latitude,longitude,population\n"
+        "Smallville,KS,US,,39.0,-98.0,\n"
+    )
+    gazetteer = Gazetteer.from_csv(str(path))
+    assert gazetteer.resolve("Smallville, KS") == Place(
+        "Smallville", "KS", "US", "", 39.0, -98.0, 0
+    )
+
+
+def test_sort_by_proximity(gazetteer):
+    """Test ordering events by distance and dropping those outside the radius."""
+    events = [
+        make_event(location)
+        for location in ["Providence", "Nowhere", "Cambridge, MA", "New York", "Worcester"]
+    ]
+    origin = gazetteer.resolve("Boston")
+
+    assert [e.location for e in sort_by_proximity(events, origin, gazetteer=gazetteer)] == [
+        "Cambridge, MA",
+        "Worcester",
+        "Providence",
+        "New York",
+        "Nowhere",
+    ]
+    assert [e.location for e in sort_by_proximity(events, origin, 70, gazetteer)] == [
+        "Cambridge, MA",
+        "Worcester",
+        "Providence",
+    ]
+    assert sort_by_proximity([], origin, 70) == []
+
+
+def test_sort_by_proximity_places_events_by_their_own_text(gazetteer):
+    """Test that events are placed by the place they name, else by their location."""
+    events = [
+        Event(name=name, date=datetime(2099, 1, 1), location="Boston", description=text, url=url)
+        for name, text, url in [
+            ("Spring 5K", "", "https://example.com/1"),
+            ("Ocean State 10K", "Downtown Providence, RI", "https://example.com/2"),
+            ("Harbor Run", "", "https://example.com/3"),
+            ("Charles River 5K", "Starts in Cambridge, MA", "https://example.com/4"),
+        ]
+    ]
+    origin = gazetteer.resolve("Boston")
+
+    nearby = sort_by_proximity(events, origin, 20, gazetteer)
+    assert [e.url[-1] for e in nearby] == ["1", "3", "4"]
+    ordered = sort_by_proximity(events, origin, gazetteer=gazetteer)
+    assert [e.url[-1] for e in ordered] == ["1", "3", "4", "2"]
+
+
+def test_gazetteer_must_be_configured(gazetteer):
+    """Test that without RUNON_GAZETTEER_PATH there is no gazetteer to sort with."""
+    origin = gazetteer.resolve("Boston")
+    get_gazetteer.cache_clear()
+    try:
+        with patch.object(geo, "GAZETTEER_PATH", None):
+            assert get_gazetteer() is None
+            with pytest.raises(ValueError):
+                sort_by_proximity([make_event("Boston")], origin)
+    finally:
+        get_gazetteer.cache_clear()
+
+
+def test_place_label(gazetteer):
+    """Test that labels carry the region when there is one."""
+    assert gazetteer.resolve("Portland, ME").label == "Portland, ME"
+    assert Place("Smallville", "", "US", "", 39.0, -98.0, 0).label == "Smallville"
+    assert gazetteer.place_named(None, "", "Race in Tulsa").label == "Tulsa, OK"
+    assert gazetteer.place_named("Spring 5K") is None
@@ -0,0 +1,235 @@
+"""Tests for the local event index."""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from functions.event_discovery import index as index_module
+from functions.event_discovery.index import EventIndex, create_event_index, match_expression
+from models.event import Event
+
+SOON = datetime.now().replace(microsecond=0) + timedelta(days=30)
+
+
+def make_event(name, location="Boston", description="", days=0, distance=5.0):
+    return Event(
+        name=name,
+        date=SOON + timedelta(days=days),
+        location=location,
+        description=description,
+        url=f"https://example.com/{name.replace(' ', '-')}",
+        distance=distance,
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    """An empty index in a temporary database."""
+    event_index = EventIndex(str(tmp_path / "events.db"))
+    yield event_index
+    event_index.close()
+
+
+def names(events):
+    return [event.name for event in events]
+
+
+def test_match_expression_uses_canonical_words():
+    """Test that searches become quoted FTS5 terms, location words per column."""
+    assert match_expression("Half in Boston") == '"boston" AND "half" AND "marathon"'
+    assert match_expression("5K", "Portland, ME") == (
+        '"5k" AND location : "portland" AND location : "me"'
+    )
+    assert match_expression("", None) == ""
+
+
+def test_upsert_and_search_round_trip(index):
+    """Test that stored events come back equal and match words in any column."""
+    events = [
+        make_event("Harbor 5K", description="Fast flat course"),
+        make_event("Trail Half Marathon", location="Concord", description="Hilly trail"),
+    ]
+    assert index.upsert(events) == 2
+    assert len(index) == 2
+
+    assert index.search("5k") == [events[0]]
+    assert index.search("flat") == [events[0]]
+    assert index.search("trail", "Concord") == [events[1]]
+    assert index.search("trail", "Boston") == []
+    assert index.search("Café", None) == []
+    assert index.search("") == []
+
+
+def test_upsert_replaces_known_events(index):
+    """Test that upserting an event again updates its text in the FTS table."""
+    event = make_event("Harbor 5K", description="Fast flat course")
+    index.upsert([event])
+    updated = event.model_copy(update={"description": "Scenic hilly course"})
+    index.upsert([updated])
+
+    assert len(index) == 1
+    assert index.search("flat") == []
+    assert index.search("scenic") == [updated]
+    assert index.upsert([]) == 0
+
+
+def test_upsert_is_keyed_by_url(index):
+    """Test that an event seen again under another location replaces the stored copy."""
+    event = make_event("Harbor 5K")
+    index.upsert([event])
+    moved = event.model_copy(update={"location": "Boston, MA", "id": "other"})
+    index.upsert([moved])
+
+    assert len(index) == 1
+    assert index.search("harbor") == [moved]
+
+
+def test_upsert_failure_rolls_back(index):
+    """Test that a failed batch leaves the index unchanged and usable."""
+    good = make_event("Harbor 5K")
+    bad = make_event("Broken 5K").model_copy(update={"name": None})
+
+    with pytest.raises(sqlite3.IntegrityError):
+        index.upsert([good, bad])
+    assert len(index) == 0
+    index.upsert([good])
+    assert len(index) == 1
+
+
+def test_search_filters_on_date_and_distance(index):
+    """Test the date and distance range filters and ordering by date."""
+    index.upsert(
+        [
+            make_event("Spring 5K Run", days=10, distance=5.0),
+            make_event("Summer 10K Run", days=100, distance=10.0),
+            make_event("Autumn Marathon Run", days=200, distance=42.2),
+        ]
+    )
+
+    assert names(index.search("run")) == ["Spring 5K Run", "Summer 10K Run", "Autumn Marathon Run"]
+    assert names(index.search("run", limit=1)) == ["Spring 5K Run"]
+    assert names(index.search("run", date_from=SOON + timedelta(days=10))) == [
+        "Summer 10K Run",
+        "Autumn Marathon Run",
+    ]
+    assert names(index.search("run", date_to=SOON + timedelta(days=100))) == [
+        "Spring 5K Run",
+        "Summer 10K Run",
+    ]
+    assert names(index.search("run", min_distance=6, max_distance=21.1)) == ["Summer 10K Run"]
+
+
+def test_lookup_returns_fresh_upcoming_matches(index):
+    """Test that lookups skip past and stale events and bound freshness."""
+    now = time.time()
+    index.upsert([make_event("Harbor 5K", days=1)], indexed_at=now - 50)
+    index.upsert([make_event("Bay 5K", days=2)], indexed_at=now - 10)
+    index.upsert([make_event("Old 5K", days=3)], indexed_at=now - 500)
+    index.upsert([make_event("Past 5K", days=-60)], indexed_at=now)
+
+    found = index.lookup("5k", "Boston", wanted=2, max_age=100)
+    assert names(found) == ["Harbor 5K", "Bay 5K"]
+    assert found.fresh_until == pytest.approx(now + 50)
+
+    assert names(index.lookup("5k", None, wanted=5, max_age=100)) == ["Harbor 5K", "Bay 5K"]
+    assert index.lookup("10k", None, wanted=1, max_age=100) == []
+    assert index.stats()["hits"] == 1
+    assert index.stats()["misses"] == 2
+
+
+def test_lookup_survives_database_errors(index):
+    """Test that a failing lookup is a miss instead of an error."""
+    with patch.object(index, "_select", side_effect=sqlite3.OperationalError("locked")):
+        assert index.lookup("5k", None, wanted=1, max_age=100) == []
+    assert index.stats()["misses"] == 1
+
+
+def test_concurrent_readers_with_a_writer(index):
+    """Test that readers on several threads see consistent data while one writer upserts."""
+    errors = []
+    done = threading.Event()
+
+    def write():
+        for batch in range(20):
+            index.upsert([make_event(f"Race {batch} {n} 5K") for n in range(10)])
+        done.set()
+
+    def read():
+        try:
+            while not done.is_set():
+                # Every batch is committed whole
+                assert len(index.search("5k", limit=1000)) % 10 == 0
+        except Exception as e:  # pragma: no cover - only on failure
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    writer = threading.Thread(target=write)
+    for thread in readers + [writer]:
+        thread.start()
+    for thread in readers + [writer]:
+        thread.join(10)
+
+    assert errors == []
+    assert len(index.search("5k", limit=1000)) == 200
+    assert index.stats()["upserted"] == 200
+
+
+def test_index_persists_across_instances(tmp_path):
+    """Test that a reopened index still has its events."""
+    path = str(tmp_path / "events.db")
+    first = EventIndex(path)
+    first.upsert([make_event("Harbor 5K")])
+    first.close()
+
+    reopened = EventIndex(path)
+    assert names(reopened.search("harbor")) == ["Harbor 5K"]
+    reopened.close()
+
+
+def test_undated_events_are_indexed_but_not_upcoming(index):
+    """Test that undated events are stored and searched but never found upcoming."""
+    undated = Event(
+        name="Someday 5K", date=None, location="Boston", description="", url="https://a"
+    )
+    assert index.upsert([undated, make_event("Harbor 5K")]) == 2
+
+    assert sorted(names(index.search("5k"))) == ["Harbor 5K", "Someday 5K"]
+    assert index.search("someday") == [undated]
+    assert index.search("someday", date_to=SOON) == []
+    assert names(index.lookup("5k", None, 2, max_age=60)) == ["Harbor 5K"]
+
+
+def test_index_of_another_schema_version_is_rebuilt(tmp_path):
+    """Test that an index written with another schema is emptied and rebuilt."""
+    path = str(tmp_path / "events.db")
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        "CREATE TABLE events (id TEXT PRIMARY KEY, date TEXT NOT NULL); "
+        "INSERT INTO events VALUES ('a', '2024-01-01'); PRAGMA user_version = 1;"
+    )
+    connection.close()
+
+    event_index = EventIndex(path)
+    assert len(event_index) == 0
+    assert event_index.upsert([make_event("Harbor 5K", days=1)]) == 1
+    event_index.close()
+    assert sqlite3.connect(path).execute("PRAGMA user_version").fetchone()[0] == (
+        index_module.SCHEMA_VERSION
+    )
+
+
+def test_create_event_index(tmp_path):
+    """Test that an index is only opened when a path is configured."""
+    with patch.object(index_module, "INDEX_PATH", None):
+        assert create_event_index() is None
+
+    path = str(tmp_path / "events.db")
+    with patch.object(index_module, "INDEX_PATH", path):
+        event_index = create_event_index()
+    assert event_index.path == path
+    assert "path" not in event_index.stats()
+    event_index.close()
@@ -0,0 +1,120 @@
+"""Tests for cursor pagination of cached search results."""
+
+import base64
+from datetime import datetime
+
+import orjson
+import pytest
+
+from functions.event_discovery.cache import CachedEvents
+from functions.event_discovery.pagination import (
+    CURSOR_VERSION,
+    Cursor,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+)
+from models.event import Event
+
+
+def make_results(count, first=0, fresh_until=500.0):
+    return CachedEvents(
+        [
+            Event(
+                name=f"Run {i}",
+                date=datetime(2099, 1, 1),
+                location="Boston",
+                description="",
+                url=f"https://example.com/{i}",
+            )
+            for i in range(first, first + count)
+        ],
+        fresh_until=fresh_until,
+    )
+
+
+def names(events):
+    return [event.name for event in events]
+
+
+def test_cursor_round_trip():
+    """Test that cursors are opaque URL-safe strings that decode to the position."""
+    cursor = Cursor("abc", 10, "id10")
+    token = encode_cursor(cursor)
+
+    assert token.replace("-", "").replace("_", "").isalnum()
+    assert decode_cursor(token) == cursor
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        [CURSOR_VERSION + 1, "abc", 1, "id"],
+        [CURSOR_VERSION, "abc", -1, "id"],
+        [CURSOR_VERSION, "abc", "1", "id"],
+        [CURSOR_VERSION, None, 1, "id"],
+        [CURSOR_VERSION, "abc", 1, 2],
+    ],
+)
+def test_decode_cursor_rejects_unsupported(payload):
+    """Test that cursors with another version or bad values are refused."""
+    token = base64.urlsafe_b64encode(orjson.dumps(payload)).decode()
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+@pytest.mark.parametrize("token", ["!!!", "bm90IGpzb24", base64.b64encode(b"[1,2]").decode()])
+def test_decode_cursor_rejects_malformed(token):
+    """Test that garbage cursors are refused."""
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_paginate_walks_all_pages():
+    """Test that following cursors visits every event once."""
+    events = make_results(25)
+    seen = []
+    page, token = paginate(events, limit=10)
+    hashes = {page.content_hash}
+    while True:
+        seen.extend(names(page))
+        assert page.fresh_until == events.fresh_until
+        if token is None:
+            break
+        page, token = paginate(events, limit=10, cursor=decode_cursor(token))
+        hashes.add(page.content_hash)
+
+    assert seen == names(events)
+    assert len(hashes) == 3
+    assert events.content_hash not in hashes
+
+
+def test_paginate_without_limit_returns_results_as_is():
+    """Test that no paging returns the cached results themselves."""
+    events = make_results(5)
+    assert paginate(events) == (events, None)
+    assert paginate(events, limit=5)[0] is events
+
+
+def test_paginate_resumes_after_last_seen_event_when_results_change():
+    """Test that a cursor from older results continues after the last event seen."""
+    old = make_results(10)
+    _, token = paginate(old, limit=4)
+
+    # Refreshed results gained two events at the top
+    refreshed = make_results(12, first=-2)
+    page, _ = paginate(refreshed, limit=4, cursor=decode_cursor(token))
+    assert names(page) == ["Run 4", "Run 5", "Run 6", "Run 7"]
+
+    # The last event seen is gone, so the offset is used
+    unrelated = make_results(10, first=100)
+    page, _ = paginate(unrelated, limit=4, cursor=decode_cursor(token))
+    assert names(page) == ["Run 104", "Run 105", "Run 106", "Run 107"]
+
+
+def test_paginate_past_the_end():
+    """Test that a cursor beyond the results gives an empty last page."""
+    events = make_results(3)
+    page, token = paginate(events, limit=2, cursor=Cursor(events.content_hash, 7, "x"))
+    assert page == []
+    assert token is None
@@ -0,0 +1,302 @@
+"""Tests for popularity tracking and background prefetching."""
+
+import json
+import random
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from functions.event_discovery.prefetch import CountMinSketch, PopularSearches, PrefetchScheduler
+
+
+def test_count_min_sketch_never_undercounts():
+    """Test that estimates are at least the true counts and close to them."""
+    sketch = CountMinSketch(width=256, depth=4)
+    rng = random.Random(3)
+    counts = {}
+    for _ in range(5000):
+        key = f"q{int(rng.paretovariate(1.2))}"
+        counts[key] = counts.get(key, 0) + 1
+        sketch.add(key)
+
+    assert sketch.total == 5000
+    for key, count in counts.items():
+        assert count <= sketch.estimate(key) <= count + 2 * 5000 / 256
+    assert sketch.estimate("never seen") <= 2 * 5000 / 256
+
+
+def test_count_min_sketch_decay():
+    """Test that decay halves the counts."""
+    sketch = CountMinSketch()
+    assert sketch.add("boston", 5) == 5
+    sketch.decay()
+    assert sketch.estimate("boston") == 2
+    assert sketch.total == 2
+
+
+def test_popular_searches_keeps_heavy_hitters():
+    """Test that the most frequent searches displace rare ones."""
+    popular = PopularSearches(capacity=3)
+    for key in ["rare1", "rare2", "rare3"]:
+        popular.record(key, (key, None))
+    for _ in range(5):
+        popular.record("boston", ("Boston 5K", "Boston"))
+        popular.record("boston", ("boston 5k", "boston"))
+    for _ in range(3):
+        popular.record("denver", ("Denver", None))
+
+    top = popular.top()
+    assert [key for key, _, _ in top] == ["boston", "denver", "rare3"]
+    # The spelling that made it into the top is kept
+    assert top[0] == ("boston", ("boston 5k", "boston"), 10)
+    assert len(popular) == 3
+
+
+def test_popular_searches_decay_and_snapshot():
+    """Test that decay forgets one-off searches and snapshots restore counts."""
+    popular = PopularSearches()
+    popular.record("boston", ("Boston", None), 4)
+    popular.record("once", ("once", "x"))
+    popular.decay()
+    assert popular.snapshot() == [
+        {"key": "boston", "query": "Boston", "location": None, "count": 2}
+    ]
+
+    restored = PopularSearches()
+    restored.restore(popular.snapshot())
+    assert restored.top() == [("boston", ("Boston", None), 2)]
+
+
+class Harness:
+    """Scheduler with a fake cache, refresh and quota."""
+
+    def __init__(self, tmp_path=None, concurrency=2, block=False, clock=time.monotonic):
+        self.popular = PopularSearches()
+        self.fresh = {}
+        self.refreshed = []
+        self.quota = True
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+        self.clock = clock
+        self.scheduler = PrefetchScheduler(
+            self.popular,
+            fresh_for=lambda search: self.fresh.get(search[0]),
+            refresh=self.refresh,
+            allows=lambda: self.quota,
+            concurrency=concurrency,
+            interval=0.01,
+            lead_time=100,
+            decay_interval=3600,
+            snapshot_path=str(tmp_path / "popular.json") if tmp_path else None,
+            clock=self.clock,
+        )
+
+    def refresh(self, search):
+        self.release.wait(2)
+        if search[0] == "broken":
+            raise RuntimeError("upstream down")
+        self.refreshed.append(search[0])
+        # Like a real refresh, the search is fresh afterwards and not refreshed again
+        self.fresh[search[0]] = 1000
+
+    def record(self, query, count):
+        self.popular.record(query, (query, None), count)
+
+
+def test_run_once_refreshes_missing_and_expiring_searches():
+    """Test that only searches about to go stale or missing are refreshed."""
+    harness = Harness(concurrency=4)
+    for query, count in [("fresh", 9), ("expiring", 8), ("stale", 7), ("missing", 6)]:
+        harness.record(query, count)
+    harness.fresh.update({"fresh": 500, "expiring": 50, "stale": -10})
+
+    assert harness.scheduler.run_once() == 3
+    harness.scheduler.wait()
+    assert sorted(harness.refreshed) == ["expiring", "missing", "stale"]
+    stats = harness.scheduler.stats()
+    assert stats["prefetched"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["rounds"] == 1
+
+
+def test_run_once_bounds_concurrency_in_popularity_order():
+    """Test that a round refreshes every search, at most ``concurrency`` at once, each once."""
+    harness = Harness(concurrency=2, block=True)
+    running = []
+    started = []
+    most_running = []
+    refresh = harness.refresh
+
+    def counting_refresh(search):
+        with harness.scheduler._lock:
+            running.append(search[0])
+            started.append(search[0])
+            most_running.append(len(running))
+        try:
+            refresh(search)
+        finally:
+            with harness.scheduler._lock:
+                running.remove(search[0])
+
+    harness.scheduler._refresh = counting_refresh
+    for query, count in [("a", 9), ("b", 8), ("c", 7), ("d", 6), ("e", 5)]:
+        harness.record(query, count)
+    submitted = []
+    round_thread = threading.Thread(target=lambda: submitted.append(harness.scheduler.run_once()))
+    round_thread.start()
+
+    # The round waits for a free slot rather than ending at the first full one
+    assert not harness.scheduler.wait(0.05)
+    assert harness.scheduler.stats()["in_flight"] == 2
+    assert round_thread.is_alive()
+    harness.release.set()
+    round_thread.join(2)
+    assert harness.scheduler.wait(2)
+
+    assert submitted == [5]
+    assert sorted(harness.refreshed) == ["a", "b", "c", "d", "e"]
+    assert sorted(started[:2]) == ["a", "b"]
+    assert max(most_running) == 2
+
+
+def test_run_once_skips_searches_in_flight():
+    """Test that a search still refreshing is not submitted again."""
+    harness = Harness(block=True)
+    harness.record("a", 9)
+
+    assert harness.scheduler.run_once() == 1
+    assert harness.scheduler.run_once() == 0
+    harness.release.set()
+    assert harness.scheduler.wait(2)
+    assert harness.refreshed == ["a"]
+
+
+def test_stop_ends_a_round_waiting_for_a_slot():
+    """Test that stopping does not let a waiting round submit more refreshes."""
+    harness = Harness(concurrency=1, block=True)
+    harness.record("a", 9)
+    harness.record("b", 8)
+    harness.scheduler.start()
+    for _ in range(200):
+        if harness.scheduler.stats()["in_flight"] == 1:
+            break
+        threading.Event().wait(0.01)
+
+    stopping = threading.Thread(target=harness.scheduler.stop)
+    stopping.start()
+    for _ in range(200):
+        if harness.scheduler._stop.is_set():
+            break
+        threading.Event().wait(0.01)
+    harness.release.set()
+    stopping.join(2)
+
+    assert harness.refreshed == ["a"]
+
+
+def test_run_once_uses_spare_quota_only():
+    """Test that a round stops when the quota has no room for prefetches."""
+    harness = Harness()
+    harness.record("boston", 3)
+    harness.quota = False
+
+    assert harness.scheduler.run_once() == 0
+    assert harness.refreshed == []
+    assert harness.scheduler.stats()["skipped_quota"] == 1
+
+
+def test_failed_refresh_is_counted():
+    """Test that a failing refresh is counted and retried next round."""
+    harness = Harness()
+    harness.record("broken", 3)
+
+    harness.scheduler.run_once()
+    harness.scheduler.wait()
+    assert harness.scheduler.stats()["failed"] == 1
+    assert harness.scheduler.run_once() == 1
+
+
+def test_counts_decay_over_time(clock):
+    """Test that counts are halved once per decay interval."""
+    harness = Harness(clock=clock)
+    harness.fresh["boston"] = 500
+    harness.record("boston", 8)
+
+    harness.scheduler.run_once()
+    assert harness.popular.top()[0][2] == 8
+    harness.clock.now += 3600
+    harness.scheduler.run_once()
+    harness.scheduler.run_once()
+    assert harness.popular.top()[0][2] == 4
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Test that stopping saves popular searches and starting warms the cache with them."""
+    first = Harness(tmp_path)
+    first.record("boston", 5)
+    first.record("denver", 2)
+    first.scheduler.stop()
+    saved = json.loads((tmp_path / "popular.json").read_text())
+    assert [entry["key"] for entry in saved["searches"]] == ["boston", "denver"]
+
+    second = Harness(tmp_path)
+    second.scheduler.start()
+    second.scheduler.start()
+    try:
+        for _ in range(200):
+            if len(second.refreshed) == 2:
+                break
+            threading.Event().wait(0.01)
+    finally:
+        second.scheduler.stop()
+    assert sorted(second.refreshed) == ["boston", "denver"]
+    assert second.popular.top()[0] == ("boston", ("boston", None), 5)
+
+
+def test_unreadable_or_missing_snapshot_is_ignored(tmp_path):
+    """Test that startup goes on without a usable snapshot."""
+    harness = Harness(tmp_path)
+    assert harness.scheduler.load_snapshot() == 0
+
+    (tmp_path / "popular.json").write_text("{not json")
+    assert harness.scheduler.load_snapshot() == 0
+    assert Harness().scheduler.load_snapshot() == 0
+
+    # Without a path or with an unwritable one, nothing is saved
+    Harness().scheduler.save_snapshot()
+    harness.scheduler.snapshot_path = str(tmp_path / "missing" / "popular.json")
+    harness.scheduler.save_snapshot()
+    assert not (tmp_path / "missing").exists()
+
+
+def test_failing_round_keeps_the_loop_running():
+    """Test that an error in one round does not stop prefetching."""
+    harness = Harness()
+    rounds = threading.Semaphore(0)
+
+    def run_once():
+        rounds.release()
+        raise RuntimeError("cache unavailable")
+
+    with patch.object(harness.scheduler, "run_once", side_effect=run_once):
+        harness.scheduler.start()
+        assert rounds.acquire(timeout=2)
+        assert rounds.acquire(timeout=2)
+        harness.scheduler.stop()
+
+
+@pytest.mark.parametrize("concurrency", [0, 2])
+def test_start_prefetcher_respects_concurrency(concurrency):
+    """Test that a concurrency of 0 disables the prefetcher."""
+    from functions.event_discovery import search
+
+    with patch.object(search, "PREFETCH_CONCURRENCY", concurrency):
+        with patch.object(search._prefetcher, "start") as start:
+            search.start_prefetcher()
+    assert start.call_count == (1 if concurrency else 0)
+    with patch.object(search._prefetcher, "stop") as stop:
+        search.stop_prefetcher()
+    stop.assert_called_once()
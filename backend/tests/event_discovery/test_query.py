@@ -0,0 +1,38 @@
+"""Tests for search query canonicalization."""
+
+import pytest
+
+from functions.event_discovery.query import canonicalize_location, canonicalize_query
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("Boston 5K", "5k boston"),
+        ("boston   5k", "5k boston"),
+        ("5k in Boston", "5k boston"),
+        ("BOSTON 5km!", "5k boston"),
+        ("Half in Zürich", "half marathon zurich"),
+        ("half marathon half-marathon", "half marathon"),
+        ("Marathons near ｂｏｓｔｏｎ", "boston marathon"),
+        ("The", "the"),
+        ("", ""),
+    ],
+)
+def test_canonicalize_query(query, expected):
+    """Test folding, stop words, aliases, deduplication and sorting."""
+    assert canonicalize_query(query) == expected
+
+
+@pytest.mark.parametrize(
+    "location, expected",
+    [
+        ("Portland, ME", "portland me"),
+        ("  São   Paulo ", "sao paulo"),
+        ("", ""),
+        (None, ""),
+    ],
+)
+def test_canonicalize_location(location, expected):
+    """Test that locations are folded but keep their word order."""
+    assert canonicalize_location(location) == expected
@@ -0,0 +1,146 @@
+"""Tests for the Custom Search quota scheduler."""
+
+import threading
+import time
+from datetime import date
+from unittest.mock import MagicMock
+
+import fakeredis
+import redis
+
+from functions.event_discovery.quota import (
+    CACHE_ONLY,
+    CONSERVE,
+    INTERACTIVE,
+    NORMAL,
+    PREFETCH,
+    REFRESH,
+    QuotaScheduler,
+    quota_day,
+)
+
+
+def make_scheduler(clock, today=lambda: date(2024, 3, 1), **kwargs):
+    """Create a scheduler on a fake clock that never waits."""
+    options = dict(rate=2, burst=3, daily_budget=100, max_wait=0)
+    options.update(kwargs)
+    return QuotaScheduler(clock=clock, today=today, **options)
+
+
+def test_token_bucket_limits_rate(clock):
+    """Test that calls beyond the burst wait for the bucket to refill."""
+    quota = make_scheduler(clock)
+    assert [quota.acquire() for _ in range(4)] == [True, True, True, False]
+
+    clock.now += 0.5
+    assert quota.acquire(REFRESH)
+    assert not quota.acquire(PREFETCH)
+
+    clock.now += 10
+    assert quota.stats()["tokens"] == 3
+
+
+def test_daily_budget_degrades_to_cache_only(clock):
+    """Test the conserve and cache-only modes as the budget runs out."""
+    quota = make_scheduler(clock, rate=1000, burst=1000, daily_budget=20, reserve=0.25)
+    for _ in range(15):
+        assert quota.acquire(PREFETCH)
+    assert quota.mode == CONSERVE
+    assert not quota.acquire(PREFETCH)
+    assert not quota.allows(REFRESH)
+    assert quota.allows(INTERACTIVE)
+
+    for _ in range(5):
+        assert quota.acquire()
+    assert quota.mode == CACHE_ONLY
+    assert not quota.acquire()
+    assert quota.stats() == {
+        "mode": CACHE_ONLY,
+        "daily_budget": 20,
+        "remaining": 0,
+        "used": 20,
+        "tokens": 980.0,
+        "granted": {"interactive": 5, "refresh": 0, "prefetch": 15},
+        "denied": {"interactive": 1, "refresh": 0, "prefetch": 1},
+    }
+
+
+def test_budget_resets_on_new_quota_day(clock):
+    """Test that usage is cleared when the quota day changes."""
+    day = [date(2024, 3, 1)]
+    quota = make_scheduler(clock, today=lambda: day[0], daily_budget=2)
+    assert quota.acquire() and quota.acquire()
+    assert quota.mode == CACHE_ONLY
+
+    day[0] = date(2024, 3, 2)
+    assert quota.mode == NORMAL
+    assert quota.stats()["remaining"] == 2
+
+
+def test_daily_budget_is_shared_through_redis(clock):
+    """Test that workers sharing a Redis counter stay within one daily budget."""
+    client = fakeredis.FakeRedis()
+    workers = [
+        make_scheduler(clock, rate=1000, burst=1000, daily_budget=10, redis_client=client)
+        for _ in range(3)
+    ]
+    granted = [worker.acquire() for _ in range(5) for worker in workers]
+
+    assert sum(granted) == 10
+    assert int(client.get("runon:quota:2024-03-01")) == 10
+    assert 0 < client.ttl("runon:quota:2024-03-01") <= 2 * 24 * 3600
+    assert all(worker.mode == CACHE_ONLY for worker in workers)
+    assert sum(worker.stats()["denied"]["interactive"] for worker in workers) == 5
+
+
+def test_shared_usage_keeps_the_reserve(clock):
+    """Test that background calls stop once other workers reach the reserve."""
+    client = fakeredis.FakeRedis()
+    client.set("runon:quota:2024-03-01", 17)
+    quota = make_scheduler(
+        clock, rate=1000, burst=1000, daily_budget=20, reserve=0.25, redis_client=client
+    )
+
+    assert not quota.acquire(PREFETCH)
+    assert int(client.get("runon:quota:2024-03-01")) == 17
+    assert quota.acquire()
+    assert quota.stats()["used"] == 18
+
+
+def test_redis_failure_counts_locally(clock):
+    """Test that calls are still admitted and counted when Redis fails."""
+    client = MagicMock()
+    client.pipeline.return_value.execute.side_effect = redis.ConnectionError("down")
+    quota = make_scheduler(clock, daily_budget=2, redis_client=client)
+    assert quota.acquire() and quota.acquire()
+    assert not quota.acquire()
+
+    client.pipeline.return_value.execute.side_effect = None
+    client.pipeline.return_value.execute.return_value = [3, True]
+    client.decr.side_effect = redis.ConnectionError("down")
+    quota.reset()
+    assert not quota.acquire()
+
+
+def test_interactive_calls_go_first():
+    """Test that a waiting interactive call gets the next token before prefetches."""
+    quota = QuotaScheduler(rate=5, burst=1, daily_budget=100)
+    assert quota.acquire()
+    order = []
+
+    def call(priority):
+        if quota.acquire(priority, timeout=1):
+            order.append(priority)
+
+    threads = [threading.Thread(target=call, args=(p,)) for p in (PREFETCH, INTERACTIVE)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    assert order == [INTERACTIVE, PREFETCH]
+
+
+def test_quota_day():
+    """Test that the quota day is a calendar date."""
+    assert isinstance(quota_day(), date)
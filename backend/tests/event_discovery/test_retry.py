@@ -0,0 +1,235 @@
+"""Tests for upstream timeouts, retries and hedging."""
+
+import threading
+from concurrent.futures import ALL_COMPLETED, wait
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from functions.event_discovery import retry
+from functions.event_discovery.retry import LatencyTracker, RetryingCaller, RetryPolicy
+
+
+def response(status):
+    """Build a response stub with a status code."""
+    return MagicMock(status_code=status)
+
+
+def make_caller(sleeps=None, **kwargs):
+    """Create a caller that records backoff delays instead of sleeping."""
+    sleeps = [] if sleeps is None else sleeps
+    return RetryingCaller(RetryPolicy(**kwargs), sleep=sleeps.append, rng=lambda: 0.5)
+
+
+def sequence(*outcomes):
+    """Build a send function returning or raising the given outcomes in order."""
+    outcomes = list(outcomes)
+    timeouts = []
+
+    def send(timeout):
+        timeouts.append(timeout)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    send.timeouts = timeouts
+    return send
+
+
+def test_backoff_grows_exponentially_with_jitter():
+    """Test capped exponential backoff scaled by the random factor."""
+    policy = RetryPolicy(backoff_base=0.1, backoff_max=0.3)
+    assert [policy.backoff(n, lambda: 1.0) for n in (1, 2, 3)] == [0.1, 0.2, 0.3]
+    assert policy.backoff(2, lambda: 0.5) == 0.1
+
+
+def test_first_success_is_returned():
+    """Test that a good response is returned after one attempt with the timeout."""
+    caller = make_caller(connect_timeout=1, read_timeout=2)
+    ok = response(200)
+    send = sequence(ok)
+    assert caller.call(send) is ok
+    assert send.timeouts == [(1, 2)]
+    assert caller.stats()["attempts"] == 1
+
+
+def test_retryable_status_is_retried_after_backoff():
+    """Test that a transient error is retried after a jittered delay."""
+    sleeps = []
+    caller = make_caller(sleeps, backoff_base=0.2)
+    ok = response(200)
+    assert caller.call(sequence(response(503), requests.exceptions.Timeout(), ok)) is ok
+    assert sleeps == [0.1, 0.2]
+    stats = caller.stats()
+    assert (stats["requests"], stats["attempts"], stats["retries"]) == (1, 3, 2)
+
+
+def test_attempts_are_capped():
+    """Test that the last response or error is returned once attempts run out."""
+    caller = make_caller(max_attempts=2)
+    last = response(429)
+    assert caller.call(sequence(response(500), last)) is last
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        caller.call(sequence(response(503), requests.exceptions.ConnectionError()))
+
+
+def test_non_retryable_outcomes_are_not_retried():
+    """Test that client errors and non-transient exceptions end the request."""
+    caller = make_caller()
+    bad = response(400)
+    assert caller.call(sequence(bad)) is bad
+    with pytest.raises(requests.exceptions.InvalidURL):
+        caller.call(sequence(requests.exceptions.InvalidURL()))
+    assert caller.stats()["retries"] == 0
+
+
+def test_retries_need_admission():
+    """Test that a denied admission stops further attempts."""
+    caller = make_caller()
+    failed = response(503)
+    assert caller.call(sequence(failed), admit=lambda: False) is failed
+
+
+def test_latency_tracker_quantiles():
+    """Test quantiles over the sliding window."""
+    tracker = LatencyTracker(window=10)
+    assert tracker.quantile(0.5) is None
+    for value in range(20):
+        tracker.record(value)
+    assert len(tracker) == 10
+    assert tracker.quantile(0.5) == 15
+    assert tracker.quantile(1.0) == 19
+
+
+def hedging_caller(**kwargs):
+    """Create a hedging caller that has already seen fast responses."""
+    caller = make_caller(hedge=True, hedge_min_samples=5, **kwargs)
+    for _ in range(5):
+        caller.latency.record(0.01)
+    return caller
+
+
+def test_slow_attempt_is_hedged():
+    """Test that a second attempt races a slow one and the first good answer wins."""
+    caller = hedging_caller()
+    release = threading.Event()
+    slow, fast = response(200), response(200)
+    calls = []
+
+    def send(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            release.wait(2)
+            return slow
+        return fast
+
+    try:
+        assert caller.call(send) is fast
+    finally:
+        release.set()
+        caller.close()
+    stats = caller.stats()
+    assert (stats["attempts"], stats["hedges"], stats["hedge_wins"]) == (2, 1, 1)
+
+
+def test_hedge_waits_for_usable_answer():
+    """Test that a failed hedge does not win over a slow good answer."""
+    caller = hedging_caller()
+    hedge_done = threading.Event()
+    good = response(200)
+    calls = []
+
+    def send(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            hedge_done.wait(2)
+            return good
+        hedge_done.set()
+        return response(503)
+
+    try:
+        assert caller.call(send) is good
+    finally:
+        caller.close()
+    assert caller.stats()["hedge_wins"] == 0
+
+
+def test_usable_answer_wins_when_both_finish_together():
+    """Test that a 503 finishing in the same wait as a good answer is not returned."""
+    caller = hedging_caller()
+    hedge_sent = threading.Event()
+    good, failed = response(200), response(503)
+    calls = []
+
+    def send(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            hedge_sent.wait(2)
+            return good
+        hedge_sent.set()
+        return failed
+
+    def wait_for_both(futures, timeout=None, return_when=ALL_COMPLETED):
+        done, pending = wait(futures, timeout)
+        if len(futures) == 2:
+            # Hand back the retryable answer first
+            return sorted(done, key=lambda f: f.result() is good), pending
+        return done, pending
+
+    try:
+        with patch.object(retry, "wait", side_effect=wait_for_both):
+            assert caller.call(send) is good
+    finally:
+        caller.close()
+    stats = caller.stats()
+    assert (stats["attempts"], stats["hedges"], stats["hedge_wins"]) == (2, 1, 0)
+
+
+def test_failed_hedged_round_is_retried():
+    """Test that a round where both attempts fail is retried within the cap."""
+    caller = hedging_caller(max_attempts=3)
+    barrier = threading.Barrier(2, timeout=2)
+    ok = response(200)
+    calls = []
+
+    def send(timeout):
+        calls.append(timeout)
+        if len(calls) <= 2:
+            barrier.wait()
+            return response(503)
+        return ok
+
+    try:
+        assert caller.call(send) is ok
+    finally:
+        caller.close()
+    stats = caller.stats()
+    assert (stats["attempts"], stats["hedges"], stats["retries"]) == (3, 1, 1)
+
+
+def test_hedge_needs_admission():
+    """Test that a slow attempt is not hedged without admission."""
+    caller = hedging_caller()
+    slow = response(200)
+
+    def send(timeout):
+        threading.Event().wait(0.05)
+        return slow
+
+    try:
+        assert caller.call(send, admit=lambda: False) is slow
+    finally:
+        caller.close()
+    assert caller.stats()["hedges"] == 0
+
+
+def test_stats_report_latency():
+    """Test that observed latency is reported in milliseconds."""
+    caller = make_caller()
+    assert caller.stats()["p95_ms"] is None
+    caller.latency.record(0.0125)
+    assert caller.stats()["p50_ms"] == 12.5
+    caller.close()
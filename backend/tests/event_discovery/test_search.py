@@ -1,18 +1,39 @@
 """Tests for event discovery functionality."""
 
-from datetime import datetime, timedelta
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from unittest.mock import MagicMock, patch
 
 import pytest
 import requests
 
+from functions.event_discovery.breaker import CLOSED, HALF_OPEN
+from functions.event_discovery.cache import hash_events
+from functions.event_discovery.prefetch import PopularSearches
+from functions.event_discovery.quota import PREFETCH, QuotaScheduler
+from functions.event_discovery.retry import RetryingCaller, RetryPolicy
 from functions.event_discovery.search import (
+    CACHE_HARD_TTL,
+    CACHE_SWEEP_INTERVAL,
     CACHE_TTL,
+    NEGATIVE_CACHE_TTL,
+    _breaker,
     _cache,
     _get_cache_key,
     extract_date_from_text,
     extract_distance_from_text,
+    get_cache_stats,
+    get_search_stats,
     search_running_events,
+    search_running_events_async,
+    start_cache_sweeper,
+    stop_cache_sweeper,
+    stream_running_events,
+    stream_running_events_async,
 )
 
 
@@ -135,8 +156,8 @@ def mock_search_response():
 
 @pytest.fixture
 def mock_requests(mock_search_response):
-    """Mock requests.get for Google Custom Search API."""
-    with patch("requests.get") as mock_get:
+    """Mock the pooled session GET for Google Custom Search API."""
+    with patch("requests.Session.get") as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = mock_search_response
@@ -167,7 +188,7 @@ def test_search_running_events_api_error(mock_env_vars):
     # Clear the cache
     _cache.clear()
 
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.side_effect = requests.exceptions.HTTPError("API Error")
         events = search_running_events("New York")
         assert len(events) == 0
@@ -178,9 +199,9 @@ def test_search_running_events_with_location(mock_env_vars, mock_requests):
     location = "Boston"
     events = search_running_events("marathon", location=location)
 
-    # Verify location was added to search terms
+    # Verify the canonical location was added to search terms
     call_args = mock_requests.call_args[1]
-    assert location in call_args["params"]["q"]
+    assert "boston" in call_args["params"]["q"].split()
     assert len(events) == 1
 
 
@@ -206,7 +227,7 @@ def test_search_running_events_caching(mock_env_vars, mock_requests):
 
 
 def test_search_running_events_cache_expiry(mock_env_vars, mock_requests):
-    """Test that cache expires after TTL."""
+    """Test that cache expires after the hard TTL."""
     # Clear the cache first
     _cache.clear()
 
@@ -219,9 +240,674 @@ def test_search_running_events_cache_expiry(mock_env_vars, mock_requests):
 
     # Simulate cache expiry
     cache_key = _get_cache_key(location)
-    _cache[cache_key] = (_cache[cache_key][0], datetime.now() - CACHE_TTL - timedelta(seconds=1))
+    assert cache_key in _cache
+    expired_at = time.monotonic() + CACHE_HARD_TTL.total_seconds() + 1
 
     # Second call should hit API again due to expired cache
-    events2 = search_running_events(location)
+    with patch.object(_cache, "_clock", lambda: expired_at):
+        events2 = search_running_events(location)
     assert len(events2) == 1
     assert mock_requests.call_count == 2  # Additional API call made
+
+
+def test_get_cache_stats(mock_env_vars, mock_requests):
+    """Test that cache counters are exposed for monitoring."""
+    _cache.clear()
+    before = get_cache_stats()
+
+    search_running_events("Chicago")
+    search_running_events("Chicago")
+
+    after = get_cache_stats()
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"] + 1
+    assert after["entries"] == 1
+
+
+def test_cache_sweeper_lifecycle():
+    """Test starting and stopping the background sweep."""
+    with patch.object(_cache, "start_sweeper") as mock_start:
+        start_cache_sweeper()
+        mock_start.assert_called_once_with(CACHE_SWEEP_INTERVAL)
+
+    with patch.object(_cache, "stop_sweeper") as mock_stop:
+        stop_cache_sweeper()
+        mock_stop.assert_called_once()
+
+
+def test_concurrent_misses_share_one_upstream_call(mock_env_vars, mock_search_response):
+    """Test that identical concurrent searches send one Custom Search request."""
+    _cache.clear()
+    before = get_search_stats()["coalescing"]["coalesced"]
+    release = threading.Event()
+
+    def slow_get(*args, **kwargs):
+        release.wait(2)
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = mock_search_response
+        return response
+
+    with patch("requests.Session.get", side_effect=slow_get) as mock_get:
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(search_running_events, "Denver") for _ in range(5)]
+            deadline = time.monotonic() + 2
+            while (
+                get_search_stats()["coalescing"]["coalesced"] < before + 4
+                and time.monotonic() < deadline
+            ):
+                time.sleep(0.005)
+            release.set()
+            results = [f.result() for f in futures]
+
+    assert mock_get.call_count == 1
+    assert all(len(events) == 1 for events in results)
+    assert get_search_stats()["coalescing"]["coalesced"] == before + 4
+
+
+@pytest.mark.asyncio
+async def test_async_search_serves_cache_and_coalesces(mock_env_vars, mock_requests):
+    """Test that concurrent async searches share one lookup."""
+    _cache.clear()
+    results = await asyncio.gather(*(search_running_events_async("Austin") for _ in range(10)))
+
+    assert mock_requests.call_count == 1
+    assert all(events == results[0] for events in results)
+
+    # Later calls are served from the cache
+    assert await search_running_events_async("Austin") == results[0]
+    assert mock_requests.call_count == 1
+
+
+def wait_for_refreshes(count: int):
+    """Wait until ``count`` background refreshes have finished."""
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        refresh = get_search_stats()["refresh"]
+        if refresh["executions"] >= count and refresh["in_flight"] == 0:
+            return
+        time.sleep(0.005)
+
+
+def test_stale_results_served_while_refreshing(mock_env_vars, mock_requests):
+    """Test that stale results are returned at once and refreshed in the background."""
+    _cache.clear()
+    events1 = search_running_events("Seattle")
+    refreshes = get_search_stats()["refresh"]["executions"]
+
+    stale_at = time.monotonic() + CACHE_TTL.total_seconds() + 1
+    with patch.object(_cache, "_clock", lambda: stale_at):
+        release = threading.Event()
+        original = mock_requests.return_value
+
+        def slow_get(*args, **kwargs):
+            release.wait(2)
+            return original
+
+        mock_requests.side_effect = slow_get
+
+        # Every stale read answers immediately and only one refresh starts
+        for _ in range(5):
+            assert search_running_events("Seattle") is events1
+        release.set()
+        wait_for_refreshes(refreshes + 1)
+
+        refresh = get_search_stats()["refresh"]
+        assert refresh["executions"] == refreshes + 1
+        assert refresh["coalesced"] >= 4
+        assert mock_requests.call_count == 2
+
+        # The refreshed entry is fresh again
+        events2 = search_running_events("Seattle")
+        assert events2 is not events1
+        assert events2 == events1
+    assert mock_requests.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_async_search_serves_stale_results(mock_env_vars, mock_requests):
+    """Test that the async path also serves stale results and refreshes."""
+    _cache.clear()
+    events1 = await search_running_events_async("Portland")
+    refreshes = get_search_stats()["refresh"]["executions"]
+
+    stale_at = time.monotonic() + CACHE_TTL.total_seconds() + 1
+    with patch.object(_cache, "_clock", lambda: stale_at):
+        assert await search_running_events_async("Portland") is events1
+        await asyncio.get_running_loop().run_in_executor(None, wait_for_refreshes, refreshes + 1)
+
+    assert mock_requests.call_count == 2
+
+
+def test_failed_search_is_negatively_cached(mock_env_vars):
+    """Test that an upstream failure is cached briefly as an empty result."""
+    error_response = MagicMock(status_code=429, text="Quota exceeded")
+    with patch("requests.Session.get", return_value=error_response) as mock_get:
+        assert search_running_events("Miami") == []
+        assert search_running_events("Miami") == []
+        assert mock_get.call_count == 1
+
+        # The negative entry expires after its short TTL, without a stale window
+        expired_at = time.monotonic() + NEGATIVE_CACHE_TTL.total_seconds()
+        with patch.object(_cache, "_clock", lambda: expired_at):
+            assert search_running_events("Miami") == []
+        assert mock_get.call_count == 2
+
+
+def test_failed_refresh_keeps_stale_results(mock_env_vars, mock_requests):
+    """Test that a failed refresh does not replace stale results with a negative entry."""
+    events = search_running_events("Atlanta")
+    cache_key = _get_cache_key("Atlanta")
+
+    mock_requests.side_effect = requests.exceptions.ConnectionError("down")
+    stale_at = time.monotonic() + CACHE_TTL.total_seconds() + 1
+    with patch.object(_cache, "_clock", lambda: stale_at):
+        assert search_running_events("Atlanta") is events
+        wait_for_refreshes(get_search_stats()["refresh"]["executions"])
+        assert _cache.lookup(cache_key) == (events, True)
+
+
+def test_invalid_json_counts_as_failure(mock_env_vars, mock_requests):
+    """Test that an unreadable response body is treated as an upstream failure."""
+    mock_requests.return_value.json.side_effect = ValueError("not json")
+    assert search_running_events("Tampa") == []
+    assert get_search_stats()["circuit"]["consecutive_failures"] == 1
+
+
+def test_open_circuit_fails_fast(mock_env_vars):
+    """Test that the breaker stops upstream calls after repeated failures."""
+    with patch("requests.Session.get") as mock_get:
+        mock_get.side_effect = requests.exceptions.Timeout("slow")
+        for i in range(_breaker.failure_threshold):
+            assert search_running_events(f"query {i}") == []
+        assert get_search_stats()["circuit"]["state"] == "open"
+
+        assert search_running_events("another query") == []
+        assert mock_get.call_count == _breaker.failure_threshold
+        assert get_search_stats()["circuit"]["rejected"] == 1
+
+
+def test_open_circuit_serves_stale_results(mock_env_vars, mock_requests):
+    """Test that stale results are still served while the circuit is open."""
+    events = search_running_events("Dallas")
+    for _ in range(_breaker.failure_threshold):
+        _breaker.record_failure()
+
+    stale_at = time.monotonic() + CACHE_TTL.total_seconds() + 1
+    with patch.object(_cache, "_clock", lambda: stale_at):
+        assert search_running_events("Dallas") is events
+        wait_for_refreshes(get_search_stats()["refresh"]["executions"])
+    assert mock_requests.call_count == 1
+
+
+def test_equivalent_queries_share_cache_entry(mock_env_vars, mock_requests):
+    """Test that spelling variants of a query hit the same cache entry."""
+    events = search_running_events("Boston 5K", location="New York")
+    assert search_running_events("5k in  boston", location="new york,") is events
+    assert mock_requests.call_count == 1
+    params = mock_requests.call_args[1]["params"]
+    assert params["q"] == "5k boston running race marathon 5K 10K registration new york"
+
+
+def test_event_location_is_the_searched_location(mock_env_vars, mock_requests):
+    """Test that events keep the location as the user wrote it, not its canonical form."""
+    assert search_running_events("x", location="Portland, ME")[0].location == "Portland, ME"
+    assert search_running_events("Denver trail run")[0].location == "Denver trail run"
+    assert mock_requests.call_args[1]["params"]["q"].startswith("denver run trail")
+
+
+def test_events_keep_the_searched_location(mock_env_vars, mock_requests):
+    """Test that places named in a result's text do not replace the searched location."""
+    mock_requests.return_value.json.return_value = {
+        "items": [
+            {"title": "Washington Trail Half", "snippet": "Hilly", "link": "https://a.test"},
+            {"title": "Ocean State 10K", "snippet": "Providence, RI", "link": "https://b.test"},
+        ]
+    }
+
+    events = search_running_events("5k", location="Boston")
+
+    assert [e.location for e in events] == ["Boston", "Boston"]
+
+
+def make_urls(first, count):
+    """Build race links with consecutive numbers."""
+    return [f"https://example.com/race/{first + i}" for i in range(count)]
+
+
+def make_page(start, count, year=2099, links=None):
+    """Build a Custom Search response page of race items, undated if ``year`` is None."""
+    links = links or make_urls(start, count)
+    snippet = "5K, register now" if year is None else f"5K on {year}-06-01"
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {
+        "items": [{"title": f"Race {link}", "snippet": snippet, "link": link} for link in links]
+    }
+    return response
+
+
+@pytest.fixture
+def paged_requests(mock_env_vars):
+    """Serve pages from a dict of start index to response, empty pages otherwise."""
+    pages = {}
+
+    def get(url, params, **kwargs):
+        return pages.get(params.get("start", 1), make_page(params.get("start", 1), 0))
+
+    with patch("requests.Session.get", side_effect=get) as mock_get:
+        mock_get.pages = pages
+        yield mock_get
+
+
+def requested_starts(mock_get):
+    """Get the sorted start indexes that were requested upstream."""
+    return sorted(call[1]["params"].get("start", 1) for call in mock_get.call_args_list)
+
+
+def test_max_results_fetches_pages_in_rank_order(paged_requests):
+    """Test that a result budget fans out over pages and merges them in order."""
+    for start in (1, 11, 21, 31):
+        paged_requests.pages[start] = make_page(start, 10)
+
+    events = search_running_events("Reno", max_results=25)
+
+    assert requested_starts(paged_requests) == [1, 11, 21]
+    assert [e.url for e in events] == [f"https://example.com/race/{i}" for i in range(1, 26)]
+
+
+def test_max_results_fetches_more_pages_for_missing_events(paged_requests):
+    """Test that duplicates and past events trigger another round of pages."""
+    paged_requests.pages[1] = make_page(1, 10)
+    paged_requests.pages[11] = make_page(11, 0, links=make_urls(1, 5) * 2)
+    paged_requests.pages[21] = make_page(21, 10, year=2001)
+    paged_requests.pages[31] = make_page(31, 10)
+
+    events = search_running_events("Provo", max_results=15)
+
+    assert requested_starts(paged_requests) == [1, 11, 21, 31]
+    assert len(events) == 25
+    assert sum(e.date.year == 2099 for e in events) == 15
+
+
+def test_undated_events_count_toward_max_results(paged_requests):
+    """Test that only events with a past date leave results missing."""
+    paged_requests.pages[1] = make_page(1, 5, year=None)
+    paged_requests.pages[1].json.return_value["items"] += make_page(
+        6, 5, year=2001
+    ).json.return_value["items"]
+    paged_requests.pages[11] = make_page(11, 10, year=None)
+    paged_requests.pages[21] = make_page(21, 10, year=None)
+
+    events = search_running_events("Provo")
+    streamed = list(stream_running_events("Provo"))
+
+    assert requested_starts(paged_requests) == [1, 11]
+    assert [e.url for e in events] == make_urls(1, 15)
+    assert [e.date for e in events[:5] + events[10:]] == [None] * 10
+    assert streamed == events
+
+
+def test_max_results_stops_at_short_page(paged_requests):
+    """Test that no further pages are fetched once results run out."""
+    paged_requests.pages[1] = make_page(1, 10)
+    paged_requests.pages[11] = make_page(11, 2)
+
+    events = search_running_events("Ogden", max_results=50)
+
+    assert requested_starts(paged_requests) == [1, 11, 21, 31, 41]
+    assert len(events) == 12
+
+
+def test_max_results_reuses_cached_pages(paged_requests):
+    """Test that overlapping budgets only fetch the pages they do not share."""
+    for start in range(1, 100, 10):
+        paged_requests.pages[start] = make_page(start, 10)
+
+    assert len(search_running_events("Boise", max_results=20)) == 20
+    assert len(search_running_events("Boise", max_results=5)) == 5
+    assert len(search_running_events("boise", max_results=30)) == 30
+    assert requested_starts(paged_requests) == [1, 11, 21]
+
+    # Budgets are capped at what Custom Search can return
+    assert len(search_running_events("Boise", max_results=500)) == 100
+    assert requested_starts(paged_requests)[-1] == 91
+
+
+@pytest.mark.asyncio
+async def test_async_max_results_fetches_pages(paged_requests):
+    """Test that the async search fans out over the same pages."""
+    for start in (1, 11):
+        paged_requests.pages[start] = make_page(start, 10)
+
+    events = await search_running_events_async("Tulsa", max_results=20)
+
+    assert requested_starts(paged_requests) == [1, 11]
+    assert [e.url for e in events] == make_urls(1, 20)
+    assert search_running_events("Tulsa", max_results=20) == events
+
+
+def test_exhausted_quota_answers_from_cache_only(mock_env_vars, mock_requests):
+    """Test that a spent daily budget stops upstream calls but keeps serving the cache."""
+    quota = QuotaScheduler(rate=1000, burst=1000, daily_budget=1)
+    with patch("functions.event_discovery.search._quota", quota):
+        events = search_running_events("Omaha")
+        assert get_search_stats()["quota"]["mode"] == "cache_only"
+
+        assert search_running_events("Lincoln") == []
+        assert search_running_events("Omaha") is events
+        assert mock_requests.call_count == 1
+        assert get_search_stats()["quota"]["denied"]["interactive"] == 1
+
+        # Denied calls are neither cached nor counted as upstream failures
+        assert _get_cache_key("Lincoln") not in _cache
+        assert get_search_stats()["circuit"]["consecutive_failures"] == 0
+
+
+def test_low_quota_skips_background_refresh(mock_env_vars, mock_requests):
+    """Test that stale results are served without refreshing once the budget is low."""
+    quota = QuotaScheduler(rate=1000, burst=1000, daily_budget=10, reserve=0.9)
+    with patch("functions.event_discovery.search._quota", quota):
+        events = search_running_events("Wichita")
+        refreshes = get_search_stats()["refresh"]["executions"]
+
+        stale_at = time.monotonic() + CACHE_TTL.total_seconds() + 1
+        with patch.object(_cache, "_clock", lambda: stale_at):
+            assert search_running_events("Wichita") is events
+        assert get_search_stats()["refresh"]["executions"] == refreshes
+        assert mock_requests.call_count == 1
+
+
+def test_open_circuit_skips_quota(mock_env_vars, mock_requests):
+    """Test that a call rejected by the breaker does not wait for or use up budget."""
+    for _ in range(_breaker.failure_threshold):
+        _breaker.record_failure()
+    with patch("functions.event_discovery.search._quota.acquire") as acquire:
+        assert search_running_events("Fargo") == []
+    acquire.assert_not_called()
+    assert get_search_stats()["quota"]["used"] == 0
+
+
+def test_denied_quota_gives_back_the_probe(mock_env_vars, mock_requests):
+    """Test that a half-open probe denied quota leaves the slot for the next call."""
+    for _ in range(_breaker.failure_threshold):
+        _breaker.record_failure()
+    with patch.object(_breaker, "_opened_at", -_breaker.reset_timeout):
+        with patch("functions.event_discovery.search._quota.acquire", return_value=False):
+            assert search_running_events("Fargo") == []
+        assert _breaker.state == HALF_OPEN
+        assert search_running_events("Bismarck") != []
+    assert _breaker.state == CLOSED
+
+
+def test_transient_errors_are_retried_within_quota(mock_env_vars, mock_requests):
+    """Test that a retried request sends a timeout and uses quota per attempt."""
+    ok = mock_requests.return_value
+    mock_requests.side_effect = [MagicMock(status_code=503), ok]
+    upstream = RetryingCaller(RetryPolicy(max_attempts=2), sleep=lambda seconds: None)
+    with patch("functions.event_discovery.search._upstream", upstream):
+        assert len(search_running_events("Memphis")) == 1
+        stats = get_search_stats()
+
+    assert mock_requests.call_count == 2
+    assert mock_requests.call_args[1]["timeout"] == RetryPolicy().timeout
+    assert stats["quota"]["used"] == 2
+    assert stats["upstream"]["retries"] == 1
+    assert stats["circuit"]["consecutive_failures"] == 0
+
+
+def test_results_carry_content_hash_and_freshness(mock_env_vars, mock_requests):
+    """Test that cached results keep the hash and freshness computed when fetched."""
+    before = time.time()
+    events = search_running_events("Fresno")
+
+    assert before + CACHE_TTL.total_seconds() <= events.fresh_until
+    assert events.fresh_until <= time.time() + CACHE_TTL.total_seconds()
+    assert events.content_hash == hash_events(events)
+    assert search_running_events("Fresno").content_hash == events.content_hash
+
+
+def test_failed_search_is_fresh_for_negative_ttl(mock_env_vars):
+    """Test that empty results from a failure are only fresh for the negative TTL."""
+    error_response = MagicMock(status_code=503, text="Unavailable")
+    with patch("requests.Session.get", return_value=error_response):
+        events = search_running_events("Provo")
+    assert events == []
+    assert events.fresh_until <= time.time() + NEGATIVE_CACHE_TTL.total_seconds()
+
+
+def test_merged_pages_hash(paged_requests):
+    """Test that results merged from several pages get a hash of their own."""
+    for start in (1, 11, 21):
+        paged_requests.pages[start] = make_page(start, 10)
+
+    events = search_running_events("Boise", max_results=25)
+    again = search_running_events("Boise", max_results=25)
+    fewer = search_running_events("Boise", max_results=15)
+
+    assert again is not events
+    assert again.content_hash == events.content_hash
+    assert fewer.content_hash != events.content_hash
+    assert events.content_hash != search_running_events("Boise").content_hash
+    assert events.fresh_until <= search_running_events("Boise").fresh_until
+
+
+def race_page(prefix, count):
+    """Custom Search response with ``count`` upcoming 5K races."""
+    items = [
+        {
+            "title": f"{prefix} 5K {i}",
+            "snippet": "Race on 2099-06-01",
+            "link": f"https://example.com/{prefix}/{i}",
+        }
+        for i in range(count)
+    ]
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"items": items}
+    return response
+
+
+@pytest.fixture
+def event_index(tmp_path):
+    """Search with a local event index in a temporary database."""
+    from functions.event_discovery import search
+    from functions.event_discovery.index import EventIndex
+
+    index = EventIndex(str(tmp_path / "events.db"))
+    with patch.object(search, "_index", index):
+        yield index
+    index.close()
+
+
+def test_discovered_events_answer_new_queries_locally(mock_env_vars, event_index):
+    """Test that a new query matching enough indexed events needs no upstream call."""
+    with patch("requests.Session.get", return_value=race_page("Harbor", 10)) as mock_get:
+        events = search_running_events("5k", "Boston")
+        assert len(event_index) == 10
+
+        local = search_running_events("harbor 5K", "boston")
+        assert mock_get.call_count == 1
+
+    assert sorted(e.id for e in local) == sorted(e.id for e in events)
+    assert local.fresh_until <= events.fresh_until
+    assert get_search_stats()["index"]["hits"] == 1
+
+
+def test_upstream_fills_gaps_in_local_results(mock_env_vars, event_index):
+    """Test that a few local matches come first and upstream adds the rest."""
+    with patch("requests.Session.get", return_value=race_page("Harbor", 3)):
+        search_running_events("harbor 5k", "Boston")
+    with patch("requests.Session.get", return_value=race_page("Bay", 10)) as mock_get:
+        events = search_running_events("5k", "Boston")
+
+    assert mock_get.call_count == 1
+    assert [e.name for e in events[:3]] == ["Harbor 5K 0", "Harbor 5K 1", "Harbor 5K 2"]
+    assert [e.name for e in events[3:]] == [f"Bay 5K {i}" for i in range(7)]
+
+
+@pytest.mark.asyncio
+async def test_async_search_answers_from_index(mock_env_vars, event_index):
+    """Test that the async search also looks in the index first."""
+    with patch("requests.Session.get", return_value=race_page("Harbor", 10)) as mock_get:
+        await search_running_events_async("5k", "Boston")
+        local = await search_running_events_async("harbor 5k", "Boston")
+
+    assert mock_get.call_count == 1
+    assert len(local) == 10
+
+
+def test_repeated_searches_add_no_index_rows(paged_requests, event_index):
+    """Test that searching again, undated results included, stores no new rows."""
+    paged_requests.pages[1] = make_page(1, 3, year=None)
+
+    for _ in range(3):
+        search_running_events("5K", "Boston", max_results=3)
+        _cache.clear()
+
+    assert paged_requests.call_count == 3
+    assert len(event_index) == 3
+
+
+def test_index_failure_does_not_fail_search(mock_env_vars, event_index, capsys):
+    """Test that events are still returned when the index cannot be updated."""
+    with patch.object(event_index, "upsert", side_effect=sqlite3.OperationalError("locked")):
+        with patch("requests.Session.get", return_value=race_page("Harbor", 2)):
+            events = search_running_events("5k", "Boston")
+
+    assert len(events) == 2
+    assert "Event index update failed: locked" in capsys.readouterr().out
+
+
+def test_searches_feed_popularity_and_prefetch_refreshes_them(mock_env_vars, mock_requests):
+    """Test that equivalent searches count together and prefetches refill the cache."""
+    from functions.event_discovery import search
+
+    with patch.object(search, "_popular", PopularSearches()) as popular:
+        search_running_events("Boston 5K", "Boston")
+        search_running_events("5k  boston", "boston")
+        key, prefetched, count = popular.top()[0]
+    assert key == _get_cache_key("boston 5k", "BOSTON")
+    assert prefetched == ("Boston 5K", "Boston")
+    assert count == 2
+
+    assert search._prefetch_fresh_for(prefetched) == pytest.approx(CACHE_TTL.total_seconds(), abs=5)
+    _cache.clear()
+    assert search._prefetch_fresh_for(prefetched) is None
+    with patch.object(search._quota, "acquire", wraps=search._quota.acquire) as acquire:
+        events = search._prefetch(prefetched)
+    assert acquire.call_args_list[0][0] == (PREFETCH,)
+    assert len(events) == 1
+    assert search._prefetch_fresh_for(prefetched) > 0
+    assert mock_requests.call_count == 2
+    assert get_search_stats()["prefetch"]["rounds"] == 0
+
+
+def test_stream_matches_search_order(paged_requests):
+    """Test that streaming yields the events a search returns, in the same order."""
+    paged_requests.pages[1] = make_page(1, 10)
+    paged_requests.pages[11] = make_page(11, 0, links=make_urls(1, 5) * 2)
+    paged_requests.pages[21] = make_page(21, 10, year=2001)
+    paged_requests.pages[31] = make_page(31, 10)
+
+    streamed = list(stream_running_events("Provo", max_results=15))
+
+    assert requested_starts(paged_requests) == [1, 11, 21, 31]
+    assert streamed == search_running_events("Provo", max_results=15)
+    assert requested_starts(paged_requests) == [1, 11, 21, 31]
+
+
+def test_stream_yields_before_later_pages_arrive(paged_requests):
+    """Test that the first event comes from the first page, with the rest of its round in flight."""
+    for start in (1, 11, 21):
+        paged_requests.pages[start] = make_page(start, 10)
+
+    stream = stream_running_events("Reno", max_results=20)
+    assert next(stream).url == "https://example.com/race/1"
+    stream.close()
+    # The rest of the round is fetched in the background
+    for _ in range(200):
+        if paged_requests.call_count == 2:
+            break
+        time.sleep(0.01)
+    assert requested_starts(paged_requests) == [1, 11]
+
+    # A page that covers the budget fetches no page after it
+    assert len(list(stream_running_events("Elko", max_results=10))) == 10
+    assert requested_starts(paged_requests) == [1, 1, 11]
+
+
+def test_stream_fetches_on_when_repeats_leave_it_short(paged_requests):
+    """Test that a page of repeats makes the stream fetch the following page."""
+    paged_requests.pages[1] = make_page(1, 10)
+    paged_requests.pages[11] = make_page(11, 0, links=make_urls(1, 10))
+    paged_requests.pages[21] = make_page(21, 10)
+
+    events = list(stream_running_events("Boise", max_results=15))
+
+    assert [e.url for e in events] == make_urls(1, 10) + make_urls(21, 5)
+    assert requested_starts(paged_requests) == [1, 11, 21]
+
+
+def test_stream_stops_at_short_page(paged_requests):
+    """Test that the stream ends when results run out."""
+    paged_requests.pages[1] = make_page(1, 10)
+    paged_requests.pages[11] = make_page(11, 2)
+
+    assert len(list(stream_running_events("Ogden", max_results=20))) == 12
+    assert requested_starts(paged_requests) == [1, 11]
+
+
+def test_stream_yields_local_events_first(mock_env_vars, event_index):
+    """Test that indexed matches are streamed before upstream results."""
+    with patch("requests.Session.get", return_value=race_page("Harbor", 3)):
+        search_running_events("harbor 5k", "Boston")
+    with patch("requests.Session.get", return_value=race_page("Bay", 10)) as mock_get:
+        events = list(stream_running_events("5k", "Boston"))
+        assert len(list(stream_running_events("harbor 5k", "Boston", max_results=3))) == 3
+
+    assert mock_get.call_count == 1
+    assert [e.name for e in events] == [f"Harbor 5K {i}" for i in range(3)] + [
+        f"Bay 5K {i}" for i in range(7)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_stream(mock_env_vars, event_index):
+    """Test that the async stream yields local matches, then pages, each event once."""
+    with patch("requests.Session.get", return_value=race_page("Harbor", 3)):
+        await search_running_events_async("harbor 5k", "Boston")
+    with patch("requests.Session.get", return_value=race_page("Bay", 10)) as mock_get:
+        events = [event async for event in stream_running_events_async("5k", "Boston")]
+        local = [
+            event async for event in stream_running_events_async("harbor", "Boston", max_results=2)
+        ]
+
+    assert mock_get.call_count == 1
+    assert events == search_running_events("5k", "Boston")
+    assert [e.name for e in local] == ["Harbor 5K 0", "Harbor 5K 1"]
+
+
+@pytest.mark.asyncio
+async def test_async_stream_fetches_rounds(paged_requests):
+    """Test that the async stream fetches another round only as needed."""
+    paged_requests.pages[1] = make_page(1, 10)
+    paged_requests.pages[11] = make_page(11, 0, links=make_urls(1, 10))
+    paged_requests.pages[21] = make_page(21, 3)
+
+    events = [event async for event in stream_running_events_async("Tulsa", max_results=15)]
+
+    assert [e.url for e in events] == make_urls(1, 10) + make_urls(21, 3)
+    assert requested_starts(paged_requests) == [1, 11, 21]
+
+
+def test_undated_results_keep_their_id_across_searches(paged_requests):
+    """Test that parsing the same undated result twice gives the same event ID."""
+    paged_requests.pages[1] = make_page(1, 2, year=None)
+
+    first = search_running_events("5K", "Boston", max_results=2)
+    _cache.clear()
+    second = search_running_events("5K", "Boston", max_results=2)
+
+    assert [event.date for event in first] == [None, None]
+    assert [event.id for event in first] == [event.id for event in second]
+    assert first.content_hash == second.content_hash
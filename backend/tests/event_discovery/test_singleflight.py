@@ -0,0 +1,166 @@
+"""Tests for request coalescing."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from functions.event_discovery.singleflight import SingleFlight
+
+
+def test_do_runs_function_once_for_concurrent_callers():
+    """Test that concurrent sync callers share one execution."""
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return ["result"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, "key", fetch) for _ in range(8)]
+        deadline = time.monotonic() + 2
+        while flight.stats()["coalesced"] < 7 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.stats() == {"executions": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_do_runs_again_after_completion():
+    """Test that sequential callers are not coalesced."""
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.stats()["executions"] == 2
+
+
+def test_do_keys_are_independent():
+    """Test that different keys never share results."""
+    flight = SingleFlight()
+    assert flight.do("a", lambda: "a") == "a"
+    assert flight.do("b", lambda: "b") == "b"
+
+
+def test_do_propagates_exception_to_all_callers():
+    """Test that followers receive the leader's exception."""
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(2)
+        raise RuntimeError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flight.do, "key", fail) for _ in range(3)]
+        deadline = time.monotonic() + 2
+        while flight.stats()["coalesced"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="upstream down"):
+                future.result()
+
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_do_async_coalesces_coroutines():
+    """Test that concurrent coroutines share one executor call."""
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = await asyncio.gather(*(flight.do_async("key", fetch, pool) for _ in range(20)))
+
+    assert results == ["result"] * 20
+    assert len(calls) == 1
+    assert flight.stats() == {"executions": 1, "coalesced": 19, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_do_async_propagates_exception():
+    """Test that async callers receive the leader's exception."""
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("bad")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        with pytest.raises(ValueError, match="bad"):
+            await flight.do_async("key", fail, pool)
+
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_do_async_handles_closed_executor():
+    """Test that a rejected submission does not leave the key stuck."""
+    flight = SingleFlight()
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.shutdown()
+
+    with pytest.raises(RuntimeError):
+        await flight.do_async("key", lambda: 1, pool)
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_sync_and_async_callers_coalesce():
+    """Test that a thread and a coroutine share one call for the same key."""
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return "shared"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        sync_caller = pool.submit(flight.do, "key", fetch)
+        while flight.stats()["in_flight"] == 0:
+            await asyncio.sleep(0.005)
+        async_caller = asyncio.ensure_future(flight.do_async("key", fetch, pool))
+        await asyncio.sleep(0.01)
+        release.set()
+
+        assert await async_caller == "shared"
+        assert sync_caller.result() == "shared"
+
+    assert len(calls) == 1
+    assert flight.stats()["coalesced"] == 1
+
+
+def test_submit_starts_one_background_call():
+    """Test that background submissions for a key coalesce."""
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        release.wait(2)
+        return "fresh"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = flight.submit("key", refresh, pool)
+        second = flight.submit("key", refresh, pool)
+        assert first is second
+        release.set()
+        assert first.result() == "fresh"
+
+    assert len(calls) == 1
+    assert flight.stats() == {"executions": 1, "coalesced": 1, "in_flight": 0}
@@ -0,0 +1,26 @@
+"""Fixtures for verifying locally minted ID tokens."""
+
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.fake_jwks import FakeJwksServer
+from functions.auth import auth
+from functions.auth.token_cache import VerifiedTokenCache
+from functions.auth.verifier import GoogleCerts, GoogleIdTokenVerifier
+
+
+@pytest.fixture(scope="module")
+def jwks_server():
+    """Local JWKS endpoint whose keys sign tokens for ``test-client-id``."""
+    with FakeJwksServer() as server:
+        yield server
+
+
+@pytest.fixture
+def verifier(jwks_server):
+    """Shared verifier reading keys from the local JWKS endpoint, with an empty token cache."""
+    verifier = GoogleIdTokenVerifier(GoogleCerts(jwks_server.url))
+    with patch.multiple(auth, _verifier=verifier, _token_cache=VerifiedTokenCache()):
+        yield verifier
+    verifier.certs.close()
@@ -1,10 +1,11 @@
 """Tests for authentication functionality."""
 
+import asyncio
 from unittest.mock import patch
 
 import pytest
 
-from functions.auth import verify_google_id_token
+from functions.auth import auth, verify_google_id_token, verify_google_id_token_async
 
 
 @pytest.fixture
@@ -15,29 +16,68 @@ def mock_environment():
         yield mock
 
 
-@pytest.fixture
-def mock_id_token():
-    """Mock Google ID token verification."""
-    with patch("google.oauth2.id_token.verify_oauth2_token") as mock:
-        mock.return_value = {"sub": "123", "email": "test@example.com"}
-        yield mock
-
-
-def test_verify_google_id_token_success(mock_environment, mock_id_token):
+def test_verify_google_id_token_success(mock_environment, verifier, jwks_server):
     """Test successful token verification."""
-    token = "valid-token"
+    token = jwks_server.mint(sub="123", email="test@example.com")
     result = verify_google_id_token(token)
 
     assert result["sub"] == "123"
     assert result["email"] == "test@example.com"
-    mock_id_token.assert_called_once()
+    mock_environment.assert_called_once_with("RUNON_CLIENT_ID")
 
 
-def test_verify_google_id_token_invalid(mock_environment, mock_id_token):
+def test_verify_google_id_token_invalid(mock_environment, verifier, jwks_server):
     """Test invalid token handling."""
-    mock_id_token.side_effect = ValueError("Invalid token")
-
     with pytest.raises(ValueError) as exc:
         verify_google_id_token("invalid-token")
-
     assert "Invalid token" in str(exc.value)
+
+    with pytest.raises(ValueError, match="Invalid token"):
+        verify_google_id_token(jwks_server.mint(aud="another-client-id"))
+
+
+def test_verified_tokens_are_cached(mock_environment, verifier, jwks_server):
+    """Test that a repeated token skips verification, in sync and async entry points."""
+    token = jwks_server.mint(sub="123")
+    with patch.object(verifier, "verify", wraps=verifier.verify) as verify:
+        first = verify_google_id_token(token)
+        first["sub"] = "changed"
+        assert verify_google_id_token(token)["sub"] == "123"
+        assert asyncio.run(verify_google_id_token_async(token))["sub"] == "123"
+    verify.assert_called_once()
+    assert auth.get_token_cache().stats()["hits"] == 2
+
+    # Tokens that failed verification are not cached
+    bad = jwks_server.mint(aud="another-client-id")
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            verify_google_id_token(bad)
+    assert len(auth.get_token_cache()) == 1
+
+
+def test_verify_google_id_token_without_client_id():
+    """Test that a missing client ID fails verification."""
+    with patch("config.environment.Environment.get_required", side_effect=KeyError("unset")):
+        with pytest.raises(ValueError, match="Invalid token"):
+            verify_google_id_token("token")
+
+
+@pytest.mark.asyncio
+async def test_verify_google_id_token_async(mock_environment, verifier, jwks_server):
+    """Test that the async entry point verifies tokens like the sync one."""
+    token = jwks_server.mint(sub="123")
+    assert (await verify_google_id_token_async(token))["sub"] == "123"
+    with pytest.raises(ValueError, match="Invalid token"):
+        await verify_google_id_token_async(jwks_server.mint(lifetime=-3600))
+
+
+def test_shared_verifier_lifecycle():
+    """Test that one verifier is shared until it is closed."""
+    with patch.object(auth, "_verifier", None):
+        verifier = auth.get_verifier()
+        assert auth.get_verifier() is verifier
+        with patch.object(verifier.certs, "close") as close:
+            auth.close_verifier()
+        close.assert_called_once()
+        assert auth._verifier is None
+        auth.close_verifier()
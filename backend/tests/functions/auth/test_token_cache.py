@@ -0,0 +1,87 @@
+"""Tests for the cache of verified ID tokens."""
+
+import pytest
+
+from functions.auth.token_cache import VerifiedTokenCache, token_key
+
+
+@pytest.fixture
+def clock_start():
+    """Start the clock at a realistic epoch time, as ``exp`` claims are."""
+    return 1_700_000_000.0
+
+
+def payload(clock, lifetime=3600, **claims):
+    return {"sub": "123", "exp": int(clock.now + lifetime), **claims}
+
+
+def test_token_key_covers_token_and_audience():
+    """Test that keys are digests that differ by token and by audience."""
+    key = token_key("header.payload.signature", "client")
+
+    assert len(key) == 32
+    assert b"payload" not in key
+    assert token_key(b"header.payload.signature", "client") == key
+    assert token_key("header.payload.signature", "other") != key
+    assert token_key("header.payload.signature", ["client", "other"]) != key
+
+
+def test_hit_until_exp_minus_margin(clock):
+    """Test that a token is served until its expiry less the margin."""
+    cache = VerifiedTokenCache(margin=60, clock=clock)
+    cache.put("token", "client", payload(clock))
+
+    assert cache.get("token", "client") == payload(clock)
+    assert cache.get("token", "other") is None
+    clock.now += 3600 - 61
+    assert cache.get("token", "client") is not None
+    clock.now += 1
+    assert cache.get("token", "client") is None
+    assert len(cache) == 0
+    assert cache.stats() == {
+        "entries": 0,
+        "max_entries": cache.max_entries,
+        "hits": 2,
+        "misses": 2,
+        "evictions": 0,
+    }
+
+
+def test_tokens_near_expiry_are_not_cached(clock):
+    """Test that tokens inside the margin, or without exp, are left out."""
+    cache = VerifiedTokenCache(margin=60, clock=clock)
+    cache.put("soon", "client", payload(clock, lifetime=30))
+    cache.put("no exp", "client", {"sub": "123"})
+    assert len(cache) == 0
+    assert len(VerifiedTokenCache(max_entries=0, clock=clock)) == 0
+
+
+def test_least_recently_used_token_is_evicted(clock):
+    """Test LRU eviction once the entry limit is reached."""
+    cache = VerifiedTokenCache(max_entries=2, clock=clock)
+    for token in ("a", "b"):
+        cache.put(token, "client", payload(clock, name=token))
+    cache.get("a", "client")
+    cache.put("c", "client", payload(clock, name="c"))
+
+    assert cache.get("b", "client") is None
+    assert cache.get("a", "client")["name"] == "a"
+    assert cache.get("c", "client")["name"] == "c"
+    assert cache.stats()["evictions"] == 1
+
+    # Storing a token again refreshes it rather than adding an entry
+    cache.put("a", "client", payload(clock, name="a2"))
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_payloads_are_copied(clock):
+    """Test that callers cannot change a cached payload."""
+    cache = VerifiedTokenCache(clock=clock)
+    claims = payload(clock)
+    cache.put("token", "client", claims)
+    claims["sub"] = "changed"
+    cache.get("token", "client")["sub"] = "changed"
+
+    assert cache.get("token", "client")["sub"] == "123"
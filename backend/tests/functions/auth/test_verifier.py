@@ -0,0 +1,191 @@
+"""Tests for Google ID token verification with cached signing keys."""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from functions.auth.verifier import GoogleCerts, GoogleIdTokenVerifier, max_age
+
+
+@pytest.fixture
+def clock_start():
+    """Start the clock well after zero, as time.monotonic does."""
+    return 1000.0
+
+
+@pytest.fixture
+def certs(jwks_server, clock):
+    """Keys from the local JWKS endpoint, kept for its max-age of an hour."""
+    jwks_server.request_count = 0
+    certs = GoogleCerts(jwks_server.url, refresh_lead=300, min_refresh_interval=30, clock=clock)
+    yield certs
+    certs.close()
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"Cache-Control": "public, max-age=19845, must-revalidate"}, 19845),
+        ({"Cache-Control": "public, MAX-AGE=600", "Age": "100"}, 500),
+        ({"Cache-Control": "max-age=60", "Age": "120"}, 0),
+        ({"Cache-Control": "max-age=60", "Age": "soon"}, 60),
+        ({"Cache-Control": "no-cache"}, 42),
+        ({}, 42),
+    ],
+)
+def test_max_age(headers, expected):
+    """Test reading how long keys may be kept from the response headers."""
+    assert max_age(requests.structures.CaseInsensitiveDict(headers), 42) == expected
+
+
+def test_keys_are_fetched_once_and_kept(certs, jwks_server):
+    """Test that verifications reuse the parsed keys without refetching."""
+    verifier = GoogleIdTokenVerifier(certs)
+    for _ in range(5):
+        payload = verifier.verify(jwks_server.mint(), "test-client-id")
+        assert payload["email"] == "runner@example.com"
+
+    assert jwks_server.request_count == 1
+    stats = certs.stats()
+    assert stats["keys"] == 1
+    assert stats["expires_in"] == 3600
+    assert stats["fetches"] == 1
+
+
+def test_concurrent_first_fetch_is_shared(certs, jwks_server):
+    """Test that callers arriving before the first fetch completes share it."""
+    barrier = threading.Barrier(8)
+    found = []
+
+    def find():
+        barrier.wait()
+        found.append(certs.key(jwks_server.kid))
+
+    threads = [threading.Thread(target=find) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(found) == 8
+    assert jwks_server.request_count == 1
+
+
+def test_keys_are_refreshed_in_background_before_expiry(certs, jwks_server, clock):
+    """Test that nearly expired keys are still used while a refresh runs."""
+    key = certs.key(jwks_server.kid)
+    clock.now += 3600 - 200
+    release = threading.Event()
+    fetch = certs._fetch
+
+    def slow_fetch():
+        release.wait(2)
+        return fetch()
+
+    with patch.object(certs, "_fetch", side_effect=slow_fetch):
+        # Only one refresh runs however many callers see the keys expiring
+        assert certs.key(jwks_server.kid) is key
+        assert certs.key(jwks_server.kid) is key
+        release.set()
+        certs.wait()
+    assert jwks_server.request_count == 2
+    assert certs.stats()["expires_in"] == 3600
+    assert certs.key(jwks_server.kid) is not key
+
+
+def test_expired_keys_are_fetched_before_use(certs, jwks_server, clock):
+    """Test that keys past their max-age are never used."""
+    certs.key(jwks_server.kid)
+    clock.now += 3600
+
+    assert certs.needs_fetch(jwks_server.kid)
+    certs.key(jwks_server.kid)
+    assert jwks_server.request_count == 2
+    assert not certs.needs_fetch(jwks_server.kid)
+
+
+def test_unknown_key_refreshes_at_most_once_per_interval(certs, jwks_server, clock):
+    """Test that rotated keys are picked up without refetching for every bad token."""
+    verifier = GoogleIdTokenVerifier(certs)
+    verifier.verify(jwks_server.mint(), "test-client-id")
+    rotated = jwks_server.rotate()
+    token = jwks_server.mint(rotated)
+
+    with pytest.raises(ValueError, match="Unknown token signing key"):
+        verifier.verify(token, "test-client-id")
+    assert not certs.needs_fetch(rotated)
+    assert jwks_server.request_count == 1
+
+    clock.now += 30
+    assert certs.needs_fetch(rotated)
+    assert verifier.verify(token, "test-client-id")["sub"] == "1234567890"
+    assert jwks_server.request_count == 2
+
+
+def test_failed_fetch_raises_and_background_failure_keeps_keys(jwks_server, clock):
+    """Test that fetch errors fail verification only when no usable keys remain."""
+    ok = requests.get(jwks_server.url, timeout=5)
+    failing = MagicMock(status_code=503)
+    failing.raise_for_status.side_effect = requests.HTTPError("503 Service Unavailable")
+    session = MagicMock()
+    session.get.side_effect = [failing, ok, failing, failing]
+    certs = GoogleCerts("https://certs.test", session=session, clock=clock)
+
+    with pytest.raises(ValueError, match="Could not fetch token signing keys"):
+        certs.key(jwks_server.kid)
+    key = certs.key(jwks_server.kid)
+
+    clock.now += 3600 - 10
+    assert certs.key(jwks_server.kid) is key
+    certs.wait()
+    assert certs.key(jwks_server.kid) is key
+    certs.wait()
+    assert certs.stats()["failures"] == 3
+    certs.close()
+    session.close.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "claims, error",
+    [
+        ({"aud": "someone-else"}, "Audience"),
+        ({"iss": "https://evil.example.com"}, "issuer"),
+        ({"lifetime": -60}, "expired"),
+        ({"sub": None}, "sub"),
+    ],
+)
+def test_invalid_claims_are_rejected(certs, jwks_server, claims, error):
+    """Test audience, issuer, expiry and required claim checks."""
+    token = jwks_server.mint(**claims)
+
+    with pytest.raises(ValueError, match=error):
+        GoogleIdTokenVerifier(certs).verify(token, "test-client-id")
+
+
+def test_tampered_token_is_rejected(certs, jwks_server):
+    """Test that a token whose payload was changed fails the signature check."""
+    header, payload, signature = jwks_server.mint().split(".")
+    forged = jwks_server.mint(email="admin@example.com").split(".")[1]
+    verifier = GoogleIdTokenVerifier(certs)
+
+    with pytest.raises(ValueError, match="Signature verification failed"):
+        verifier.verify(".".join([header, forged, signature]), "test-client-id")
+    with pytest.raises(ValueError):
+        verifier.verify("not a token", "test-client-id")
+
+
+@pytest.mark.asyncio
+async def test_verify_async(certs, jwks_server):
+    """Test that the async path fetches keys off the loop, then verifies inline."""
+    verifier = GoogleIdTokenVerifier(certs)
+    token = jwks_server.mint()
+
+    assert certs.needs_fetch(jwks_server.kid)
+    assert (await verifier.verify_async(token, "test-client-id"))["sub"] == "1234567890"
+    assert not certs.needs_fetch(jwks_server.kid)
+    assert (await verifier.verify_async(token, "test-client-id"))["sub"] == "1234567890"
+    assert jwks_server.request_count == 1
+    with pytest.raises(ValueError):
+        await verifier.verify_async("not a token", "test-client-id")
@@ -22,8 +22,8 @@ def mock_environment():
 
 @pytest.fixture
 def mock_requests(mock_search_response):
-    """Mock requests.get for Google Custom Search API."""
-    with patch("requests.get") as mock_get:
+    """Mock the pooled session GET for Google Custom Search API."""
+    with patch("requests.Session.get") as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = mock_search_response
@@ -65,14 +65,14 @@ def test_search_running_events_with_location(mock_environment, mock_requests):
     event = events[0]
     assert event.location == location
 
-    # Verify location was added to search terms
+    # Verify the canonical location was added to search terms
     call_args = mock_requests.call_args[1]
-    assert location in call_args["params"]["q"]
+    assert "boston" in call_args["params"]["q"].split()
 
 
 def test_search_running_events_request_exception(mock_environment):
     """Test handling of request exceptions."""
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.side_effect = requests.exceptions.RequestException("Connection error")
         events = search_running_events("marathon")
         assert len(events) == 0
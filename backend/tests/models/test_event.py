@@ -1,8 +1,15 @@
 """Tests for Event model."""
 
-from datetime import datetime, timedelta
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from functools import partial
 
-from models.event import Event
+import pytest
+
+from models.event import Event, make_event_id
 
 
 def test_event_initialization():
@@ -139,3 +146,149 @@ def test_from_dict():
     assert event.distance == 5.0
     assert event.id == "test123"
     assert event.calendar_event_id == "cal123"
+
+
+def test_event_id_is_content_derived():
+    """Test that generated IDs are stable digests of the normalized fields."""
+    event = Event(
+        name="Test Run",
+        date=datetime(2024, 3, 15),
+        location="Test Location",
+        description="Test Description",
+        url="https://test.com",
+    )
+    assert event.id == make_event_id("Test Run", datetime(2024, 3, 15), "Test Location")
+    assert event.id == "abf1f16e14014bbc8a12f291c8cd5e28"
+
+
+def test_event_id_normalizes_fields():
+    """Test that formatting differences do not change the ID but content does."""
+    date = datetime(2024, 3, 15, 9)
+    base = make_event_id("Boston  Marathon", date, "Boston, MA")
+    assert make_event_id(" boston marathon", date, "BOSTON,  MA") == base
+    assert make_event_id("Ｂoston Marathon", date, "Boston, MA") == base
+    assert make_event_id("Boston Marathon", date.replace(tzinfo=timezone.utc), "Boston, MA") == base
+    eastern = timezone(timedelta(hours=-5))
+    assert (
+        make_event_id("Boston Marathon", datetime(2024, 3, 15, 4, tzinfo=eastern), "Boston, MA")
+        == base
+    )
+
+    assert make_event_id("Boston Half", date, "Boston, MA") != base
+    assert make_event_id("Boston Marathon", date + timedelta(days=1), "Boston, MA") != base
+    assert make_event_id("Boston Marathon", date, "Boston, MAX") != base
+
+
+def test_undated_event_id_is_keyed_on_url():
+    """Test that undated events get the same ID each time, distinct per URL."""
+    first = Event(name="Run", date=None, location="X", description="", url="https://a")
+    again = Event(name="Run", date=None, location="X", description="a", url="https://a")
+    other = Event(name="Run", date=None, location="X", description="", url="https://b")
+
+    assert first.id == again.id == make_event_id("Run", None, "X", "https://a")
+    assert other.id != first.id
+    assert first.id != make_event_id("Run", datetime(2024, 1, 1), "X")
+    assert make_event_id("Run", datetime(2024, 1, 1), "X", "https://a") == make_event_id(
+        "Run", datetime(2024, 1, 1), "X"
+    )
+
+
+def test_event_id_is_stable_across_processes():
+    """Test that the ID does not depend on the per-process hash seed."""
+    code = (
+        "from datetime import datetime; from models.event import Event; "
+        "print(Event(name='Run', date=datetime(2024, 1, 1), location='X', "
+        "description='', url='').id)"
+    )
+    ids = {
+        subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        for seed in ("1", "2")
+    }
+    assert ids == {make_event_id("Run", datetime(2024, 1, 1), "X")}
+
+
+def test_event_id_from_string_date():
+    """Test that a date given as a string gets the same ID as a datetime."""
+    event = Event(
+        name="Run",
+        date="2024-01-01T00:00:00",
+        location="X",
+        description="",
+        url="",
+    )
+    assert event.id == make_event_id("Run", datetime(2024, 1, 1), "X")
+
+
+def bulk_rows():
+    """Build varied event fields for the bulk helpers."""
+    eastern = timezone(timedelta(hours=-5))
+    return [
+        {
+            "name": "City 5K",
+            "date": datetime(2024, 3, 15, 9),
+            "location": "Boston",
+            "description": "Fast course",
+            "url": "https://example.com/5k",
+            "distance": 5.0,
+        },
+        {
+            "name": "Zürich Marathon 🏃",
+            "date": datetime(2024, 4, 1, 8, 30, tzinfo=eastern),
+            "location": "Zürich",
+            "description": "",
+            "url": "",
+            "distance": 42.2,
+            "calendar_event_id": "cal1",
+        },
+        {
+            "id": "given",
+            "name": "Fun Run",
+            "date": datetime(2024, 5, 1),
+            "location": "Austin",
+            "description": "No distance",
+            "url": "https://example.com/fun",
+        },
+    ]
+
+
+def test_construct_many_matches_validated_events():
+    """Test that trusted bulk construction equals validation, IDs and defaults included."""
+    rows = bulk_rows()
+    events = Event.construct_many(rows)
+    expected = [Event(**row) for row in rows]
+
+    assert events == expected
+    assert all(isinstance(event, Event) for event in events)
+    assert [e.model_fields_set for e in events] == [e.model_fields_set for e in expected]
+    assert [e.model_dump_json() for e in events] == [e.model_dump_json() for e in expected]
+    assert events[2].id == "given"
+    assert events[2].distance == 0.0
+    assert "id" not in rows[0]
+
+
+def test_bulk_serialization_is_identical():
+    """Test that the bulk converters produce exactly the per-event output."""
+    events = [Event(**row) for row in bulk_rows()]
+    dumps = partial(json.dumps, ensure_ascii=False)
+
+    assert dumps(Event.to_dicts(events)) == dumps([e.to_dict() for e in events])
+    assert dumps(Event.to_calendar_events(events)) == dumps([e.to_calendar_event() for e in events])
+    assert Event.to_dicts([]) == Event.to_calendar_events([]) == []
+
+
+def test_undated_event_has_no_calendar_event():
+    """Test that undated events cannot be scheduled, one or many at a time."""
+    event = Event(name="Run", date=None, location="X", description="", url="https://a")
+
+    with pytest.raises(ValueError):
+        event.to_calendar_event()
+    with pytest.raises(ValueError):
+        Event.to_calendar_events([event])
+    assert event.to_dict()["date"] is None
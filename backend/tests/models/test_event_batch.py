@@ -0,0 +1,242 @@
+"""Tests for EventBatch."""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from models import EventBatch
+from models.event import Event
+from models.event_batch import DictionaryColumn
+
+
+def make_events():
+    """Events with repeated locations, ties and a duplicate."""
+    return [
+        Event(
+            name="Spring 10K",
+            date=datetime(2024, 4, 1, 9),
+            location="Boston",
+            description="",
+            url="https://a",
+            distance=10.0,
+        ),
+        Event(
+            name="Harbor Half",
+            date=datetime(2024, 3, 15, 8),
+            location="Portland",
+            description="Fast course",
+            url="https://b",
+            distance=21.1,
+        ),
+        Event(
+            name="Winter 5K",
+            date=datetime(2024, 1, 20, 10, tzinfo=timezone(timedelta(hours=-5))),
+            location="Boston",
+            description="",
+            url="https://c",
+            distance=5.0,
+            calendar_event_id="cal1",
+        ),
+        Event(
+            name="City Marathon",
+            date=datetime(2024, 4, 1, 9),
+            location="Chicago",
+            description="",
+            url="https://d",
+            distance=42.2,
+        ),
+        Event(
+            name="Spring 10K",
+            date=datetime(2024, 4, 1, 9),
+            location="Boston",
+            description="",
+            url="https://a",
+            distance=10.0,
+        ),
+    ]
+
+
+def names(batch):
+    return [event.name for event in batch]
+
+
+def test_round_trip():
+    """Events read back from a batch equal the originals."""
+    events = make_events()
+    batch = EventBatch.from_events(events)
+
+    assert len(batch) == 5
+    assert batch.to_events() == [
+        (
+            event.model_copy(update={"date": event.date.astimezone(timezone.utc)})
+            if event.date.tzinfo
+            else event
+        )
+        for event in events
+    ]
+    assert batch[1].distance == 21.1
+    assert batch[2].date == datetime(2024, 1, 20, 15, tzinfo=timezone.utc)
+    assert batch[-1] == events[-1]
+    assert batch[2].to_dict()["calendar_event_id"] == "cal1"
+    with pytest.raises(IndexError):
+        batch[5]
+
+
+def test_empty_batch():
+    """An empty batch supports every operation."""
+    batch = EventBatch.from_events([])
+
+    assert len(batch) == 0
+    assert batch.to_events() == []
+    assert len(batch.filter(min_distance=5).sort().top_k(3).dedup()) == 0
+
+
+def test_strings_are_dictionary_encoded():
+    """Repeated strings are stored once and shared by selections."""
+    batch = EventBatch.from_events(make_events())
+    location = batch.strings["location"]
+
+    assert location.values.tolist() == ["Boston", "Portland", "Chicago"]
+    assert location.codes.tolist() == [0, 1, 0, 2, 0]
+    assert batch[1:3].strings["location"].values is location.values
+    assert location[3] == "Chicago"
+    assert len(location) == 5
+
+
+def test_filter():
+    """Filters combine and keep row order."""
+    batch = EventBatch.from_events(make_events())
+
+    assert names(batch.filter(min_distance=10, max_distance=21.1)) == [
+        "Spring 10K",
+        "Harbor Half",
+        "Spring 10K",
+    ]
+    assert names(
+        batch.filter(date_from=datetime(2024, 3, 15, 8), date_to=datetime(2024, 4, 1))
+    ) == ["Harbor Half"]
+    assert names(batch.filter(date_to=datetime(2024, 1, 20, 15, 1, tzinfo=timezone.utc))) == [
+        "Winter 5K"
+    ]
+    assert names(batch.filter(locations=["Chicago", "Portland"])) == [
+        "Harbor Half",
+        "City Marathon",
+    ]
+    assert len(batch.filter(locations=[])) == 0
+
+
+def test_undated_rows():
+    """Undated rows round-trip, never pass a date filter and sort last."""
+    undated = Event(
+        name="Someday 5K", date=None, location="Boston", description="", url="https://e"
+    )
+    batch = EventBatch.from_events([undated, *make_events()])
+
+    assert batch[0] == undated
+    assert "Someday 5K" not in names(batch.filter(date_from=datetime(2000, 1, 1)))
+    assert "Someday 5K" not in names(batch.filter(date_to=datetime(2100, 1, 1)))
+    assert names(batch.sort())[-1] == "Someday 5K"
+    assert names(batch.top_k(1, largest=True)) == ["Someday 5K"]
+
+
+def test_sort_is_stable():
+    """Sorting keeps the order of ties and supports several keys."""
+    batch = EventBatch.from_events(make_events())
+
+    assert names(batch.sort()) == [
+        "Winter 5K",
+        "Harbor Half",
+        "Spring 10K",
+        "City Marathon",
+        "Spring 10K",
+    ]
+    assert names(batch.sort("date", "name")) == [
+        "Winter 5K",
+        "Harbor Half",
+        "City Marathon",
+        "Spring 10K",
+        "Spring 10K",
+    ]
+    assert names(batch.sort("distance", descending=True))[:2] == ["City Marathon", "Harbor Half"]
+    assert names(batch.sort("location", "distance", descending=True)) == [
+        "Harbor Half",
+        "City Marathon",
+        "Spring 10K",
+        "Spring 10K",
+        "Winter 5K",
+    ]
+    with pytest.raises(ValueError):
+        batch.sort("unknown")
+
+
+def test_sort_matches_python():
+    """Sorting agrees with sorted() on random data."""
+    rng = np.random.default_rng(7)
+    events = [
+        Event(
+            name=f"Race {n}",
+            date=datetime(2024, 1, 1) + timedelta(days=int(day)),
+            location=f"City {int(city)}",
+            description="",
+            url="",
+            distance=float(distance),
+        )
+        for n, (day, city, distance) in enumerate(
+            zip(
+                rng.integers(0, 30, 500),
+                rng.integers(0, 12, 500),
+                rng.choice([5.0, 10.0, 21.1, 42.2], 500),
+            )
+        )
+    ]
+    batch = EventBatch.from_events(events)
+
+    expected = sorted(events, key=lambda e: (e.location, e.date))
+    assert batch.sort("location", "date").to_events() == expected
+    expected = sorted(events, key=lambda e: e.distance, reverse=True)
+    assert batch.sort("distance", descending=True).to_events() == expected
+    assert batch.top_k(25, by="distance", largest=True).to_events() == expected[:25]
+    assert batch.top_k(25).to_events() == sorted(events, key=lambda e: e.date)[:25]
+
+
+def test_top_k():
+    """top_k returns the k smallest or largest rows in sorted order."""
+    batch = EventBatch.from_events(make_events())
+
+    assert names(batch.top_k(2)) == ["Winter 5K", "Harbor Half"]
+    assert names(batch.top_k(2, by="distance", largest=True)) == ["City Marathon", "Harbor Half"]
+    assert names(batch.top_k(3, by="date", largest=True)) == [
+        "Spring 10K",
+        "City Marathon",
+        "Spring 10K",
+    ]
+    assert len(batch.top_k(10)) == 5
+    assert len(batch.top_k(0)) == 0
+
+
+def test_dedup():
+    """dedup keeps the first row of each value."""
+    batch = EventBatch.from_events(make_events())
+
+    assert names(batch.dedup()) == ["Spring 10K", "Harbor Half", "Winter 5K", "City Marathon"]
+    assert names(batch.dedup("location")) == ["Spring 10K", "Harbor Half", "City Marathon"]
+    assert names(batch.dedup("date")) == ["Spring 10K", "Harbor Half", "Winter 5K"]
+
+
+def test_selection_by_mask_and_indices():
+    """Batches can be indexed by masks, index lists and slices."""
+    batch = EventBatch.from_events(make_events())
+
+    assert names(batch[batch.distance > 20]) == ["Harbor Half", "City Marathon"]
+    assert names(batch[[3, 0]]) == ["City Marathon", "Spring 10K"]
+    assert names(batch[::2]) == ["Spring 10K", "Winter 5K", "Spring 10K"]
+
+
+def test_dictionary_column_none_values():
+    """Missing strings are encoded, decoded and ranked first."""
+    column = DictionaryColumn.encode(["b", None, "a", None])
+
+    assert column.decode() == ["b", None, "a", None]
+    assert column.ranks().tolist() == [2, 0, 1, 0]
+    assert column.isin([None]).tolist() == [False, True, False, True]
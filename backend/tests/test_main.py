@@ -1,7 +1,11 @@
 """Tests for main FastAPI application."""
 
+import asyncio
+import json
+import time
 from datetime import datetime
-from unittest.mock import patch
+from typing import List
+from unittest.mock import DEFAULT, AsyncMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -54,7 +58,7 @@ def mock_search_events():
         ),
     ]
 
-    with patch("main.search_running_events", return_value=mock_events):
+    with patch("main.search_running_events_async", return_value=mock_events):
         yield mock_events
 
 
@@ -80,6 +84,17 @@ def test_search_events_invalid_auth(client, mock_env):
     assert response.status_code == 401
 
 
+def test_search_events_google_id_token(client, mock_env, mock_search_events):
+    """Test that a verified Google ID token is accepted."""
+    with patch("main.verify_google_id_token_async", new=AsyncMock()) as mock_verify:
+        mock_verify.return_value = {"sub": "123"}
+        response = client.post(
+            "/events/search?query=test", headers={"Authorization": "Bearer id-token"}
+        )
+    assert response.status_code == 200
+    mock_verify.assert_awaited_once_with("id-token")
+
+
 def test_search_events_valid_auth(client, mock_env, mock_search_events):
     """Test search events endpoint with valid authentication."""
     response = client.post(
@@ -93,6 +108,18 @@ def test_search_events_valid_auth(client, mock_env, mock_search_events):
     assert events[1]["name"] == "Test Run 2"
 
 
+def test_search_events_max_results(client, mock_env):
+    """Test that the result budget is passed through and validated."""
+    headers = {"Authorization": "Bearer test_client_id"}
+    with patch("main.search_running_events_async", return_value=[]) as mock_search:
+        response = client.post("/events/search?query=test&max_results=30", headers=headers)
+        assert response.status_code == 200
+        mock_search.assert_called_once_with("test", None, max_results=30)
+
+        response = client.post("/events/search?query=test&max_results=101", headers=headers)
+        assert response.status_code == 422
+
+
 def test_search_events_missing_query(client, mock_env):
     """Test search events endpoint with missing query."""
     response = client.post(
@@ -104,7 +131,7 @@ def test_search_events_missing_query(client, mock_env):
 
 def test_search_events_server_error(client, mock_env):
     """Test search events endpoint with server error."""
-    with patch("main.search_running_events", side_effect=Exception("Search failed")):
+    with patch("main.search_running_events_async", side_effect=Exception("Search failed")):
         response = client.post(
             "/events/search?query=test",
             headers={"Authorization": "Bearer test_client_id"},
@@ -147,6 +174,27 @@ async def test_verify_token_valid(mock_env):
     assert result is True
 
 
+@pytest.mark.asyncio
+async def test_verify_token_caches_google_id_tokens(mock_env):
+    """Test that a session's repeated ID token is verified once."""
+    from benchmarks.fake_jwks import FakeJwksServer
+    from functions.auth.token_cache import VerifiedTokenCache
+    from functions.auth.verifier import GoogleCerts, GoogleIdTokenVerifier
+    from main import verify_token
+
+    with FakeJwksServer(audience="test_client_id") as server:
+        verifier = GoogleIdTokenVerifier(GoogleCerts(server.url))
+        token = server.mint()
+        with patch.multiple(
+            "functions.auth.auth", _verifier=verifier, _token_cache=VerifiedTokenCache()
+        ):
+            with patch.object(verifier, "verify_async", wraps=verifier.verify_async) as verify:
+                assert await verify_token(f"Bearer {token}") is True
+                assert await verify_token(f"Bearer {token}") is True
+        verifier.certs.close()
+    verify.assert_awaited_once()
+
+
 @pytest.fixture
 def mock_env_error():
     """Mock environment variables with error."""
@@ -169,3 +217,398 @@ async def test_verify_token_config_error(mock_env_error):
         await verify_token("test_token")
     assert exc_info.value.status_code == 500
     assert exc_info.value.detail == "Server configuration error"
+
+
+def test_lifespan_manages_search_client():
+    """Test that the search client is opened at startup and closed at shutdown."""
+    from main import app
+
+    hooks = dict.fromkeys(
+        [
+            "init_client",
+            "close_client",
+            "start_cache_sweeper",
+            "stop_cache_sweeper",
+            "start_prefetcher",
+            "stop_prefetcher",
+            "close_verifier",
+        ],
+        DEFAULT,
+    )
+    with patch.multiple("main", **hooks) as mocks:
+        with TestClient(app):
+            mocks["init_client"].assert_called_once()
+            mocks["start_cache_sweeper"].assert_called_once()
+            mocks["start_prefetcher"].assert_called_once()
+            mocks["close_client"].assert_not_called()
+        mocks["close_client"].assert_called_once()
+        mocks["stop_cache_sweeper"].assert_called_once()
+        mocks["stop_prefetcher"].assert_called_once()
+        mocks["close_verifier"].assert_called_once()
+
+
+def test_search_health_check(client):
+    """Test that search monitoring state is exposed."""
+    response = client.get("/health/search")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["circuit"]["state"] == "closed"
+    assert set(stats) >= {"cache", "coalescing", "refresh", "circuit", "quota"}
+    assert stats["quota"]["remaining"] > 0
+
+
+def test_search_health_check_runs_off_the_event_loop(client):
+    """Test that the stats, which may count the SQLite index, are gathered on a worker."""
+
+    def stats():
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return {"index": {"events": 3}}
+
+    with patch("main.get_search_stats", side_effect=stats):
+        response = client.get("/health/search")
+    assert response.json() == {"index": {"events": 3}}
+
+
+def test_search_events_json_matches_pydantic(client, mock_env, mock_search_events):
+    """Test that the JSON response has the same content as pydantic's serializer."""
+    from pydantic import TypeAdapter
+
+    response = client.post(
+        "/events/search?query=test", headers={"Authorization": "Bearer test_client_id"}
+    )
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+    expected = TypeAdapter(List[Event]).dump_python(mock_search_events, mode="json")
+    assert response.json() == expected
+
+
+def test_search_events_msgpack(client, mock_env, mock_search_events):
+    """Test that msgpack responses decode to the same events."""
+    from functions.event_discovery.formats import decode_msgpack
+
+    response = client.post(
+        "/events/search?query=test",
+        headers={"Authorization": "Bearer test_client_id", "Accept": "application/x-msgpack"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-msgpack"
+    assert decode_msgpack(response.content) == mock_search_events
+
+
+def test_search_events_not_acceptable(client, mock_env):
+    """Test that unsupported formats are refused before searching."""
+    with patch("main.search_running_events_async") as mock_search:
+        response = client.post(
+            "/events/search?query=test",
+            headers={"Authorization": "Bearer test_client_id", "Accept": "text/html"},
+        )
+    assert response.status_code == 406
+    mock_search.assert_not_called()
+
+
+def test_search_events_compressed(client, mock_env):
+    """Test that large responses are gzipped when the client accepts it."""
+    events = [
+        Event(
+            name=f"Test Run {n}",
+            date=datetime(2024, 3, 15),
+            location="Test Location",
+            description="Test Description " * 10,
+            url=f"https://test.com/event{n}",
+            distance=5.0,
+        )
+        for n in range(20)
+    ]
+    with patch("main.search_running_events_async", return_value=events):
+        response = client.post(
+            "/events/search?query=test",
+            headers={"Authorization": "Bearer test_client_id", "Accept-Encoding": "gzip"},
+        )
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 20
+
+
+def test_search_events_etag_and_not_modified(client, mock_env):
+    """Test that a matching If-None-Match gets a 304 without encoding the events."""
+    from functions.event_discovery.cache import CachedEvents
+
+    events = CachedEvents(
+        [
+            Event(
+                name="Test Run",
+                date=datetime(2024, 3, 15),
+                location="Test Location",
+                description="Test Description",
+                url="https://test.com/event",
+            )
+        ],
+        fresh_until=time.time() + 600,
+    )
+    headers = {"Authorization": "Bearer test_client_id"}
+    with patch("main.search_running_events_async", return_value=events):
+        response = client.get("/events/search?query=test", headers=headers)
+        etag = response.headers["etag"]
+        assert response.status_code == 200
+        assert etag == f'"{events.content_hash}-json+gzip"'
+        assert response.headers["cache-control"] in ("private, max-age=599", "private, max-age=600")
+
+        with patch("main.render_events") as render:
+            response = client.post(
+                "/events/search?query=test", headers={**headers, "If-None-Match": etag}
+            )
+            render.assert_not_called()
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert response.headers["vary"] == "Accept, Accept-Encoding"
+
+        # Another representation has another tag
+        response = client.post(
+            "/events/search?query=test",
+            headers={**headers, "If-None-Match": etag, "Accept": "application/x-msgpack"},
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+
+def test_search_events_plain_list_gets_etag(client, mock_env, mock_search_events):
+    """Test that uncached results are hashed on the fly and not cacheable."""
+    response = client.post(
+        "/events/search?query=test", headers={"Authorization": "Bearer test_client_id"}
+    )
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["cache-control"] == "private, max-age=0"
+
+
+def test_search_events_fields_and_cursor_pages(client, mock_env):
+    """Test field selection and cursor paging over one cached upstream result."""
+    from unittest.mock import MagicMock
+
+    items = [
+        {"title": f"Race {i}", "snippet": f"5K on 2099-06-{i + 1:02d}", "link": f"https://r/{i}"}
+        for i in range(10)
+    ]
+    upstream = MagicMock(status_code=200)
+    upstream.json.return_value = {"items": items}
+    headers = {"Authorization": "Bearer test_client_id"}
+    with patch("requests.Session.get", return_value=upstream) as mock_get:
+        names = []
+        url = "/events/search?query=boston&fields=name,date,distance&limit=4"
+        while True:
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200
+            for event in response.json():
+                assert set(event) == {"name", "date", "distance"}
+                names.append(event["name"])
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+            url = f"/events/search?query=boston&fields=name,date,distance&limit=4&cursor={cursor}"
+
+    assert names == [f"Race {i}" for i in range(10)]
+    assert mock_get.call_count == 1
+
+
+def test_search_events_etag_survives_refresh_of_undated_results(client, mock_env):
+    """Test that refetching undated results upstream keeps the ETag, so clients get a 304."""
+    from unittest.mock import MagicMock
+
+    from functions.event_discovery import search
+
+    items = [
+        {"title": f"Race {i}", "snippet": "5K, register now", "link": f"https://r/{i}"}
+        for i in range(3)
+    ]
+    upstream = MagicMock(status_code=200)
+    upstream.json.return_value = {"items": items}
+    headers = {"Authorization": "Bearer test_client_id"}
+    with patch("requests.Session.get", return_value=upstream) as mock_get:
+        response = client.get("/events/search?query=boston", headers=headers)
+        assert [event["date"] for event in response.json()] == [None] * 3
+        etag = response.headers["etag"]
+
+        search._cache.clear()
+        time.sleep(0.002)
+        response = client.get(
+            "/events/search?query=boston", headers={**headers, "If-None-Match": etag}
+        )
+
+    assert mock_get.call_count == 2
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_search_events_rejects_bad_fields_and_cursor(client, mock_env):
+    """Test that unknown fields and malformed cursors are refused before searching."""
+    headers = {"Authorization": "Bearer test_client_id"}
+    with patch("main.search_running_events_async") as mock_search:
+        response = client.get("/events/search?query=test&fields=name,secret", headers=headers)
+        assert response.status_code == 400
+        assert "secret" in response.json()["detail"]
+
+        response = client.get("/events/search?query=test&cursor=garbage", headers=headers)
+        assert response.status_code == 400
+    mock_search.assert_not_called()
+
+
+def test_batch_search_events(client, mock_env, mock_search_events):
+    """Test that a batch returns each event once with per-query results."""
+    with patch(
+        "functions.event_discovery.search.search_running_events_async",
+        return_value=mock_search_events,
+    ) as mock_search:
+        with patch("functions.event_discovery.formats.COMPRESS_MIN_BYTES", 0):
+            response = client.post(
+                "/events/search:batch",
+                json={"queries": ["5k", "10k"], "location": "Boston"},
+                headers={"Authorization": "Bearer test_client_id", "Accept-Encoding": "gzip"},
+            )
+
+    assert response.status_code == 200
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["content-encoding"] == "gzip"
+    body = response.json()
+    assert [event["id"] for event in body["events"]] == [e.id for e in mock_search_events]
+    assert [result["query"] for result in body["results"]] == ["5k", "10k"]
+    assert all(result["status"] == "ok" for result in body["results"])
+    assert mock_search.call_count == 2
+    mock_search.assert_any_call("10k", "Boston", 10)
+
+
+def test_batch_search_events_validation(client, mock_env):
+    """Test that batches need auth and between one and the maximum queries."""
+    from functions.event_discovery.batch import BATCH_MAX_QUERIES
+
+    response = client.post("/events/search:batch", json={"queries": ["5k"]})
+    assert response.status_code == 401
+
+    headers = {"Authorization": "Bearer test_client_id"}
+    for queries in ([], ["5k"] * (BATCH_MAX_QUERIES + 1)):
+        response = client.post("/events/search:batch", json={"queries": queries}, headers=headers)
+        assert response.status_code == 422
+
+
+def test_search_events_within_radius(client, mock_env):
+    """Test that a radius search keeps nearby events, closest first."""
+    events = [
+        Event(
+            name=f"Run in {location}",
+            date=datetime(2099, 1, 1),
+            location=location,
+            description="",
+            url=f"https://test.com/{location}",
+        )
+        for location in ["New York", "Worcester, MA", "Cambridge, MA"]
+    ]
+    headers = {"Authorization": "Bearer test_client_id"}
+    with patch("main.search_running_events_async", return_value=events) as mock_search:
+        response = client.get(
+            "/events/search?query=5k&location=Boston&radius_km=100", headers=headers
+        )
+    assert response.status_code == 200
+    assert [event["location"] for event in response.json()] == ["Cambridge, MA", "Worcester, MA"]
+    mock_search.assert_called_once_with("5k", "Boston", max_results=10)
+
+
+def test_search_events_radius_needs_known_location(client, mock_env):
+    """Test that radius searches without a known location are refused."""
+    headers = {"Authorization": "Bearer test_client_id"}
+    with patch("main.search_running_events_async") as mock_search:
+        response = client.get("/events/search?query=5k&radius_km=10", headers=headers)
+        assert response.status_code == 400
+        response = client.get(
+            "/events/search?query=5k&location=Atlantis&radius_km=10", headers=headers
+        )
+        assert response.status_code == 400
+        assert "Atlantis" in response.json()["detail"]
+    mock_search.assert_not_called()
+
+
+def test_search_events_radius_needs_gazetteer(client, mock_env):
+    """Test that radius searches are refused when no gazetteer is configured."""
+    headers = {"Authorization": "Bearer test_client_id"}
+    with patch("main.get_gazetteer", return_value=None):
+        with patch("main.search_running_events_async") as mock_search:
+            response = client.get(
+                "/events/search?query=5k&location=Boston&radius_km=10", headers=headers
+            )
+    assert response.status_code == 501
+    mock_search.assert_not_called()
+
+
+async def fake_stream(*events, error=None):
+    for event in events:
+        yield event
+    if error is not None:
+        raise error
+
+
+def test_stream_search_events_ndjson(client, mock_env, mock_search_events):
+    """Test that streamed events come as JSON lines, unbuffered."""
+    headers = {"Authorization": "Bearer test_client_id"}
+    with patch(
+        "main.stream_running_events_async", return_value=fake_stream(*mock_search_events)
+    ) as mock_stream:
+        response = client.get(
+            "/events/search:stream?query=5k&location=Boston&max_results=20&fields=id,name",
+            headers=headers,
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["x-accel-buffering"] == "no"
+    assert "content-encoding" not in response.headers
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"id": e.id, "name": e.name} for e in mock_search_events]
+    mock_stream.assert_called_once_with("5k", "Boston", max_results=20)
+
+
+def test_stream_search_events_sse(client, mock_env, mock_search_events):
+    """Test that server-sent events end with an end event or an error event."""
+    headers = {"Authorization": "Bearer test_client_id", "Accept": "text/event-stream"}
+    with patch("main.stream_running_events_async", return_value=fake_stream(*mock_search_events)):
+        response = client.post("/events/search:stream?query=5k", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = response.text.split("\n\n")
+    assert [message.split("\n")[0] for message in messages[:-1]] == [
+        "event: event",
+        "event: event",
+        "event: end",
+    ]
+    assert messages[2] == 'event: end\ndata: {"count":2}'
+
+    failing = fake_stream(mock_search_events[0], error=RuntimeError("upstream down"))
+    with patch("main.stream_running_events_async", return_value=failing):
+        response = client.get("/events/search:stream?query=5k", headers=headers)
+    assert response.status_code == 200
+    assert response.text.endswith('event: error\ndata: {"error":"upstream down"}\n\n')
+
+    with patch("main.stream_running_events_async", return_value=fake_stream()):
+        response = client.get("/events/search:stream?query=5k", headers=headers)
+    assert response.status_code == 200
+    assert response.text == 'event: end\ndata: {"count":0}\n\n'
+
+
+def test_stream_search_error_before_first_event(client, mock_env):
+    """Test that a search failing before any event gets an error status, not a 200."""
+    headers = {"Authorization": "Bearer test_client_id"}
+    failing = fake_stream(error=RuntimeError("upstream down"))
+    with patch("main.stream_running_events_async", return_value=failing):
+        response = client.get("/events/search:stream?query=5k", headers=headers)
+    assert response.status_code == 500
+    assert response.json() == {"detail": "upstream down"}
+
+
+def test_stream_search_events_validation(client, mock_env):
+    """Test that streams need auth, a stream format and known fields."""
+    with patch("main.stream_running_events_async") as mock_stream:
+        assert client.get("/events/search:stream?query=5k").status_code == 401
+        headers = {"Authorization": "Bearer test_client_id", "Accept": "application/json"}
+        response = client.get("/events/search:stream?query=5k", headers=headers)
+        assert response.status_code == 406
+        headers = {"Authorization": "Bearer test_client_id"}
+        response = client.get("/events/search:stream?query=5k&fields=secret", headers=headers)
+        assert response.status_code == 400
+    mock_stream.assert_not_called()